@@ -0,0 +1,282 @@
+"""Micro-benchmarks for Tzer's hot paths.
+
+Usage: python3 src/benchmark.py <benchmark> [options]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import tvm
+
+from tzer.tir import seed, error, config, fuzz
+from tzer.tir.batch import BatchJob
+from tzer.tir.executor import EXECUTORS, make_executor
+from tzer.tir.mutate import SizedGenerator
+from tzer.tir.schedule import SCHEDULES, FenwickSampler
+from tzer.tir.pass_fuzz.pass_mutator import random_tir_passes, concretize_tir_passes
+from tzer.tir.tree_index import TreeIndex
+from tzer.tir.semantic import Context
+from tzer.tir.visit import MemoizedGetSize, NoDispatchPatternError, get_node_size, swap_tir
+from tzer.tir.visit.abstract import _DISPATCH_ORDER
+from tzer.tir.visit.cache import NodeCache
+from tzer.tir.visit.path import replace_path
+from tzer.tir.visit.swap import TIR_SWAPPER, ArgSwap
+
+
+def _report(name: str, n: int, duration: float) -> float:
+    rate = n / duration
+    print(f'{name:>16}: {n} iterations in {duration:.2f}s ({rate:.2f} it/s)')
+    return rate
+
+
+def bench_executor(args):
+    """Build the seeds with random passes using each executor and compare throughput."""
+    funcs = seed.get_all_seeds()
+    jobs = []
+    for _ in range(args.iterations):
+        jobs.append((random.choice(funcs), [p.mutate() for p in random_tir_passes()]))
+
+    rates = {}
+    for name in EXECUTORS:
+        executor = make_executor(name)
+        t0 = time.time()
+        for func, passes in jobs:
+            try:
+                executor.build_and_test(
+                    func, passes, args.build_timeout, 0, args.use_cov, np.ones(len(passes)))
+            except (error.RuntimeFailure, error.MaybeDeadLoop,
+                    error.IncorrectResult, error.PerfDegradation, tvm.TVMError):
+                pass
+        rates[name] = _report(name, len(jobs), time.time() - t0)
+        executor.close()
+
+    baseline = rates['process']
+    for name, rate in rates.items():
+        print(f'{name:>16}: x{rate / baseline:.2f} against `process`')
+
+
+def bench_sampler(args):
+    """Pick-and-update seeds from a pool of `--pool-size` seeds: linear vs. Fenwick sampling."""
+    weights = [random.random() for _ in range(args.pool_size)]
+
+    t0 = time.time()
+    for _ in range(args.iterations):
+        idx = random.choices(range(len(weights)), weights=weights)[0]
+        weights[idx] = random.random()
+    linear = _report('random.choices', args.iterations, time.time() - t0)
+
+    sampler = FenwickSampler(weights)
+    t0 = time.time()
+    for _ in range(args.iterations):
+        sampler.update(sampler.sample(), random.random())
+    fenwick = _report('fenwick', args.iterations, time.time() - t0)
+    print(f'{"fenwick":>16}: x{fenwick / linear:.2f} against `random.choices`')
+
+
+def bench_schedule(args):
+    """Fuzz for `--fuzz-time` minutes with each power schedule and compare the coverage."""
+    covs = {}
+    for name in SCHEDULES:
+        random.seed(2333)
+        np.random.seed(2333)
+        folder = os.path.join(tempfile.mkdtemp(), f'schedule-{name}')
+        cfg = config.config_from_args(config.make_arg_parser().parse_args([
+            '--fuzz-time', str(args.fuzz_time),
+            '--report-folder', folder,
+            '--scheduler', name]))
+        fuzzer = fuzz.Fuzzer(cfg)
+        fuzzer.start()
+        covs[name] = fuzzer.novelty.n_edges if fuzzer.novelty is not None else 0
+        print(f'{name:>16}: {covs[name]} edges ({covs[name] * 60 / args.fuzz_time:.0f} / hour), '
+              f'{fuzzer.joint_seed_pool.size()} seeds, report: {folder}')
+
+    baseline = max(covs['uniform'], 1)
+    for name, cov in covs.items():
+        print(f'{name:>16}: x{cov / baseline:.2f} coverage against `uniform`')
+
+
+def bench_batch(args):
+    """Build the seeds with random passes in batches of `--batch-sizes` tests and compare
+    throughput against building them one by one. Run with `PASS=1`."""
+    funcs = seed.get_all_seeds()
+    jobs = []
+    for _ in range(args.iterations):
+        passes, pass_keys = concretize_tir_passes(random_tir_passes())
+        jobs.append((random.choice(funcs), passes, pass_keys))
+
+    rates = {}
+    for batch_size in [1] + args.batch_sizes:
+        cfg = config.config_from_args(config.make_arg_parser().parse_args([
+            '--iterations', str(args.iterations),
+            '--report-folder', os.path.join(tempfile.mkdtemp(), f'batch-{batch_size}'),
+            '--build-timeout', str(args.build_timeout),
+            '--executor', args.executor,
+            '--build-cache', '0',
+            '--timeout-quantile', '0',
+            '--batch-size', str(batch_size)]))
+        fuzzer = fuzz.Fuzzer(cfg)  # Also resets the coverage.
+        t0 = time.time()
+        for start in range(0, len(jobs), batch_size):
+            for _ in fuzzer.build_batch([BatchJob(func, passes, pass_keys)
+                                         for func, passes, pass_keys in jobs[start:start + batch_size]]):
+                pass
+        rates[batch_size] = _report(f'K={batch_size}', len(jobs), time.time() - t0)
+        print(f'{"":>16}  {fuzzer.n_batch} batches, {fuzzer.n_built_alone} tests built alone, '
+              f'{fuzzer.novelty.n_edges if fuzzer.novelty is not None else "?"} edges')
+        fuzzer.executor.close()
+
+    for batch_size, rate in rates.items():
+        print(f'{f"K={batch_size}":>16}: x{rate / rates[1]:.2f} against K=1')
+
+
+class _ChainGetSize(MemoizedGetSize):
+    """`MemoizedGetSize` dispatching as before: an `isinstance` chain and a decorated visit
+    function built at each visit."""
+
+    def visit(self, op, arg):
+        for node_class, name in _DISPATCH_ORDER:
+            if isinstance(op, node_class):
+                return self.__class__.decorate(getattr(self.__class__, 'visit_' + name))(self, op, arg)
+        raise NoDispatchPatternError(type(op), op)
+
+
+class _CountingGetSize(MemoizedGetSize):
+    def __init__(self) -> None:
+        super().__init__(NodeCache())
+        self.n_visit = 0
+
+    def visit(self, op, arg):
+        self.n_visit += 1
+        return super().visit(op, arg)
+
+
+def bench_visitor(args):
+    """Compute node sizes of the seeds `--iterations` times: `isinstance` chain vs. table
+    dispatch of `TIRVisitor`. Each run starts from an empty cache."""
+    funcs = seed.get_all_seeds()
+    n_visit = 0
+    for func in funcs:
+        visitor = _CountingGetSize()
+        visitor(func, None)
+        n_visit += visitor.n_visit
+    n_visit *= args.iterations
+
+    rates = {}
+    for name, visitor_class in [('isinstance chain', _ChainGetSize), ('table', MemoizedGetSize)]:
+        t0 = time.time()
+        for _ in range(args.iterations):
+            for func in funcs:
+                visitor_class(NodeCache())(func, None)
+        duration = time.time() - t0
+        rates[name] = n_visit / duration
+        print(f'{name:>16}: {n_visit} visits in {duration:.2f}s ({rates[name]:.0f} visits/s)')
+    print(f'{"table":>16}: x{rates["table"] / rates["isinstance chain"]:.2f} against `isinstance chain`')
+
+
+def bench_swap(args):
+    """Replace a random node of the seeds larger than `--min-size` nodes `--iterations` times:
+    whole-tree `TIRSwapper` vs. `swap_tir` (search, then path copying) vs. `replace_path`."""
+    funcs = [func for func in seed.get_all_seeds() if get_node_size(func) > args.min_size]
+    if not funcs:
+        print(f'No seed has more than {args.min_size} nodes')
+        return
+    print(f'{len(funcs)} seeds of {min(map(get_node_size, funcs))} to '
+          f'{max(map(get_node_size, funcs))} nodes')
+    indices = [TreeIndex(func) for func in funcs]
+    jobs = []
+    for _ in range(args.iterations):
+        index = random.choice(indices)
+        idx = random.randrange(1, len(index))
+        old = index.nodes[idx]
+        new = tvm.tir.const(0, old.dtype) if isinstance(old, tvm.tir.PrimExpr) \
+            else tvm.tir.Evaluate(tvm.tir.const(0))
+        jobs.append((index, idx, old, new))
+
+    for index, idx, old, new in jobs[:10]:
+        expected = TIR_SWAPPER(index.root, ArgSwap(old, new))
+        assert tvm.ir.structural_equal(swap_tir(index.root, old, new), expected)
+        assert tvm.ir.structural_equal(replace_path(index.root, index.path(idx), new), expected)
+
+    methods = [
+        ('TIRSwapper', lambda index, idx, old, new: TIR_SWAPPER(index.root, ArgSwap(old, new))),
+        ('swap_tir', lambda index, idx, old, new: swap_tir(index.root, old, new)),
+        ('replace_path', lambda index, idx, old, new: replace_path(index.root, index.path(idx), new)),
+    ]
+    rates = {}
+    for name, method in methods:
+        t0 = time.time()
+        for job in jobs:
+            method(*job)
+        rates[name] = _report(name, len(jobs), time.time() - t0)
+    for name, rate in rates.items():
+        print(f'{name:>16}: x{rate / rates["TIRSwapper"]:.2f} against `TIRSwapper`')
+
+
+class _RebuildingGenerator(SizedGenerator):
+    """`SizedGenerator` that rebuilds its options on every call instead of looking them up."""
+
+    def _option_table(self, key, make):
+        return make()
+
+
+def bench_generator(args):
+    """Generate `--iterations` functions of `--gen-size` nodes: options rebuilt on every
+    call vs. looked up in the option tables of `SizedGenerator`."""
+    rates = {}
+    for name, generator_class in [('rebuilt', _RebuildingGenerator), ('table', SizedGenerator)]:
+        random.seed(2333)
+        np.random.seed(2333)
+        generator = generator_class(lambda: args.gen_size)
+        n_node = 0
+        t0 = time.time()
+        for _ in range(args.iterations):
+            try:
+                n_node += get_node_size(generator.generate(Context.prim_func_context()))
+            except tvm.TVMError:
+                pass
+        duration = time.time() - t0
+        rates[name] = n_node / duration
+        print(f'{name:>16}: {n_node} nodes in {duration:.2f}s ({rates[name]:.0f} nodes/s)')
+    print(f'{"table":>16}: x{rates["table"] / rates["rebuilt"]:.2f} against `rebuilt`')
+
+
+BENCHMARKS = {
+    'batch': bench_batch,
+    'executor': bench_executor,
+    'generator': bench_generator,
+    'sampler': bench_sampler,
+    'schedule': bench_schedule,
+    'swap': bench_swap,
+    'visitor': bench_visitor,
+}
+
+
+if '__main__' == __name__:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('benchmark', type=str, choices=list(BENCHMARKS.keys()))
+    parser.add_argument('-n', '--iterations', type=int, default=200,
+                        help='Iterations of each benchmark')
+    parser.add_argument('-t', '--build-timeout', type=float, default=2,
+                        help='Timeout in second for building one TIR')
+    parser.add_argument('--use-cov', action='store_true',
+                        help='Collect coverage (requires an instrumented TVM)')
+    parser.add_argument('--pool-size', type=int, default=10000,
+                        help='Number of seeds for `sampler`')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[4, 16, 64],
+                        help='Batch sizes of `batch`')
+    parser.add_argument('--executor', type=str, default='process', choices=list(EXECUTORS.keys()),
+                        help='Executor of `batch`')
+    parser.add_argument('--fuzz-time', type=float, default=10,
+                        help='Fuzzing time in minute of each run of `schedule`')
+    parser.add_argument('--min-size', type=int, default=1000,
+                        help='Minimum node size of the seeds of `swap`')
+    parser.add_argument('--gen-size', type=int, default=50,
+                        help='Size of the functions generated by `generator`')
+    args = parser.parse_args()
+
+    random.seed(2333)
+    np.random.seed(2333)
+    BENCHMARKS[args.benchmark](args)
@@ -1,24 +1,74 @@
 import argparse
-from typing import List, Tuple
+from typing import Callable, Dict, List, Tuple
 import matplotlib.pyplot as plt
 import dill as pickle
 from dill import UnpicklingError
 import os
 from tqdm import tqdm
 from tvm._ffi.base import TVMError
-from tvm.contrib import coverage
 from tzer.tir import error, oracle
 from tzer.tir import report
+from tzer.tir.record import RecordReader
+from tzer.tir.replay import RunChunk, replay
+from tzer.tir.pass_fuzz.pass_mutator import tir_pass_graph
 
 
 class CovGetter:
-    def __init__(self, timeout) -> None:
+    def __init__(self, timeout, n_jobs=1) -> None:
         self.timeout = timeout  # type: ignore
+        self.n_jobs = n_jobs
 
-    def save(self, folder, overwrite):
-        tir_by_time_file = open(os.path.join(
-            folder, 'tir_by_time.pickle'), 'rb')
+    def test(self, func, passes) -> Callable[[], bool]:
+        def run() -> bool:
+            try:
+                oracle.build_and_test(
+                    func,
+                    passes,
+                    self.timeout,
+                    0,
+                    True,
+                )
+                return True
+            except (error.RuntimeFailure, error.MaybeDeadLoop, TVMError):
+                return False
+        return run
+
+    def records(self, folder) -> Tuple[int, RunChunk]:
+        rec_fname = os.path.join(folder, 'tir_by_time.rec')
+        if os.path.exists(rec_fname):
+            reader = RecordReader(rec_fname)
+            n_records = len(reader)
+            reader.close()
+            readers: Dict[int, RecordReader] = {}
+
+            def run_chunk(start, stop):
+                # Each process needs its own file offset.
+                pid = os.getpid()
+                if pid not in readers:
+                    readers[pid] = RecordReader(rec_fname)
+                for record in readers[pid].iter_range(start, stop):
+                    passes = tir_pass_graph.recover_keys(record.pass_keys)
+                    yield record.time, self.test(record.func, passes)
+            return n_records, run_chunk
+
+        # Campaigns recorded before `tir_by_time.rec` are loaded at once.
+        records = []
+        with open(os.path.join(folder, 'tir_by_time.pickle'), 'rb') as tir_by_time_file:
+            while True:
+                try:
+                    records.append(pickle.load(tir_by_time_file))
+                except EOFError:
+                    break
+                except (TVMError, UnpicklingError):
+                    tir_by_time_file.seek(1, 1)
+                    continue
 
+        def run_legacy_chunk(start, stop):
+            for time, func, passes in records[start:stop]:
+                yield time, self.test(func, passes)
+        return len(records), run_legacy_chunk
+
+    def save(self, folder, overwrite):
         cov_by_time_fname = os.path.join(folder, 'cov_by_time.txt')
         if os.path.exists(cov_by_time_fname) and not overwrite:
             response = input(
@@ -33,52 +83,19 @@ class CovGetter:
                 use_existing_dir=True
             )
 
-            coverage.reset()
-            cov_now = coverage.get_now()
-            cov_hitmap = coverage.get_hitmap()
-
             print(f'Processing {self.reporter.report_folder}..')
-            total_length = tir_by_time_file.seek(0, 2)
-            tir_by_time_file.seek(0, 0)
-            last_pos = 0
-            it = 0
+            n_records, run_chunk = self.records(folder)
             valid_seed_new_cov_count = 0
-            with tqdm(total=total_length) as pbar:
-                while True:
-                    try:
-                        time, func, passes = pickle.load(tir_by_time_file)
-                    except EOFError:
-                        break
-                    except (TVMError, UnpicklingError):
-                        tir_by_time_file.seek(1, 1)
-                        continue
-                    try:
-                        coverage.set_now(cov_now)
-                        coverage.set_hitmap(cov_hitmap)
-                        oracle.build_and_test(
-                            func,
-                            passes,
-                            self.timeout,
-                            0,
-                            True,
-                        )
-                        valid = True
-                    except (error.RuntimeFailure, error.MaybeDeadLoop, TVMError):
-                        valid = False
-                    if valid and coverage.get_now() > cov_now:
-                        valid_seed_new_cov_count += 1
-                    cov_now = coverage.get_now()
-                    cov_hitmap = coverage.get_hitmap()
-                    self.reporter.record_coverage(time)
-                    self.reporter.record_valid_seed_achieving_new_cov_count(
-                        valid_seed_new_cov_count
-                    )
-                    it += 1
-                    pbar.update(tir_by_time_file.tell() - last_pos)
-                    last_pos = tir_by_time_file.tell()
+            for time, valid, cov_now, n_new in tqdm(
+                    replay(n_records, run_chunk, self.n_jobs), total=n_records):
+                if valid and n_new > 0:
+                    valid_seed_new_cov_count += 1
+                self.reporter.record_coverage(time, cov_now)
+                self.reporter.record_valid_seed_achieving_new_cov_count(
+                    valid_seed_new_cov_count
+                )
 
             print(f'Finished processing {self.reporter.report_folder}!')
-        tir_by_time_file.close()
 
 
 if '__main__' == __name__:
@@ -87,11 +104,13 @@ if '__main__' == __name__:
                         nargs='+', help='bug report folder')
     parser.add_argument('-t', '--timeout', type=float, default=2,
                         nargs='?', help='building timeout (seconds)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        nargs='?', help='number of processes replaying the records')
     parser.add_argument('-w', '--overwrite', help="Overwrite cov_by_time.txt even if it exists",
                         action="store_true")
     args = parser.parse_args()
 
-    getter = CovGetter(args.timeout)
+    getter = CovGetter(args.timeout, args.jobs)
 
     for f in args.folders:
         getter.save(f, args.overwrite)
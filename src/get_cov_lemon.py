@@ -9,9 +9,13 @@ import multiprocessing as mp
 import datetime
 
 from tzer.tir.error import MaybeDeadLoop, RuntimeFailure
+from tzer.tir.hitmap import shared_hitmap
+from tzer.tir.replay import replay
 
 
 def load_corpus(path, timeout):
+    shared = shared_hitmap()
+    shared.clear()
 
     def run(func, args, kwargs, return_dict):
         return_dict['err'] = ''
@@ -23,8 +27,7 @@ def load_corpus(path, timeout):
         except Exception as e:
             return_dict['err'] = e
 
-        return_dict['cov'] = coverage.get_now()
-        return_dict['hitmap'] = coverage.get_hitmap()
+        shared.dump()
 
 
     def load_and_build(path):
@@ -41,8 +44,8 @@ def load_corpus(path, timeout):
         p.start()
         p.join(timeout=timeout)
 
-        coverage.set_now(return_dict['cov'])
-        coverage.set_hitmap(return_dict['hitmap'])
+        if shared.now >= 0:
+            shared.load()
 
         if not p.exitcode == 0:
             msg = f'{path} terminated abnormally with exit code: {p.exitcode}'
@@ -52,9 +55,20 @@ def load_corpus(path, timeout):
             raise return_dict['err']
 
 
+def test(path, timeout):
+    def run():
+        try:
+            load_corpus(path, timeout)
+            return True
+        except Exception as e:
+            return False
+    return run
+
+
 class CovGetter:
-    def __init__(self, timeout) -> None:
+    def __init__(self, timeout, n_jobs=1) -> None:
         self.timeout = timeout  # type: ignore
+        self.n_jobs = n_jobs
 
     def save(self, folder, build_folder, timeout, overwrite):
         if not os.path.exists(folder):
@@ -68,8 +82,6 @@ class CovGetter:
             response = 'y'
 
         if response == 'y':
-            coverage.reset()
-
             tir_models =  build_folder
             timestamp_log = os.path.join(tir_models, 'lemon_results_timestamp.log')
 
@@ -78,26 +90,21 @@ class CovGetter:
 
             file_time_mapping = sorted(file_time_mapping, key=lambda x:x[0])
             start_time = file_time_mapping[0][0]
+            file_time_mapping = [(t - start_time, c) for t, c in file_time_mapping
+                                 if t - start_time <= timeout]
+
+            def run_chunk(start, stop):
+                for time, c in file_time_mapping[start:stop]:
+                    c = os.path.join(tir_models, f'{c}.tir')
+                    yield (time, c), test(c, 120)
             
             all_seeds_cnt = len(file_time_mapping)
             valid_seeds_cnt = 0
             new_cov_valid_seeds_cnt = 0
             
-            last_cov = coverage.get_now()
-            for t, c in file_time_mapping:
-                time = t - start_time
-                if time > timeout:
-                    break
-
-                valid = False
-                try:
-                    c = os.path.join(tir_models, f'{c}.tir')
-                    load_corpus(c, 120)
-                    valid = True
-                except Exception as e:
-                    pass
-
-                cov_now = coverage.get_now()
+            last_cov = 0
+            for (time, c), valid, cov_now, _ in replay(
+                    len(file_time_mapping), run_chunk, self.n_jobs):
 
                 if valid:
                     valid_seeds_cnt += 1
@@ -123,9 +130,10 @@ if '__main__' == __name__:
     parser.add_argument('-r', '--result-folder', type=str, help='tvm-libfuzz build folder')
     parser.add_argument('-t', '--timeout', type=float, default=180, help='timeout (seconds)')          
     parser.add_argument('-b', '--build-timeout', type=float, default=120, nargs='?', help='building timeout (seconds)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, nargs='?', help='number of processes replaying the corpus')
     parser.add_argument('-w', '--overwrite', help="Overwrite cov_by_time.txt even if it exists",
                         action="store_true")
     args = parser.parse_args()
 
-    getter = CovGetter(args.build_timeout)
+    getter = CovGetter(args.build_timeout, args.jobs)
     getter.save(args.report_folder, args.result_folder, args.timeout, args.overwrite)
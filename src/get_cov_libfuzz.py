@@ -6,8 +6,12 @@ import tvm
 import multiprocessing as mp
 
 from tzer.tir.error import MaybeDeadLoop, RuntimeFailure
+from tzer.tir.hitmap import shared_hitmap
+from tzer.tir.replay import replay
 
 def load_corpus(path, timeout):
+    shared = shared_hitmap()
+    shared.clear()
 
     def run(func, args, kwargs, return_dict):
         return_dict['err'] = ''
@@ -19,8 +23,7 @@ def load_corpus(path, timeout):
         except Exception as e:
             return_dict['err'] = e
 
-        return_dict['cov'] = coverage.get_now()
-        return_dict['hitmap'] = coverage.get_hitmap()
+        shared.dump()
 
     def load_and_build(path):
         with open(path, 'r') as f:
@@ -38,8 +41,8 @@ def load_corpus(path, timeout):
         p.start()
         p.join(timeout=timeout)
 
-        coverage.set_now(return_dict['cov'])
-        coverage.set_hitmap(return_dict['hitmap'])
+        if shared.now >= 0:
+            shared.load()
 
         if not p.exitcode == 0:
             print(f'{path} crashes')
@@ -50,9 +53,20 @@ def load_corpus(path, timeout):
             raise return_dict['err']
 
 
+def test(path, timeout):
+    def run():
+        try:
+            load_corpus(path, timeout)
+            return True
+        except Exception as e:
+            return False
+    return run
+
+
 class CovGetter:
-    def __init__(self, timeout) -> None:
+    def __init__(self, timeout, n_jobs=1) -> None:
         self.timeout = timeout  # type: ignore
+        self.n_jobs = n_jobs
 
     def save(self, folder, build_folder, overwrite):
         if not os.path.exists(folder):
@@ -72,7 +86,6 @@ class CovGetter:
             with open(start_time_fname, 'r') as f:
                 data = f.read()
             start_time = float(data)
-            coverage.reset()
 
             crashes = os.listdir(build_folder)
             crashes = [i for i in crashes if i.startswith('crash')]
@@ -88,22 +101,19 @@ class CovGetter:
                 file_time_mapping.append((t, i))
 
             file_time_mapping = sorted(file_time_mapping, key=lambda x:x[0])
+
+            def run_chunk(start, stop):
+                for t, c in file_time_mapping[start:stop]:
+                    yield (t, c), test(c, 120)
             
             all_seeds_cnt = len(file_time_mapping)
             valid_seeds_cnt = 0
             new_cov_valid_seeds_cnt = 0
             
-            last_cov = coverage.get_now()
-            for t, c in file_time_mapping:
-                valid = False
-                try:
-                    load_corpus(c, 120)
-                    valid = True
-                except Exception as e:
-                    pass
-
+            last_cov = 0
+            for (t, c), valid, cov_now, _ in replay(
+                    len(file_time_mapping), run_chunk, self.n_jobs):
                 time = t - start_time
-                cov_now = coverage.get_now()
 
                 if valid:
                     valid_seeds_cnt += 1
@@ -129,9 +139,11 @@ if '__main__' == __name__:
     parser.add_argument('-b', '--build-folder', type=str, help='tvm-libfuzz build folder')                 
     parser.add_argument('-t', '--timeout', type=float, default=120,
                         nargs='?', help='building timeout (seconds)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        nargs='?', help='number of processes replaying the corpus')
     parser.add_argument('-w', '--overwrite', help="Overwrite cov_by_time.txt even if it exists",
                         action="store_true")
     args = parser.parse_args()
 
-    getter = CovGetter(args.timeout)
+    getter = CovGetter(args.timeout, args.jobs)
     getter.save(args.report_folder, args.build_folder, args.overwrite)
@@ -10,5 +10,8 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     config = tzer.tir.config.config_from_args(args)
-    fuzzer = tzer.tir.fuzz.Fuzzer(config)
+    if config.n_workers > 1:
+        fuzzer = tzer.tir.parallel.ParallelFuzzer(config)
+    else:
+        fuzzer = tzer.tir.fuzz.Fuzzer(config)
     fuzzer.start()
@@ -0,0 +1,14 @@
+import importlib.util
+import os
+import sys
+import types
+
+# Without TVM, `import tzer` fails as its `__init__` imports the fuzzer. Register bare
+# `tzer` and `tzer.tir` packages instead so that the modules not needing TVM can be tested.
+if importlib.util.find_spec('tvm') is None:
+    _ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tzer')
+    for _name, _path in [('tzer', _ROOT), ('tzer.tir', os.path.join(_ROOT, 'tir'))]:
+        if _name not in sys.modules:
+            _package = types.ModuleType(_name)
+            _package.__path__ = [_path]
+            sys.modules[_name] = _package
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('tvm')
+
+from tzer.tir.build_cache import BuildCache, CachedOutcome
+
+
+def _outcome(compiled: bool = True) -> CachedOutcome:
+    return CachedOutcome(compiled, None, 0, np.zeros(0, dtype=bool))
+
+
+def test_lru_eviction():
+    cache = BuildCache(capacity=2)
+    a, b, c = (1, ()), (2, ()), (3, ('pass',))
+    cache.put(a, _outcome())
+    cache.put(b, _outcome())
+    assert cache.get(a) is not None  # `b` is now the least recently used.
+    cache.put(c, _outcome(False))
+    assert b not in cache
+    assert a in cache and c in cache
+    assert cache.get(b) is None
+    assert cache.get(c).compiled is False
+    assert cache.hit_rate() == pytest.approx(2 / 3)
+
+
+def test_disk_tier_outlives_eviction(tmp_path):
+    cache = BuildCache(capacity=1, folder=str(tmp_path))
+    a, b = (1, ('x', 1)), (2, ('y', 2))
+    cache.put(a, _outcome())
+    cache.put(b, _outcome(False))
+    assert a not in cache.entries
+    assert cache.get(a).compiled is True
+    assert list(cache.entries) == [a]
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from tzer.tir.novelty import NoveltyIndex
+
+
+def _hitmap(size: int, edges) -> np.ndarray:
+    hitmap = np.zeros(size, dtype=np.uint8)
+    hitmap[list(edges)] = 1
+    return hitmap
+
+
+def test_new_edges_of_empty_index():
+    index = NoveltyIndex(size=20)
+    hitmap = _hitmap(20, [0, 9, 19])
+    assert index.new_edges(hitmap).tolist() == [0, 9, 19]
+    assert index.count_new(hitmap) == 3
+
+
+def test_update_records_edges_and_hit_counts():
+    pytest.importorskip('tvm.contrib.coverage')  # `update` syncs TVM's coverage.
+    index = NoveltyIndex(size=20)
+    assert index.update(_hitmap(20, [1, 5])).tolist() == [1, 5]
+    assert index.n_edges == 2
+
+    hitmap = _hitmap(20, [5, 12])
+    assert index.new_edges(hitmap).tolist() == [12]
+    assert index.update(hitmap).tolist() == [12]
+    assert index.update(hitmap).tolist() == []
+    assert index.n_edges == 3
+    assert index.hit_counts[[1, 5, 12]].tolist() == [1, 3, 2]
+    assert index.rarity(np.array([5])) < index.rarity(np.array([1]))
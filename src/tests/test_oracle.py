@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+import pytest
+
+tvm = pytest.importorskip('tvm')
+coverage = pytest.importorskip('tvm.contrib.coverage')
+
+from tvm import tir
+from tzer.tir import oracle
+
+
+def _mod() -> tvm.ir.IRModule:
+    a = tir.Var('a', 'int32')
+    return oracle.tir_primfunc_to_mod(tir.PrimFunc([a], tir.Evaluate(a + 1)))
+
+
+def test_concurrent_nopt_join_merges_coverage():
+    mod = _mod()
+    coverage.reset()
+    d = {'stage': oracle.BuildStage.COMPILE_OPT}
+    job = oracle.ConcurrentNopt(mod, d, use_cov=True)
+    nopt_mod = job.join(d, mod)
+
+    assert nopt_mod is not None
+    assert d['stage'] == oracle.BuildStage.COMPILE_OPT
+    # The edges hit by the non-opt. compilation in the child are merged into ours.
+    hitmap = np.frombuffer(coverage.get_hitmap(), dtype=np.uint8)
+    assert coverage.get_now() == np.count_nonzero(hitmap) > 0
+    assert not os.path.exists(job.folder)
+
+
+def test_build_and_test_in_process_compiles_nopt_concurrently(monkeypatch):
+    monkeypatch.setattr(oracle, '__USE_PASS__', True)
+    func = tir.PrimFunc([], tir.Evaluate(tir.const(0)))
+    d = {}
+    oracle.build_and_test_in_process(func, [], 1, False, d, concurrent_nopt=True)
+
+    assert 'nopt_pid' in d
+    assert d['stage'] == oracle.BuildStage.FINISHED
+    assert not os.path.exists(d['nopt_dir'])
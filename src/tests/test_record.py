@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+pytest.importorskip('tvm')
+
+from tzer.tir.record import INDEX_SUFFIX, RecordReader, RecordWriter
+
+
+def _write(path: str, n_records: int, frame_size: int = 4):
+    writer = RecordWriter(path, frame_size=frame_size)
+    for i in range(n_records):
+        writer.write(float(i), None, [('pass', i)])
+    writer.flush()
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'records.bin')
+    _write(path, 10)
+    reader = RecordReader(path)
+    assert len(reader) == 10
+    records = list(reader)
+    assert [r.time for r in records] == [float(i) for i in range(10)]
+    assert all(r.func is None for r in records)
+    assert records[7].pass_keys == [('pass', 7)]
+    assert reader[5].time == 5.
+    reader.close()
+
+
+@pytest.mark.parametrize('with_index', [True, False])
+def test_truncated_frame_is_skipped(tmp_path, with_index):
+    path = str(tmp_path / 'records.bin')
+    _write(path, 10)  # Frames of 4, 4 and 2 records.
+    with open(path, 'rb+') as f:
+        f.truncate(os.path.getsize(path) - 3)
+    if not with_index:
+        os.remove(path + INDEX_SUFFIX)
+    reader = RecordReader(path)
+    assert [r.time for r in reader] == [float(i) for i in range(8)]
+    with pytest.raises(IndexError):
+        reader[9]
+    reader.close()
+
+
+def test_scan_resynchronizes_after_corrupted_bytes(tmp_path):
+    path = str(tmp_path / 'records.bin')
+    _write(path, 8)
+    with open(path, 'rb') as f:
+        data = f.read()
+    # Garbage in front of the second frame: the scan finds its magic again.
+    second = data.index(b'TZRC', 1)
+    with open(path, 'wb') as f:
+        f.write(data[:second] + b'garbage' + data[second:])
+    os.remove(path + INDEX_SUFFIX)
+    reader = RecordReader(path)
+    assert [r.time for r in reader] == [float(i) for i in range(8)]
+    reader.close()
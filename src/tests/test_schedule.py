@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from tzer.tir.schedule import FenwickSampler
+
+
+def _frequencies(sampler: FenwickSampler, n_samples: int = 40000):
+    counts = [0] * len(sampler)
+    for _ in range(n_samples):
+        counts[sampler.sample()] += 1
+    return [c / n_samples for c in counts]
+
+
+def test_fenwick_sampling_distribution():
+    random.seed(0)
+    weights = [1., 2., 0., 4., 1.]
+    sampler = FenwickSampler(weights)
+    assert sampler.total() == pytest.approx(sum(weights))
+    for freq, weight in zip(_frequencies(sampler), weights):
+        assert freq == pytest.approx(weight / sum(weights), abs=0.01)
+
+
+def test_fenwick_update_and_append():
+    random.seed(0)
+    sampler = FenwickSampler()
+    for weight in [1., 1., 1.]:
+        sampler.append(weight)
+    sampler.update(0, 0.)
+    sampler.update(2, 3.)
+    sampler.append(4.)
+    weights = [0., 1., 3., 4.]
+    assert sampler.total() == pytest.approx(sum(weights))
+    for i in range(1, len(weights) + 1):
+        assert sampler._prefix(i) == pytest.approx(sum(weights[:i]))
+    freqs = _frequencies(sampler)
+    assert freqs[0] == 0
+    for freq, weight in zip(freqs, weights):
+        assert freq == pytest.approx(weight / sum(weights), abs=0.01)
@@ -1 +1 @@
-from . import visit, config, error, fuzz, report, seed, util
+from . import visit, config, error, fuzz, parallel, report, seed, util
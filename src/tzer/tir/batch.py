@@ -0,0 +1,251 @@
+"""Build several tests in one process (`--batch-size`).
+
+Each test of a batch is lowered with its own passes, between a `coverage.push` (followed by
+a reset) and a `coverage.pop`, so its coverage is attributed to it alone and written to its
+own shared region. The lowered functions are then built together as one `IRModule`, so that
+the LLVM target initialization, code generation and linking of a process are paid once per
+batch instead of once per test. The coverage of this joint build cannot be told apart per
+test and is reported in a separate region.
+
+A batch may crash, hang or fail in its joint build. The culprit is then isolated by the
+fuzzer (see `Fuzzer.build_batch`): a test that brought the batch down while being lowered is
+built alone, while a failed joint build is bisected. Tests are built alone (with the classic
+single-test path) in the end, so bugs are classified and reported as without batching.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import os
+import time
+
+import numpy as np
+import tvm
+from tvm import tir
+
+from .hitmap import SharedHitmap
+from .novelty import NoveltyIndex, TestCoverage
+from .oracle import BuildStage, tir_primfunc_to_mod, __USE_PASS__
+from .sandbox import BuildMonitor, ResourceLimits
+
+try:
+    from tvm.contrib import coverage
+except Exception as e:
+    print(f'No coverage in linked TVM. {e}')
+
+# Key of the index of the test being lowered (or the number of tests for the joint build),
+# forwarded to the parent as it changes.
+BATCH_INDEX = 'batch_index'
+
+
+@dataclass
+class BatchJob:
+    func: tir.PrimFunc
+    passes: list
+    pass_keys: Optional[list] = None
+    node_size: Optional[int] = None
+    timeout: float = 0
+    index: int = 0  # Position in the batch given to `Fuzzer.build_batch`.
+
+
+@dataclass
+class BatchOutcome:
+    """What `build_and_test_in_process` would have left in `d` for the test, with the
+    test's own hitmap."""
+    d: dict
+    hitmap: Optional[np.ndarray]
+    build_time: float
+    cpu_time: Optional[float] = None
+
+
+@dataclass
+class BatchRun:
+    # Outcomes of the lowered tests (empty if the batch crashed or hung).
+    outcomes: List[BatchOutcome] = field(default_factory=list)
+    finished: bool = False              # The joint build succeeded.
+    culprit: Optional[int] = None       # Test being lowered when the batch crashed or hung.
+    joint_hitmap: Optional[np.ndarray] = None
+
+
+class BatchHitmaps:
+    """Shared regions of the tests of a batch and of its joint build."""
+
+    def __init__(self) -> None:
+        self.tests: List[SharedHitmap] = []
+        self.joint = SharedHitmap()
+
+    def reserve(self, n: int):
+        while len(self.tests) < n:
+            self.tests.append(SharedHitmap())
+
+    def clear(self, n: int):
+        for region in self.tests[:n]:
+            region.clear()
+        self.joint.clear()
+
+
+_batch_hitmaps: Dict[int, BatchHitmaps] = {}
+
+
+def batch_hitmaps(n: int) -> BatchHitmaps:
+    """The regions (for at least `n` tests) that children of the current process report the
+    coverage of batches with. As with `shared_hitmap`, regions are per process."""
+    pid = os.getpid()
+    if pid not in _batch_hitmaps:
+        _batch_hitmaps[pid] = BatchHitmaps()
+    _batch_hitmaps[pid].reserve(n)
+    return _batch_hitmaps[pid]
+
+
+def _lower(func: tir.PrimFunc, passes: list, use_cov: bool, novelty: Optional[NoveltyIndex],
+           r: dict) -> tvm.ir.IRModule:
+    mod = tir_primfunc_to_mod(func)
+    if not __USE_PASS__:
+        return mod
+    useless_pass_idx = []
+    r['useless_pass_idx'] = useless_pass_idx
+    if use_cov:
+        cov = TestCoverage(novelty)
+        last_cov = cov.get_now()
+    with tvm.transform.PassContext(opt_level=4):
+        for idx, single_pass in enumerate(passes):
+            mod = tvm.transform.Sequential([single_pass], opt_level=4)(mod)
+            if use_cov:
+                cur_cov = cov.get_now()
+                if last_cov == cur_cov:
+                    useless_pass_idx.append(idx)
+                last_cov = cur_cov
+    return mod
+
+
+def _joint_module(lowered: List[tvm.ir.IRModule]) -> tvm.ir.IRModule:
+    functions = {}
+    for test_idx, mod in enumerate(lowered):
+        for gv, func in mod.functions.items():
+            name = f'{gv.name_hint}_{test_idx}'
+            functions[name] = func.with_attr('global_symbol', name)
+    return tvm.ir.IRModule(functions)
+
+
+def build_batch_in_process(
+    jobs: List[BatchJob],
+    use_cov: bool,
+    d: dict,
+    regions: Optional[BatchHitmaps] = None,
+    novelty: Optional[NoveltyIndex] = None,
+    limits: Optional[ResourceLimits] = None,
+):
+    """Lower each test of `jobs` and build them together in the calling process.
+
+    Meant to be called inside a disposable (sub)process or a fork-server worker. The result
+    of each test is left in `d['results']` and `d['finished']` tells if the joint build
+    succeeded. With `use_cov`, the hitmap of the i-th test is written to `regions.tests[i]`
+    and the one of the joint build to `regions.joint`.
+    """
+    assert not use_cov or novelty is not None, 'Batches need a novelty index'
+    if limits is not None:
+        limits.apply()
+    results = []
+    lowered = []
+    for test_idx, job in enumerate(jobs):
+        d[BATCH_INDEX] = test_idx
+        r = {'stage': BuildStage.COMPILE_OPT}
+        t0, c0 = time.time(), time.process_time()
+        if use_cov:
+            coverage.push()
+            coverage.reset()
+        try:
+            lowered.append(_lower(job.func, job.passes, use_cov, novelty, r))
+        except AssertionError as e:
+            raise e
+        except Exception as e:
+            r['exc'] = e
+        finally:
+            if use_cov:
+                regions.tests[test_idx].dump()
+                coverage.pop()
+        r['build_time'] = time.time() - t0
+        r['cpu_time'] = time.process_time() - c0
+        results.append(r)
+
+    d[BATCH_INDEX] = len(jobs)
+    finished = True
+    if lowered:
+        t0, c0 = time.time(), time.process_time()
+        if use_cov:
+            coverage.push()
+            coverage.reset()
+        try:
+            with tvm.transform.PassContext(opt_level=4 if __USE_PASS__ else 0):
+                tvm.build(_joint_module(lowered))
+        except Exception:
+            finished = False
+        finally:
+            if use_cov:
+                regions.joint.dump()
+                coverage.pop()
+        joint_time = (time.time() - t0) / len(lowered)
+        joint_cpu_time = (time.process_time() - c0) / len(lowered)
+        for r in results:
+            if 'exc' not in r:
+                r['build_time'] += joint_time
+                r['cpu_time'] += joint_cpu_time
+                if finished:
+                    r['stage'] = BuildStage.FINISHED
+    d['results'] = results
+    d['finished'] = finished
+
+
+def batch_process_main(conn, jobs: List[BatchJob], use_cov: bool, regions: Optional[BatchHitmaps],
+                       novelty: Optional[NoveltyIndex], limits: Optional[ResourceLimits]):
+    """Entry of a one-off batch process reporting to `conn` (see `receive_batch`)."""
+    d = _IndexReporter(conn)
+    build_batch_in_process(jobs, use_cov, d, regions, novelty, limits)
+    conn.send(('done', dict(d)))
+
+
+class _IndexReporter(dict):
+    def __init__(self, conn) -> None:
+        super().__init__()
+        self.conn = conn
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        if key == BATCH_INDEX:
+            self.conn.send((key, value))
+
+
+def receive_batch(conn, monitor: BuildMonitor) -> dict:
+    """[Parent] Wait for a batch process until it reports its results, crashes or times out.
+    In the last two cases, only `d[BATCH_INDEX]` (if any) is set."""
+    d: dict = {}
+    try:
+        while not monitor.expired():
+            if not conn.poll(monitor.POLL_INTERVAL):
+                continue
+            msg, payload = conn.recv()
+            if msg == BATCH_INDEX:
+                d[BATCH_INDEX] = payload
+            else:
+                return payload
+    except (EOFError, ConnectionError):
+        pass
+    return d
+
+
+def collect_batch(d: dict, n_jobs: int, regions: Optional[BatchHitmaps] = None) -> BatchRun:
+    """[Parent] Turn what a batch process left in `d` into a `BatchRun`. Hitmaps are copied
+    out of the regions, which are reused by the next batch."""
+    if 'results' not in d:
+        culprit = d.get(BATCH_INDEX, 0)
+        return BatchRun(culprit=culprit if culprit < n_jobs else None)
+    outcomes = []
+    for test_idx, r in enumerate(d['results']):
+        hitmap = None
+        if regions is not None and regions.tests[test_idx].now >= 0:
+            hitmap = regions.tests[test_idx].hitmap.copy()
+        outcomes.append(BatchOutcome(d=r, hitmap=hitmap, build_time=r['build_time'],
+                                     cpu_time=r.get('cpu_time')))
+    joint_hitmap = None
+    if regions is not None and regions.joint.now >= 0:
+        joint_hitmap = regions.joint.hitmap.copy()
+    return BatchRun(outcomes=outcomes, finished=d['finished'], joint_hitmap=joint_hitmap)
@@ -0,0 +1,80 @@
+"""Content-addressed cache of build outcomes.
+
+Mutators often return an unchanged or structurally identical `PrimFunc` (e.g., when no
+mutator applies or when the IR of a seed is reused after too many IR failures). Building it
+again with the same passes gives the same outcome and hits no new edge, so the outcome is
+looked up by (structural hash of the function, keys of the concretized passes) instead.
+
+Entries live in a bounded in-memory LRU and, optionally, in an on-disk tier.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, List, Optional, Tuple
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import tvm
+from tvm import tir
+
+
+@dataclass
+class CachedOutcome:
+    compiled: Optional[bool]
+    exception: Optional[str]    # Name of the bug class found by the first build, if any.
+    cov_increase: int           # Coverage increase of the first build.
+    useful_pass_mask: np.ndarray
+
+
+class BuildCache:
+    def __init__(self, capacity: int, folder: Optional[str] = None) -> None:
+        self.capacity = capacity
+        self.entries: 'OrderedDict[Tuple[int, tuple], CachedOutcome]' = OrderedDict()
+        self.folder = folder
+        if self.folder is not None:
+            os.makedirs(self.folder, exist_ok=True)
+        self.n_lookup = 0
+        self.n_hit = 0
+
+    @staticmethod
+    def key(func: tir.PrimFunc, pass_keys: Optional[List[Hashable]]) -> Tuple[int, tuple]:
+        return tvm.ir.structural_hash(func), tuple(pass_keys or [])
+
+    def _path(self, key: Tuple[int, tuple]) -> str:
+        digest = hashlib.md5(repr(key[1]).encode()).hexdigest()
+        return os.path.join(self.folder, f'{key[0]:x}-{digest}.pkl')
+
+    def get(self, key: Tuple[int, tuple]) -> Optional[CachedOutcome]:
+        self.n_lookup += 1
+        outcome = self.entries.get(key)
+        if outcome is not None:
+            self.entries.move_to_end(key)
+        elif self.folder is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), 'rb') as f:
+                outcome = pickle.load(f)
+            self._put_in_memory(key, outcome)
+        if outcome is not None:
+            self.n_hit += 1
+        return outcome
+
+    def __contains__(self, key: Tuple[int, tuple]) -> bool:
+        """Like `get`, but without counting as a lookup."""
+        return key in self.entries or \
+            self.folder is not None and os.path.exists(self._path(key))
+
+    def _put_in_memory(self, key: Tuple[int, tuple], outcome: CachedOutcome):
+        self.entries[key] = outcome
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def put(self, key: Tuple[int, tuple], outcome: CachedOutcome):
+        self._put_in_memory(key, outcome)
+        if self.folder is not None:
+            with open(self._path(key), 'wb') as f:
+                pickle.dump(outcome, f)
+
+    def hit_rate(self) -> float:
+        return self.n_hit / self.n_lookup if self.n_lookup else 0.
@@ -3,6 +3,10 @@ import os
 from typing import Union, Optional
 from dataclasses import dataclass
 from . import util
+from .executor import EXECUTORS
+from .oracle import NOPT_BUILDS
+from .schedule import SCHEDULES
+from .prevalidate import PREVALIDATE_MODES
 
 
 @dataclass
@@ -24,12 +28,35 @@ class Config:
     use_none: bool
     diff_test_rounds: int
     report_folder: Optional[str]
+    executor: str = 'process'
+    n_workers: int = 1
+    scheduler: str = 'uniform'
+    cull_interval: int = 0
+    max_memory_in_mb: Optional[float] = None
+    pass_cache_in_mb: float = 256
+    build_cache_size: int = 0
+    build_cache_dir: Optional[str] = None
+    ref_cache_size: int = 0
+    timeout_quantile: float = 0
+    timeout_margin: float = 0.5
+    mem_limit_in_mb: Optional[float] = None
+    cpu_limit_in_seconds: Optional[float] = None
+    fsize_limit_in_mb: Optional[float] = None
+    batch_size: int = 1
+    pipeline_depth: int = 0
+    prevalidate: str = 'off'
+    predict_top: float = 1.
+    nopt_build: str = 'sequential'
 
     def __post_init__(self):
         if self.fuzzing_time_in_minutes is None and self.iterations is None \
                 or self.fuzzing_time_in_minutes is not None and self.iterations is not None:
             raise AssertionError(
                 'Either fuzzing time or fuzzing iterations (not both) should be provided')
+        if self.n_workers < 1:
+            raise AssertionError('At least one fuzzing worker is needed')
+        if not 0 < self.predict_top <= 1:
+            raise AssertionError('The fraction of mutants to build should be in (0, 1]')
         if not self.use_coverage:
             self.use_coverage_feedback = False
 
@@ -54,6 +81,48 @@ def make_arg_parser() -> argparse.ArgumentParser:
                         help='Maximum rounds for differential testing')
     parser.add_argument('--report-folder', nargs='?',
                         type=str, help='Path to store fuzzing data')
+    parser.add_argument('--executor', nargs='?', type=str, default='process',
+                        choices=list(EXECUTORS.keys()),
+                        help='How to run builds: a fresh process per test or a persistent fork-server')
+    parser.add_argument('--workers', nargs='?', type=int, default=1,
+                        help='Number of fuzzing worker processes sharing one seed pool')
+    parser.add_argument('--scheduler', nargs='?', type=str, default='uniform',
+                        choices=list(SCHEDULES.keys()),
+                        help='Power schedule deciding how often each seed is picked')
+    parser.add_argument('--cull-interval', nargs='?', type=int, default=0,
+                        help='Iterations between two cullings of the seed pool (0 to disable)')
+    parser.add_argument('--max-memory', nargs='?', type=float,
+                        help='Memory (RSS in MB) above which the seed pool is culled')
+    parser.add_argument('--pass-cache', nargs='?', type=float, default=256,
+                        help='Memory in MB to cache modules after pass prefixes (fork-server only; 0 to disable)')
+    parser.add_argument('--build-cache', nargs='?', type=int, default=0,
+                        help='Number of build outcomes cached by structural hash (0 to disable)')
+    parser.add_argument('--build-cache-dir', nargs='?', type=str,
+                        help='Folder to also keep cached build outcomes on disk (e.g., across runs)')
+    parser.add_argument('--ref-cache', nargs='?', type=int, default=0,
+                        help='Number of functions whose unoptimized builds and outputs are reused in differential testing (0 to disable)')
+    parser.add_argument('--timeout-quantile', nargs='?', type=float, default=0,
+                        help='Quantile of similar tests\' build times used as the build timeout (0 to always use --build-timeout)')
+    parser.add_argument('--timeout-margin', nargs='?', type=float, default=0.5,
+                        help='Seconds added to the learned build timeout')
+    parser.add_argument('--mem-limit', nargs='?', type=float,
+                        help='Address space in MB a build process may use (larger builds are reported as out of memory)')
+    parser.add_argument('--cpu-limit', nargs='?', type=float,
+                        help='CPU seconds a build may use before being killed (a fallback to the build timeout)')
+    parser.add_argument('--fsize-limit', nargs='?', type=float,
+                        help='Size in MB of files a build process may write')
+    parser.add_argument('--batch-size', nargs='?', type=int, default=1,
+                        help='Number of mutants built together in one process (1 to disable; not with differential testing)')
+    parser.add_argument('--pipeline-depth', nargs='?', type=int, default=0,
+                        help='Number of mutants made ahead while building (0 to disable)')
+    parser.add_argument('--prevalidate', nargs='?', type=str, default='off',
+                        choices=PREVALIDATE_MODES,
+                        help='Reject ill-formed mutants without building them (`verify` to still build them and count false rejects)')
+    parser.add_argument('--predict-top', nargs='?', type=float, default=1.,
+                        help='Fraction of each batch to build, ranked by the predicted chance to compile (1 to disable; with --batch-size)')
+    parser.add_argument('--nopt-build', nargs='?', type=str, default='sequential',
+                        choices=NOPT_BUILDS,
+                        help='Compile the non-opt. module of differential tests concurrently with the optimized one or before it')
     return parser
 
 
@@ -77,4 +146,23 @@ def config_from_args(args) -> Config:
             'CONTROL') is not None,
         diff_test_rounds=args.diff_test_rounds,
         report_folder=args.report_folder,
+        executor=args.executor,
+        n_workers=args.workers,
+        scheduler=args.scheduler,
+        cull_interval=args.cull_interval,
+        max_memory_in_mb=args.max_memory,
+        pass_cache_in_mb=args.pass_cache,
+        build_cache_size=args.build_cache,
+        build_cache_dir=args.build_cache_dir,
+        ref_cache_size=args.ref_cache,
+        timeout_quantile=args.timeout_quantile,
+        timeout_margin=args.timeout_margin,
+        mem_limit_in_mb=args.mem_limit,
+        cpu_limit_in_seconds=args.cpu_limit,
+        fsize_limit_in_mb=args.fsize_limit,
+        batch_size=args.batch_size,
+        pipeline_depth=args.pipeline_depth,
+        prevalidate=args.prevalidate,
+        predict_top=args.predict_top,
+        nopt_build=args.nopt_build,
     )
@@ -0,0 +1,73 @@
+"""Bound the memory of the joint seed pool in long campaigns.
+
+Like AFL's culling, each edge has a top-rated seed, i.e., the cheapest seed (by node size
+times build time) hitting it. A greedy set cover over the top-rated seeds gives a small set
+of favored seeds covering all edges seen so far. Seeds that are not favored are spilled to
+an on-disk corpus and reloaded lazily.
+"""
+
+from typing import Dict, List, Optional
+import os
+import random
+
+import dill as pickle
+import numpy as np
+
+
+def seed_cost(seed) -> float:
+    return float(seed.node_size or 1) * float(seed.build_time or 1)
+
+
+class SeedCorpus:
+    def __init__(self, folder: str, n_edges: int) -> None:
+        self.folder = folder
+        os.makedirs(self.folder, exist_ok=True)
+        self.n_edges = n_edges
+        self.top_id = np.full(n_edges, -1, dtype=np.int64)
+        self.top_cost = np.full(n_edges, np.inf, dtype=np.float64)
+        self.spilled: Dict[int, str] = {}  # Seed id -> path
+
+    def _hit(self, seed) -> np.ndarray:
+        return np.unpackbits(seed.edges, count=self.n_edges).astype(bool)
+
+    def observe(self, seed):
+        """A new seed (with its edges) is put into the pool."""
+        cost = seed_cost(seed)
+        better = np.logical_and(self._hit(seed), cost < self.top_cost)
+        self.top_cost[better] = cost
+        self.top_id[better] = seed.id
+
+    def favored(self, in_memory: Dict[int, 'JointSeed'], load) -> List['JointSeed']:
+        """Greedy set cover: walk through uncovered edges and take their top-rated seeds.
+        Favored seeds that were spilled are loaded back by `load`."""
+        uncovered = self.top_id >= 0
+        favored = []
+        while True:
+            edge = int(np.argmax(uncovered))
+            if not uncovered[edge]:
+                break
+            seed_id = int(self.top_id[edge])
+            seed = in_memory[seed_id] if seed_id in in_memory else load(seed_id)
+            favored.append(seed)
+            np.logical_and(uncovered, np.logical_not(self._hit(seed)), out=uncovered)
+        return favored
+
+    def spill(self, seed, pass_names: List[str]):
+        path = os.path.join(self.folder, f'{seed.id}.pkl')
+        with open(path, 'wb') as f:
+            pickle.dump({'seed': seed, 'pass_names': pass_names},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled[seed.id] = path
+
+    def load(self, seed_id: int):
+        """Returns the spilled seed and the names of its passes."""
+        path = self.spilled.pop(seed_id)
+        with open(path, 'rb') as f:
+            record = pickle.load(f)
+        os.remove(path)
+        return record['seed'], record['pass_names']
+
+    def random_spilled_id(self) -> Optional[int]:
+        if not self.spilled:
+            return None
+        return random.choice(list(self.spilled.keys()))
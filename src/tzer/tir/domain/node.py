@@ -2,10 +2,10 @@ from random import randint
 import tvm
 from tzer import tir
 from . import construct as cons
-from typing import Any, Optional, List, Union
-from tzer.tir import util, visit
+from typing import Any, Iterator, Optional, List, Tuple, Union
+from tzer.tir import visit
 from dataclasses import dataclass
-from ..visit import get_free_vars, rebind_buffer_var
+from ..visit import get_free_vars, get_lvalue_vars, rebind_buffer_var
 
 Component = Union[tvm.ir.Node, Any]
 
@@ -27,11 +27,20 @@ class LazyDomNode:
     def make_nonleaf(dom: cons.Dom, cons: cons.Cons, children: List['LazyDomNode']) -> 'LazyDomNode':
         return LazyDomNode(dom, cons, None, children)
 
+    def iter_nodes(self) -> Iterator['LazyDomNode']:
+        """Nodes of the tree in post-order (children before their parent), streamed."""
+        stack: List[Tuple['LazyDomNode', bool]] = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded or node.is_leaf:
+                yield node
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+
     @property
     def all_nodes(self) -> List['LazyDomNode']:
-        return [self] if self.is_leaf else util.list_union([
-            *[child.all_nodes for child in self.children], [self]
-        ])
+        return list(self.iter_nodes())
 
     @property
     def all_child_nodes(self) -> List['LazyDomNode']:
@@ -82,19 +91,10 @@ class LazyDomNode:
         fvars = get_free_vars(self.value.body)
 
         # Find out lvalue of free variables
-        lvars = []
-        def find_lvalue(stmt):
-            nonlocal lvars
-            if isinstance(stmt, tvm.tir.Store):
-                lvars.append(stmt.buffer_var)
-            elif isinstance(stmt, tvm.tir.LetStmt):
-                lvars.append(stmt.var)
-            elif isinstance(stmt, tvm.tir.For):
-                lvars.append(stmt.loop_var)
-
-        tvm.tir.stmt_functor.post_order_visit(self.value.body, find_lvalue)
+        lvars = get_lvalue_vars(self.value.body)
 
         # FIXME(Jiawei): Constize variable often leads to grammar error. 
+        consts = []
         for v in fvars:
             if v in lvars:
                 continue
@@ -106,7 +106,9 @@ class LazyDomNode:
             else:
                 continue
                 # raise NotImplementedError(f"Tzer does not model var type in `{v.dtype}`")
-            self.value = visit.swap_tir(self.value, v, tvm.tir.const(value=cval, dtype=v.dtype))
+            consts.append((v, tvm.tir.const(value=cval, dtype=v.dtype)))
+        if consts:
+            self.value = visit.swap_tir_many(self.value, consts)
 
 
     def semantic_validation(self) -> tvm.tir.PrimFunc:
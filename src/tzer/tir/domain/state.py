@@ -38,10 +38,14 @@ class State:
         # Additional conss and values by seeds
         for seed in seeds:
             seed_node = laze(seed)
-            for node in seed_node.all_nodes:
+            # Sizes of the subtrees by node id (nodes are unhashable), filled in post-order.
+            sizes: Dict[int, int] = {}
+            for node in seed_node.iter_nodes():
+                size = 1 if node.is_leaf else 1 + sum(sizes[id(child)] for child in node.children)
+                sizes[id(node)] = size
                 if not node.dom in self.data:
                     self.data[node.dom] = DomState([], set())
-                if max_node_size is None or len(node.all_nodes) < max_node_size:
+                if max_node_size is None or size < max_node_size:
                     self.data[node.dom].values.append(node.get())
                 self.no_empty_dom.add(node.dom)
                 if not node.is_leaf:
@@ -18,3 +18,7 @@ class RuntimeFailure(Exception):
 
 class MaybeDeadLoop(Exception):
     pass
+
+
+class OutOfMemory(Exception):
+    pass
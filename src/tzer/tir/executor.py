@@ -0,0 +1,399 @@
+"""Executors that run `oracle.build_and_test`-like jobs out of the fuzzer process.
+
+- `ProcessExecutor`: the classic path, i.e., one `mp.Manager` + one `mp.Process` per test;
+- `ForkServerExecutor`: a long-lived worker (with `tvm` imported and LLVM warmed up) that
+  receives jobs over a pipe and is only respawned after a crash or a timeout. It also keeps
+  a `PassPrefixCache` across tests.
+
+Both keep a `ReferenceCache` of the unoptimized side of differential tests, and can build
+a batch of tests in one process (see `batch`).
+
+Both report coverage back through the shared hitmap of `hitmap.shared_hitmap()`, and can run
+one test in the background (`submit` then `wait`) while the fuzzer does something else.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+import multiprocessing as mp
+import time
+
+import tvm
+from tvm import tir
+
+from . import oracle, error
+from .batch import (BATCH_INDEX, BatchJob, BatchRun, batch_hitmaps, batch_process_main,
+                    build_batch_in_process, collect_batch, receive_batch)
+from .oracle import BuildStage
+from .hitmap import SharedHitmap, shared_hitmap
+from .novelty import NoveltyIndex
+from .pass_cache import PassPrefixCache
+from .ref_cache import ReferenceCache
+from .sandbox import BuildMonitor, ResourceLimits, cpu_limit_exceeded
+
+try:
+    from tvm.contrib import coverage
+except Exception as e:
+    print(f'No coverage in linked TVM. {e}')
+
+
+class Executor:
+    # Wall time when the last waited test ended (see `wait`).
+    end_time: Optional[float] = None
+    # CPU time that the last waited test used, as its build timeout is checked against (see
+    # `BuildMonitor.elapsed`). None if unknown.
+    cpu_time: Optional[float] = None
+
+    def build_and_test(
+        self,
+        func: tir.PrimFunc,
+        passes: List[tvm.ir.transform.Pass],
+        build_timeout: float,
+        diff_test_round: int,
+        use_cov: bool,
+        useful_pass_mask=None,
+        novelty: Optional[NoveltyIndex] = None,
+        pass_keys: Optional[list] = None
+    ):
+        raise NotImplementedError
+
+    def submit(self, func, passes, build_timeout, diff_test_round, use_cov, useful_pass_mask=None, novelty=None, pass_keys=None):
+        """Start building a test in the background. At most one test is in flight."""
+        self.pending = (func, passes, build_timeout, diff_test_round, use_cov,
+                        useful_pass_mask, novelty, pass_keys)
+
+    def wait(self):
+        """Wait for the submitted test, raising as `build_and_test`, and set `end_time` and
+        `cpu_time`."""
+        args, self.pending = self.pending, None
+        t0 = time.process_time()
+        try:
+            self.build_and_test(*args)
+        finally:
+            self.end_time = time.time()
+            self.cpu_time = time.process_time() - t0
+
+    def build_batch(
+        self,
+        jobs: List[BatchJob],
+        build_timeout: float,
+        use_cov: bool,
+        novelty: Optional[NoveltyIndex] = None
+    ) -> BatchRun:
+        """Lower `jobs` and build them together in one process within `build_timeout`
+        seconds (of CPU time) in total."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def _make_ref_cache(ref_cache_size: int) -> Optional[ReferenceCache]:
+    return ReferenceCache(ref_cache_size) if ref_cache_size > 0 else None
+
+
+class ProcessExecutor(Executor):
+    """Spawn a fresh process for each test. Pass prefixes cannot be cached, but references
+    of differential tests are (as processes are forked from the executor)."""
+
+    def __init__(self, pass_cache_in_mb: float = 0, ref_cache_size: int = 0,
+                 limits: Optional[ResourceLimits] = None, concurrent_nopt: bool = False) -> None:
+        self.ref_cache = _make_ref_cache(ref_cache_size)
+        self.limits = limits
+        self.concurrent_nopt = concurrent_nopt
+        self.in_flight: Optional[oracle.BuildProcess] = None
+
+    def build_and_test(self, func, passes, build_timeout, diff_test_round, use_cov, useful_pass_mask=None, novelty=None, pass_keys=None):
+        self.submit(func, passes, build_timeout, diff_test_round, use_cov, useful_pass_mask,
+                    novelty, pass_keys)
+        self.wait()
+
+    def submit(self, func, passes, build_timeout, diff_test_round, use_cov, useful_pass_mask=None, novelty=None, pass_keys=None):
+        assert self.in_flight is None, 'A test is already in flight'
+        self.in_flight = oracle.BuildProcess(
+            func, passes, build_timeout, diff_test_round, use_cov, useful_pass_mask, novelty,
+            self.ref_cache, self.limits, self.concurrent_nopt)
+
+    def wait(self):
+        build, self.in_flight = self.in_flight, None
+        try:
+            build.wait()
+        finally:
+            self.end_time = build.end_time
+            self.cpu_time = build.cpu_time
+
+    def build_batch(self, jobs, build_timeout, use_cov, novelty=None):
+        regions = batch_hitmaps(len(jobs)) if use_cov else None
+        if regions is not None:
+            regions.clear(len(jobs))
+        parent_conn, child_conn = mp.Pipe()
+        p = mp.Process(target=batch_process_main, args=(
+            child_conn, jobs, use_cov, regions, novelty, self.limits))
+        try:
+            p.start()
+            child_conn.close()
+            d = receive_batch(parent_conn, BuildMonitor(p.pid, build_timeout))
+        finally:
+            if p.is_alive():
+                oracle.kill_process_tree(p.pid)
+                p.terminate()
+            p.join()
+            parent_conn.close()
+        return collect_batch(d, len(jobs), regions)
+
+    def close(self):
+        if self.ref_cache is not None:
+            self.ref_cache.close()
+
+
+# Keys of `d` that the parent needs when the worker crashes or hangs.
+_FORWARDED_KEYS = ('stage', 'nopt_pid', 'nopt_dir', BATCH_INDEX)
+
+
+class _StageReporter(dict):
+    """A dict that forwards stage updates to the parent as soon as they happen, so that
+    the parent still knows the stage when the worker crashes or hangs."""
+
+    def __init__(self, conn) -> None:
+        super().__init__()
+        self.conn = conn
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        if key in _FORWARDED_KEYS:
+            self.conn.send((key, value))
+
+
+def _warm_up(use_cov: bool):
+    """Initialize LLVM & the codegen once so that following builds don't pay for it."""
+    if use_cov:
+        now, hitmap = coverage.get_now(), coverage.get_hitmap()
+    try:
+        with tvm.transform.PassContext(opt_level=0):
+            tvm.build(oracle.tir_primfunc_to_mod(
+                tir.PrimFunc([], tir.Evaluate(tir.const(0)))))
+    except Exception:
+        pass
+    finally:
+        if use_cov:
+            # Warming up should not count as coverage of any test.
+            coverage.set_now(now)
+            coverage.set_hitmap(hitmap)
+
+
+def _fork_server_loop(conn, use_cov: bool, shared: Optional[SharedHitmap], novelty: Optional[NoveltyIndex],
+                      pass_cache_in_mb: float, ref_cache: Optional[ReferenceCache],
+                      limits: Optional[ResourceLimits], regions, concurrent_nopt: bool):
+    _warm_up(use_cov)
+    prefix_cache = PassPrefixCache(pass_cache_in_mb) if pass_cache_in_mb > 0 else None
+    conn.send(('ready', None))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        kind, args = job
+        d = _StageReporter(conn)
+        if kind == 'batch':
+            build_batch_in_process(args, use_cov, d, regions, novelty, limits)
+            conn.send(('done', dict(d)))
+            continue
+        func, passes, diff_test_round, pass_keys = args
+        # Hitmaps are written to `shared` only when the coverage grows.
+        oracle.no_exception_build_and_test_in_process(
+            func, passes, diff_test_round, use_cov, d, shared, novelty, pass_keys, prefix_cache,
+            ref_cache, limits, concurrent_nopt)
+        if ref_cache is not None and 'ref' in d:
+            ref_cache.put(*d['ref'])
+        conn.send(('done', dict(d)))
+
+
+@dataclass
+class _InFlight:
+    d: dict
+    monitor: BuildMonitor
+    build_timeout: float
+    use_cov: bool
+    useful_pass_mask: object
+    novelty: Optional[NoveltyIndex]
+    crashed: bool = False   # The worker was dead before receiving the test.
+
+
+class ForkServerExecutor(Executor):
+    """Reuse one pre-warmed worker process for consecutive tests.
+
+    The worker is forked from the fuzzer so it inherits the current coverage. It is killed
+    and re-forked (again inheriting the latest coverage) after it crashes or times out.
+    """
+
+    def __init__(self, pass_cache_in_mb: float = 0, ref_cache_size: int = 0,
+                 limits: Optional[ResourceLimits] = None, concurrent_nopt: bool = False) -> None:
+        self.pass_cache_in_mb = pass_cache_in_mb
+        self.limits = limits
+        self.concurrent_nopt = concurrent_nopt
+        # Also updated with the references sent back, so that a respawned worker keeps them.
+        self.ref_cache = _make_ref_cache(ref_cache_size)
+        self.process: Optional[mp.Process] = None
+        self.conn = None
+        self.use_cov = False
+        self.novelty: Optional[NoveltyIndex] = None
+        self.n_spawn = 0
+        self.n_batch_regions = 0  # Batch size that the worker has regions for.
+        self.in_flight: Optional[_InFlight] = None
+
+    def _spawn(self, use_cov: bool, novelty: Optional[NoveltyIndex], batch_size: int = 0):
+        # Regions must exist before forking to be shared with the worker.
+        regions = batch_hitmaps(batch_size) if use_cov else None
+        self.n_batch_regions = len(regions.tests) if regions is not None else float('inf')
+        parent_conn, child_conn = mp.Pipe()
+        self.process = mp.Process(
+            target=_fork_server_loop,
+            args=(child_conn, use_cov, shared_hitmap() if use_cov else None, novelty,
+                  self.pass_cache_in_mb, self.ref_cache, self.limits, regions, self.concurrent_nopt),
+            daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.use_cov = use_cov
+        self.novelty = novelty
+        self.n_spawn += 1
+        msg, _ = self.conn.recv()
+        assert msg == 'ready'
+
+    def _kill(self) -> Optional[int]:
+        """Returns the exit code of the worker."""
+        exitcode = None
+        if self.process is not None:
+            if self.process.is_alive():
+                oracle.kill_process_tree(self.process.pid)
+                self.process.terminate()
+            self.process.join()
+            exitcode = self.process.exitcode
+            self.process = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        return exitcode
+
+    def _ensure_worker(self, use_cov: bool, novelty: Optional[NoveltyIndex], batch_size: int = 0):
+        if self.process is None or not self.process.is_alive() or \
+                self.use_cov != use_cov or self.novelty is not novelty or \
+                batch_size > self.n_batch_regions:
+            self._kill()
+            self._spawn(use_cov, novelty, batch_size)
+
+    def build_and_test(self, func, passes, build_timeout, diff_test_round, use_cov, useful_pass_mask=None, novelty=None, pass_keys=None):
+        self.submit(func, passes, build_timeout, diff_test_round, use_cov, useful_pass_mask,
+                    novelty, pass_keys)
+        self.wait()
+
+    def submit(self, func, passes, build_timeout, diff_test_round, use_cov, useful_pass_mask=None, novelty=None, pass_keys=None):
+        assert self.in_flight is None, 'A test is already in flight'
+        self._ensure_worker(use_cov, novelty)
+
+        if use_cov:
+            shared_hitmap().clear()
+        if novelty is not None:
+            novelty.forget_last()
+
+        # Timeouts are in CPU time (see `BuildMonitor`).
+        self.in_flight = _InFlight(
+            d={'stage': BuildStage.COMPILE_NOPT},
+            monitor=BuildMonitor(self.process.pid, build_timeout),
+            build_timeout=build_timeout,
+            use_cov=use_cov,
+            useful_pass_mask=useful_pass_mask,
+            novelty=novelty)
+        try:
+            self.conn.send(('test', (func, passes, diff_test_round, pass_keys)))
+        except (BrokenPipeError, ConnectionError):
+            self.in_flight.crashed = True
+
+    def wait(self):
+        job, self.in_flight = self.in_flight, None
+        d, monitor, build_timeout = job.d, job.monitor, job.build_timeout
+        use_cov, useful_pass_mask, novelty = job.use_cov, job.useful_pass_mask, job.novelty
+        crashed = job.crashed
+        finished = False
+        dead = True
+        exitcode = None
+        try:
+            while not crashed and not monitor.expired():
+                if not self.conn.poll(monitor.POLL_INTERVAL):
+                    continue
+                msg, payload = self.conn.recv()
+                if msg in _FORWARDED_KEYS:
+                    d[msg] = payload
+                else:
+                    d = payload
+                    finished = True
+                    dead = False
+                    break
+        except (EOFError, ConnectionError):
+            crashed = True
+        finally:
+            self.end_time = d.get('end_time', time.time())
+            if finished:
+                monitor.update()  # The worker is idle again.
+                self.cpu_time = monitor.elapsed()
+            else:
+                p_duration = self.cpu_time = monitor.elapsed()
+                exitcode = self._kill()
+                if crashed and cpu_limit_exceeded(exitcode):
+                    crashed = False
+                    p_duration = self.cpu_time = build_timeout
+                dead = oracle.settle_concurrent_nopt(d, True, build_timeout - p_duration)
+                if not crashed and dead and oracle.is_dead_loop(d, p_duration, build_timeout):
+                    raise error.MaybeDeadLoop
+
+        if use_cov:
+            if novelty is not None:
+                oracle.sync_novelty(d, shared_hitmap(), novelty, useful_pass_mask)
+            else:
+                oracle.sync_coverage(d, shared_hitmap(), useful_pass_mask)
+
+        if self.ref_cache is not None and 'ref' in d:
+            self.ref_cache.put(*d['ref'])
+
+        if dead and crashed and monitor.out_of_memory(exitcode, self.limits):
+            raise error.OutOfMemory(
+                f'Exit code {exitcode}, peak memory {monitor.peak_memory / 2 ** 20:.0f} MB')
+
+        oracle.check_outcome(d, crashed=dead)
+
+    def build_batch(self, jobs, build_timeout, use_cov, novelty=None):
+        self._ensure_worker(use_cov, novelty, len(jobs))
+        regions = batch_hitmaps(len(jobs)) if use_cov else None
+        if regions is not None:
+            regions.clear(len(jobs))
+        try:
+            self.conn.send(('batch', jobs))
+            d = receive_batch(self.conn, BuildMonitor(self.process.pid, build_timeout))
+        except (BrokenPipeError, ConnectionError):
+            d = {}
+        if 'results' not in d:
+            # Crashed or hung.
+            self._kill()
+        return collect_batch(d, len(jobs), regions)
+
+    def close(self):
+        if self.process is not None and self.process.is_alive() and self.conn is not None:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, ConnectionError):
+                pass
+        self._kill()
+        if self.ref_cache is not None:
+            self.ref_cache.close()
+
+
+EXECUTORS = {
+    'process': ProcessExecutor,
+    'fork-server': ForkServerExecutor,
+}
+
+
+def make_executor(name: str, pass_cache_in_mb: float = 0, ref_cache_size: int = 0,
+                  limits: Optional[ResourceLimits] = None, concurrent_nopt: bool = False) -> Executor:
+    return EXECUTORS[name](pass_cache_in_mb, ref_cache_size, limits, concurrent_nopt)
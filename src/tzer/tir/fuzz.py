@@ -1,10 +1,13 @@
-from typing import Tuple
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
 import time
 import traceback
 import random
 import pickle
 import os
 
+import psutil
 from termcolor import colored
 from tqdm import tqdm
 import numpy as np
@@ -13,11 +16,21 @@ import tvm.testing
 from tvm import tir
 
 from . import report, error, seed, oracle
+from .executor import make_executor
+from .novelty import NoveltyIndex
+from .schedule import make_schedule
+from .corpus import SeedCorpus
+from .build_cache import BuildCache, CachedOutcome
+from .timeout import TimeoutModel
+from .prevalidate import Prevalidator
+from .predictor import ValidityPredictor
+from .sandbox import ResourceLimits
+from .batch import BatchJob, BatchOutcome
 from .config import Config
 from .pass_fuzz.pass_mutator import SimplePassMutator
 from .visit import get_node_size
-from .joint_seed_pool import JointSeedPool, __USE_RANDOM_PASS_GEN__, __USE_FULL_PASS__, __PASS_BASELINE_TESTING__
-from .pass_fuzz.pass_mutator import random_tir_passes, tir_pass_graph
+from .joint_seed_pool import JointSeed, JointSeedPool, __USE_RANDOM_PASS_GEN__, __USE_FULL_PASS__, __PASS_BASELINE_TESTING__
+from .pass_fuzz.pass_mutator import random_tir_passes, tir_pass_graph, concretize_tir_passes
 
 try:
     from tvm.contrib import coverage
@@ -29,6 +42,9 @@ except Exception as e:
 __MAX_TIR_FAIL__: int
 __MAX_PASS_FAIL__ = 1
 __MIN_SEED_POOL__ = 10
+__POOL_CHECK_INTERVAL__ = 100  # In iterations.
+__N_CALIBRATION_SEEDS__ = 64
+__PREDICT_EXPLORE__ = 0.05  # Chance to build a mutant of a batch not ranked in the top.
 
 def assert_no_cov(func, *args, **kwargs):
     if __USE_COV__:
@@ -38,6 +54,33 @@ def assert_no_cov(func, *args, **kwargs):
         after_cov = coverage.get_now()
         assert before_cov == after_cov, f'Statement {func} has coverage! {before_cov} -> {after_cov}'
 
+@dataclass
+class BuildResult:
+    compiled: Optional[bool]  # None if Tzer itself failed.
+    useful_pass_mask: np.ndarray
+    bug: Optional[Exception] = None
+    bug_params: Optional[list] = None
+    build_time: float = 0
+    # CPU time of the build, as its timeout is checked against (see `BuildMonitor.elapsed`).
+    cpu_time: Optional[float] = None
+    cached: bool = False  # The outcome is replayed from the build cache.
+    rejected: bool = False  # Found ill-formed by the pre-validator (only built to verify it).
+
+
+@dataclass
+class PendingBuild:
+    """A build started by `Fuzzer.submit_build`."""
+    result: BuildResult
+    t0: float
+    cache_key: Optional[Tuple[int, tuple]] = None
+    timeout: float = 0
+    node_size: Optional[int] = None
+    n_passes: int = 0
+    submitted: bool = False         # False if the result is already known (i.e., cached).
+    rejection: Optional[str] = None  # Why the pre-validator rejected the mutant.
+    error: Optional[Exception] = None
+
+
 class Fuzzer:
     def __init__(self, config: Config) -> None:
         self.config = config
@@ -54,9 +97,11 @@ class Fuzzer:
             seeds = []
             print(colored('Running experiments without seed.', 'yellow'))
 
+        self.novelty = None
         if self.config.use_coverage:
             # Reset coverage in the beginning to avoid influence on seed generation.
             coverage.reset()
+            self.novelty = NoveltyIndex()
 
         # self.state = domain.State(seeds, self.config.max_node_size)
 
@@ -67,61 +112,313 @@ class Fuzzer:
         self.iter = 0
         self.n_filtered_ast = 0
 
+        self.executor = self.new_executor()
+        self.build_cache = BuildCache(
+            self.config.build_cache_size, self.config.build_cache_dir) \
+            if self.config.build_cache_size > 0 else None
+        self.n_build_cache_hit = 0
+        self.prevalidator = Prevalidator(
+            self.config.prevalidate == 'verify', self.config.use_coverage) \
+            if self.config.prevalidate != 'off' else None
+        self.n_rejected = 0         # Mutants rejected by the pre-validator.
+        self.n_false_reject = 0     # Rejected mutants that compiled (`verify` mode).
+        self.predictor = ValidityPredictor() if self.config.predict_top < 1 else None
+        self.n_skipped = 0          # Mutants of batches not built as unlikely to compile.
+        self.n_batch = 0        # Batches run (including retries of isolation).
+        self.n_built_alone = 0  # Tests of batches that had to be built alone.
+        # Mutants ready to be built (see `fuzz_pipelined`). None for generation failures.
+        self.mutant_queue: Deque[Optional[tuple]] = deque()
+        self.queue_depth_sum = 0
+        self.stage_time = {'mutate': 0., 'build': 0., 'wait': 0., 'feedback': 0.}
+        self.timeout_model = TimeoutModel(
+            self.config.building_timeout_in_seconds,
+            self.config.timeout_quantile,
+            self.config.timeout_margin) if self.config.timeout_quantile > 0 else None
+
+        # Seeds (and their edges) are only tracked for culling.
+        self.culling = self.config.cull_interval > 0 or self.config.max_memory_in_mb is not None
+        corpus = None
+        if self.novelty is not None and self.culling:
+            corpus = SeedCorpus(os.path.join(
+                self.reporter.report_folder, 'corpus'), self.novelty.size)
+
         self.joint_seed_pool = JointSeedPool(
             tir_func_list=seeds,
             general_cfg_mut=self.config.mutate_control_flow_with_general_purpose_mutators,
             use_none=self.config.use_none,
-            max_gen_size=self.config.max_generation_size)
-
-    def run_and_get_cov_increase(self, func: tir.PrimFunc, passes=None) -> Tuple[int, float]:
-        assert isinstance(func, tir.PrimFunc) or func is None
-        if passes is None:
-            passes = []
-
-        if self.config.use_coverage:
-            old_now = coverage.get_now()
-
+            max_gen_size=self.config.max_generation_size,
+            schedule=make_schedule(self.config.scheduler, self.novelty),
+            corpus=corpus)
+        self.last_cull_iter = 0
+        self.pool_size_after_cull = 0
+
+    def build(self, func: tir.PrimFunc, passes, pass_keys=None, node_size=None) -> BuildResult:
+        return self.finish_build(self.submit_build(func, passes, pass_keys, node_size))
+
+    def submit_build(self, func: tir.PrimFunc, passes, pass_keys=None, node_size=None) -> PendingBuild:
+        """Start `build` in the background. Its result is given by `finish_build`, which must
+        be called before the next build."""
         t0 = time.time()
 
-        useful_pass_mask = np.ones((len(passes)))
+        cache_key = None
+        if self.build_cache is not None and func is not None:
+            cache_key = self.build_cache.key(func, pass_keys)
+            cached = self.build_cache.get(cache_key)
+            if cached is not None:
+                # Same function with same passes: same outcome and no new edge.
+                if self.novelty is not None:
+                    self.novelty.forget_last()
+                return PendingBuild(
+                    result=BuildResult(compiled=cached.compiled,
+                                       useful_pass_mask=cached.useful_pass_mask.copy(),
+                                       build_time=time.time() - t0,
+                                       cached=True),
+                    t0=t0)
 
+        useful_pass_mask = np.ones((len(passes)))
+        rejection = None
+        if self.prevalidator is not None and func is not None:
+            rejection = self.prevalidator.check(func)
+            if rejection is not None and not self.prevalidator.verify:
+                # Would fail to build: no build process is spawned.
+                if self.novelty is not None:
+                    self.novelty.forget_last()
+                return PendingBuild(
+                    result=BuildResult(compiled=False, useful_pass_mask=useful_pass_mask,
+                                       build_time=time.time() - t0, rejected=True),
+                    t0=t0)
+        result = BuildResult(compiled=None, useful_pass_mask=useful_pass_mask,
+                             rejected=rejection is not None)
+
+        node_size, timeout = self.predict_timeout(func, passes, node_size)
+        pending = PendingBuild(result, t0, cache_key, timeout, node_size, len(passes),
+                               submitted=True, rejection=rejection)
         try:
-            oracle.build_and_test(
+            self.executor.submit(
                 func,
                 passes,
-                self.config.building_timeout_in_seconds,
+                timeout,
                 self.config.diff_test_rounds,
                 self.config.use_coverage,
-                useful_pass_mask
+                useful_pass_mask,
+                self.novelty,
+                pass_keys
             )
-            self.n_pass_compilation += 1
-        except (error.RuntimeFailure, error.MaybeDeadLoop) as e:
-            self.reporter.report_tir_bug(e, func, passes, None, str(e))
-            self.n_pass_compilation += 1
+        except Exception as e:
+            pending.error = e  # Classified by `finish_build`.
+        return pending
+
+    def finish_build(self, pending: PendingBuild) -> BuildResult:
+        result = pending.result
+        if not pending.submitted:
+            return result
+        self._classify(result, lambda: self._wait(pending))
+        end_time = self.executor.end_time
+        if pending.error is not None or end_time is None:
+            end_time = time.time()
+        result.build_time = end_time - pending.t0
+        if pending.error is None:
+            result.cpu_time = self.executor.cpu_time
+        if pending.rejection is not None and result.compiled is True:
+            print(colored(f'False reject of the pre-validator: {pending.rejection}', 'yellow'))
+        self._conclude(result, pending.cache_key, pending.timeout, pending.node_size, pending.n_passes)
+        return result
+
+    def _wait(self, pending: PendingBuild):
+        if pending.error is not None:
+            raise pending.error
+        self.executor.wait()
+
+    def predict_timeout(self, func: tir.PrimFunc, passes, node_size=None) -> Tuple[Optional[int], float]:
+        """The node size (computed if needed) and the build timeout of a test."""
+        timeout = self.config.building_timeout_in_seconds
+        if self.timeout_model is not None:
+            if node_size is None and func is not None and not self.config.use_none:
+                node_size = get_node_size(func)
+            timeout = self.timeout_model.predict(node_size, len(passes))
+        return node_size, timeout
+
+    def _classify(self, result: BuildResult, run):
+        """Set the outcome of `result` according to what `run()` raises."""
+        try:
+            run()
+            result.compiled = True
+        except (error.RuntimeFailure, error.MaybeDeadLoop, error.OutOfMemory) as e:
+            result.bug = e
+            result.compiled = True
         except (error.IncorrectResult, error.PerfDegradation) as e:
-            params = e.args[0]
-            self.reporter.report_tir_bug(e, func, passes, params, str(e))
-            self.n_pass_compilation += 1
+            result.bug = e
+            result.bug_params = e.args[0]
+            result.compiled = True
         except tvm.TVMError as e:
-            self.n_failed += 1
+            result.compiled = False
         except KeyboardInterrupt as e:
             raise e
         except Exception as e:
             print(f'TZER Implementation error here..')
             assert_no_cov(traceback.print_exc)
 
-        cov_increase: int = coverage.get_now(
-        ) - old_now if self.config.use_coverage else 1
+    def _conclude(self, result: BuildResult, cache_key, timeout: float, node_size: Optional[int], n_passes: int):
+        """Learn the build time and cache the outcome of a (non-cached) build."""
+        if self.timeout_model is not None and result.cpu_time is not None:
+            # In CPU time, as timeouts are enforced.
+            if isinstance(result.bug, error.MaybeDeadLoop):
+                # For auditing false positives.
+                result.bug = error.MaybeDeadLoop(
+                    f'Timeout predicted: {timeout:.2f}s, observed: {result.cpu_time:.2f}s (CPU) '
+                    f'({self.timeout_model.describe(node_size, n_passes)})')
+            elif result.compiled is not None:
+                self.timeout_model.observe(node_size, n_passes, result.cpu_time)
+        if cache_key is not None and self.cacheable(result):
+            self.build_cache.put(cache_key, CachedOutcome(
+                compiled=result.compiled,
+                exception=type(result.bug).__name__ if result.bug is not None else None,
+                cov_increase=len(self.novelty.last_new_edges) if self.novelty is not None else 0,
+                useful_pass_mask=result.useful_pass_mask.copy()))
+
+    def build_batch(self, jobs: List[BatchJob]) -> Iterator[BuildResult]:
+        """Build `jobs` together in as few processes as possible (see `batch`). Results are
+        yielded in order and, as after `build`, `self.novelty.last_*` are the ones of the
+        yielded result until the next one is requested."""
+        batched = []
+        batched_idx = set()
+        for idx, job in enumerate(jobs):
+            job.index = idx
+            if job.func is None or self.config.diff_test_rounds > 0:
+                continue  # Tested alone.
+            if self.build_cache is not None and \
+                    self.build_cache.key(job.func, job.pass_keys) in self.build_cache:
+                continue
+            if self.prevalidator is not None and not self.prevalidator.verify and \
+                    self.prevalidator.check(job.func) is not None:
+                continue  # Rejected without building.
+            job.node_size, job.timeout = self.predict_timeout(job.func, job.passes, job.node_size)
+            batched.append(job)
+            batched_idx.add(idx)
+
+        outcomes: Dict[int, BatchOutcome] = {}
+        self._batch_outcomes(batched, outcomes)
+        for job in jobs:
+            if job.index in outcomes:
+                yield self._batch_result(job, outcomes[job.index])
+            else:
+                if job.index in batched_idx:
+                    self.n_built_alone += 1
+                yield self.build(job.func, job.passes, job.pass_keys, job.node_size)
+
+    def _batch_outcomes(self, jobs: List[BatchJob], outcomes: Dict[int, BatchOutcome]):
+        """Build `jobs` as a batch and put the outcomes of the tests that need not be built
+        alone in `outcomes`. A test crashing or hanging the batch is left to be built alone and
+        the others are built again as a batch. A failed joint build is bisected."""
+        if len(jobs) < 2:
+            return
+        run = self.executor.build_batch(
+            jobs, sum(job.timeout for job in jobs), self.config.use_coverage, self.novelty)
+        self.n_batch += 1
+        if run.finished and (run.joint_hitmap is None or self.novelty is None
+                             or self.novelty.count_new(run.joint_hitmap) == 0):
+            for job, outcome in zip(jobs, run.outcomes):
+                outcomes[job.index] = outcome
+            return
+        retry = []
+        for idx, job in enumerate(jobs):
+            if idx < len(run.outcomes) and 'exc' in run.outcomes[idx].d:
+                # Failed in lowering: the same outcome as if built alone.
+                outcomes[job.index] = run.outcomes[idx]
+            elif idx != run.culprit:
+                retry.append(job)
+        if run.finished:
+            # The joint build hit new edges, which must be attributed precisely.
+            return
+        if run.culprit is not None:
+            self._batch_outcomes(retry, outcomes)
+        else:
+            mid = len(retry) // 2
+            self._batch_outcomes(retry[:mid], outcomes)
+            self._batch_outcomes(retry[mid:], outcomes)
+
+    def _batch_result(self, job: BatchJob, outcome: BatchOutcome) -> BuildResult:
+        useful_pass_mask = np.ones((len(job.passes)))
+        result = BuildResult(compiled=None, useful_pass_mask=useful_pass_mask,
+                             build_time=outcome.build_time, cpu_time=outcome.cpu_time)
+        if self.novelty is not None:
+            self.novelty.forget_last()
+            if outcome.hitmap is not None:
+                new_edges = self.novelty.observe(outcome.hitmap)
+                if len(new_edges) > 0 and 'useless_pass_idx' in outcome.d:
+                    useful_pass_mask[outcome.d['useless_pass_idx']] = 0
+        self._classify(result, lambda: oracle.check_outcome(outcome.d, crashed=False))
+        cache_key = self.build_cache.key(job.func, job.pass_keys) \
+            if self.build_cache is not None else None
+        self._conclude(result, cache_key, job.timeout, job.node_size, len(job.passes))
+        return result
+
+    def new_executor(self):
+        limits = ResourceLimits(
+            self.config.mem_limit_in_mb, self.config.cpu_limit_in_seconds,
+            self.config.fsize_limit_in_mb)
+        if limits == ResourceLimits():
+            limits = None
+        return make_executor(
+            self.config.executor, self.config.pass_cache_in_mb, self.config.ref_cache_size,
+            limits, self.config.nopt_build == 'concurrent')
+
+    def cacheable(self, result: BuildResult) -> bool:
+        if result.compiled is None or isinstance(result.bug, (error.MaybeDeadLoop, error.OutOfMemory)):
+            return False  # Tzer's own failures, timeouts and OOMs can be flaky.
+        # Differential testing draws new random inputs for each test.
+        return self.config.diff_test_rounds == 0 or result.compiled is False
+
+    def report_bug(self, result: BuildResult, func: tir.PrimFunc, passes):
+        if result.bug is not None:
+            self.reporter.report_tir_bug(
+                result.bug, func, passes, result.bug_params, str(result.bug))
+
+    def count_compilation(self, result: BuildResult):
+        if result.cached:
+            self.n_build_cache_hit += 1
+        if result.rejected:
+            self.n_rejected += 1
+            if result.compiled is True:
+                self.n_false_reject += 1
+        if result.compiled is True:
+            self.n_pass_compilation += 1
+        elif result.compiled is False:
+            self.n_failed += 1
+
+    def run_and_get_cov_increase(self, func: tir.PrimFunc, passes=None, pass_keys=None, node_size=None) -> Tuple[int, float]:
+        assert isinstance(func, tir.PrimFunc) or func is None
+        if passes is None:
+            passes = []
+
+        result = self.build(func, passes, pass_keys, node_size)
+        cov_increase = self.record_result(result, func, passes, pass_keys)
+        return cov_increase, result.build_time, result.useful_pass_mask
+
+    def record_result(self, result: BuildResult, func: tir.PrimFunc, passes, pass_keys=None) -> int:
+        """Report and log the result of the last build. Returns its coverage increase."""
+        self.report_bug(result, func, passes)
+        self.count_compilation(result)
+        if self.predictor is not None and result.compiled is not None and not result.cached \
+                and not (result.rejected and not self.prevalidator.verify):
+            self.predictor.observe(func, pass_keys, result.compiled)
+
+        cov_increase: int = len(
+            self.novelty.last_new_edges) if self.config.use_coverage else 1
 
         if self.reporter.cov_by_time_file:
             self.reporter.record_coverage()
 
         if self.reporter.tir_by_time_file:
-            self.reporter.record_tir_and_passes(func, passes)
+            self.reporter.record_tir_and_passes(func, pass_keys)
 
-        return cov_increase, time.time() - t0, useful_pass_mask
+        return cov_increase
 
     def ready(self):
+        if self.timeout_model is not None:
+            # Before the campaign clock starts.
+            self.calibrate_timeouts()
+
         # Fuzzing progress
         self.start_point = 0 if self.config.iterations is not None else time.time()
         self.end_point = self.config.iterations if self.config.iterations is not None \
@@ -136,50 +433,121 @@ class Fuzzer:
         self.n_pass_compilation = 0
         self.n_failed = 0
 
+    def calibrate_timeouts(self):
+        """Learn build times from (a sample of) the initial seeds. The builds are only timed:
+        their coverage, outcomes and bugs are not recorded."""
+        seeds = self.joint_seed_pool.seeds
+        for seed in random.sample(seeds, min(len(seeds), __N_CALIBRATION_SEEDS__)):
+            passes, _ = concretize_tir_passes(
+                seed.pass_seq) if self.config.use_pass else ([], [])
+            node_size, _ = self.predict_timeout(seed.tir_func, passes, seed.node_size)
+            try:
+                self.executor.build_and_test(
+                    seed.tir_func, passes, self.config.building_timeout_in_seconds, 0, False)
+            except tvm.TVMError:
+                pass  # Failed to compile, which also takes time.
+            except Exception:
+                continue  # Crashed or timed out: the build time is unknown.
+            if self.executor.cpu_time is not None:
+                self.timeout_model.observe(node_size, len(passes), self.executor.cpu_time)
+
     def start(self):
         self.ready()
-        with tqdm(total=int(self.end_point - self.start_point)) as pbar:
-            while self.current_point < self.end_point:
-                self.fuzz_new(pbar)
+        try:
+            with tqdm(total=int(self.end_point - self.start_point)) as pbar:
+                while self.current_point < self.end_point:
+                    self.fuzz_new(pbar)
+        finally:
+            self.executor.close()
+        self.dump_hitmap()
+
+    def dump_hitmap(self):
         if __USE_COV__:
             mcov = coverage.get_hitmap()
             with open(os.path.join(self.reporter.report_folder, 'cov.pkl'), 'wb') as f:
                 pickle.dump(mcov, f)
 
+    def make_mutant(self, seed: JointSeed) -> Tuple[tir.PrimFunc, list, Optional[str]]:
+        """Mutate the seed. Returns the IR mutant, the pass mutant, and which failure counter
+        of the seed (`'ir'`, `'pass'` or `None`) to bump if the mutant is not interesting."""
+        fallback = None
+        # IR mutant
+        if not self.config.use_pass:
+            func_mutant = self.joint_seed_pool.mutate_ir(seed.tir_func, seed.index)
+        elif seed.n_ir_cont_fail < __MAX_TIR_FAIL__:
+            func_mutant = self.joint_seed_pool.mutate_ir(seed.tir_func, seed.index)
+            fallback = 'ir'
+        else:
+            func_mutant = seed.tir_func
+        # Pass mutant
+        if not self.config.use_pass:
+            pass_mutant = []
+        elif __USE_FULL_PASS__:
+            pass_mutant = list(tir_pass_graph.tir_pass_nodes.values())
+            random.shuffle(pass_mutant)
+        elif __USE_RANDOM_PASS_GEN__:
+            pass_mutant = random_tir_passes()
+        elif seed.n_ir_cont_fail >= __MAX_TIR_FAIL__ and seed.n_pass_cont_fail < __MAX_PASS_FAIL__:
+            pass_mutant = random_tir_passes()
+            fallback = 'pass'
+        else:
+            pass_mutant = seed.pass_seq
+        return func_mutant, pass_mutant, fallback
+
+    def feedback(self, seed: JointSeed, func_mutant: tir.PrimFunc, pass_mutant, fallback: Optional[str],
+                 cov_increase: int, compiled: bool, useful_pass_mask, new_edges=None,
+                 node_size=None, build_time=None, hitmap=None):
+        """Update the seed pool according to the result of a mutant."""
+        if (cov_increase > 0 or not self.config.use_coverage_feedback) and compiled:
+            # only append valid seed
+            # Shrink the pass mutant.
+            pass_seq = []
+            for idx, mask in enumerate(useful_pass_mask):
+                if mask: # this pass triggered coverage!
+                    pass_seq.append(pass_mutant[idx])
+            if not self.config.use_pass:
+                assert pass_seq == []
+            if not self.config.use_pass:
+                assert seed.n_ir_cont_fail < __MAX_TIR_FAIL__
+            if seed.n_ir_cont_fail < __MAX_TIR_FAIL__:
+                self.joint_seed_pool.put(
+                    func_mutant, pass_seq, new_edges, node_size, build_time, hitmap)
+            seed.pass_seq = pass_seq
+            seed.n_ir_cont_fail = 0
+            seed.n_pass_cont_fail = 0
+        else:
+            if self.config.use_pass:
+                if fallback == 'ir':
+                    seed.n_ir_cont_fail += 1
+                elif fallback == 'pass':
+                    seed.n_pass_cont_fail += 1
+                if __PASS_BASELINE_TESTING__:  # IR only
+                    if seed.n_ir_cont_fail >= __MAX_TIR_FAIL__:
+                        seed.n_ir_cont_fail = 0
+                        seed.n_pass_cont_fail = 0
+                # IR + Pass
+                elif seed.n_ir_cont_fail >= __MAX_TIR_FAIL__ and \
+                    seed.n_pass_cont_fail >= __MAX_PASS_FAIL__:
+                    seed.n_ir_cont_fail = 0
+                    seed.n_pass_cont_fail = 0
+
+            # if self.joint_seed_pool.size() < __MIN_SEED_POOL__:
+            #     self.joint_seed_pool.put() # empty tir by default.
+
     def fuzz_new(self, pbar):
+        if self.config.batch_size > 1 and self.config.diff_test_rounds == 0:
+            self.fuzz_batch(pbar)
+            return
+        if self.config.pipeline_depth > 0:
+            self.fuzz_pipelined(pbar)
+            return
+
         if self.joint_seed_pool.size() == 0:
             self.joint_seed_pool.put()  # empty tir by default.
 
         try:
             seed_idx, seed = self.joint_seed_pool.random_pick()
-
-            fallback = lambda : None
-            # IR mutant
-            if not self.config.use_pass:
-                func_mutant = self.joint_seed_pool.mutate_ir(seed.tir_func)
-            elif seed.n_ir_cont_fail < __MAX_TIR_FAIL__:
-                func_mutant = self.joint_seed_pool.mutate_ir(seed.tir_func)
-                def ir_fail():
-                    self.joint_seed_pool.seeds[seed_idx].n_ir_cont_fail += 1
-                fallback = ir_fail
-            else:
-                func_mutant = seed.tir_func
-            # Pass mutant
-            if not self.config.use_pass:
-                pass_mutant = []
-            elif __USE_FULL_PASS__:
-                pass_mutant = list(tir_pass_graph.tir_pass_nodes.values())
-                random.shuffle(pass_mutant)
-            elif __USE_RANDOM_PASS_GEN__:
-                pass_mutant = random_tir_passes()
-            elif seed.n_ir_cont_fail >= __MAX_TIR_FAIL__ and seed.n_pass_cont_fail < __MAX_PASS_FAIL__:
-                pass_mutant = random_tir_passes()
-                def pass_fail():
-                    self.joint_seed_pool.seeds[seed_idx].n_pass_cont_fail += 1
-                fallback = pass_fail
-            else:
-                pass_mutant = seed.pass_seq
-
+            func_mutant, pass_mutant, fallback = self.make_mutant(seed)
         except KeyboardInterrupt as e:
             raise e
         except Exception as e:
@@ -189,57 +557,156 @@ class Fuzzer:
             self.update_loop_info(pbar, 0, 0, 'gen-failure')
             return
 
-        passes = [p.mutate()
-                  for p in pass_mutant] if pass_mutant is not None else None
+        passes, pass_keys = concretize_tir_passes(
+            pass_mutant) if pass_mutant is not None else (None, None)
+
+        node_count = '?' if self.config.use_none else get_node_size(
+            func_mutant)
 
         n_pass_compilation_prev = self.n_pass_compilation
         cov_increase, build_time, useful_pass_mask = self.run_and_get_cov_increase(
-            func_mutant, passes)
-
-        if (cov_increase > 0 or not self.config.use_coverage_feedback) \
-                and self.n_pass_compilation != n_pass_compilation_prev:
-            assert self.n_pass_compilation == n_pass_compilation_prev + 1
-            # only append valid seed
-            # Shrink the pass mutant.
-            pass_seq = []
-            for idx, mask in enumerate(useful_pass_mask):
-                if mask: # this pass triggered coverage!
-                    pass_seq.append(pass_mutant[idx])
-            if not self.config.use_pass:
-                assert pass_seq == []
-            if not self.config.use_pass:
-                assert self.joint_seed_pool.seeds[seed_idx].n_ir_cont_fail < __MAX_TIR_FAIL__
-            if self.joint_seed_pool.seeds[seed_idx].n_ir_cont_fail < __MAX_TIR_FAIL__:
-                self.joint_seed_pool.put(func_mutant, pass_seq)
-            self.joint_seed_pool.seeds[seed_idx].pass_seq = pass_seq
-            self.joint_seed_pool.seeds[seed_idx].n_ir_cont_fail = 0
-            self.joint_seed_pool.seeds[seed_idx].n_pass_cont_fail = 0
-        else:
-            if self.config.use_pass:
-                fallback()
-                if __PASS_BASELINE_TESTING__:  # IR only
-                    if self.joint_seed_pool.seeds[seed_idx].n_ir_cont_fail >= __MAX_TIR_FAIL__:
-                        self.joint_seed_pool.seeds[seed_idx].n_ir_cont_fail = 0
-                        self.joint_seed_pool.seeds[seed_idx].n_pass_cont_fail = 0
-                # IR + Pass
-                elif self.joint_seed_pool.seeds[seed_idx].n_ir_cont_fail >= __MAX_TIR_FAIL__ and \
-                    self.joint_seed_pool.seeds[seed_idx].n_pass_cont_fail >= __MAX_PASS_FAIL__:
-                    self.joint_seed_pool.seeds[seed_idx].n_ir_cont_fail = 0
-                    self.joint_seed_pool.seeds[seed_idx].n_pass_cont_fail = 0
+            func_mutant, passes, pass_keys, node_count if node_count != '?' else None)
 
-            # if self.joint_seed_pool.size() < __MIN_SEED_POOL__:
-            #     self.joint_seed_pool.put() # empty tir by default.
+        self.feedback(seed, func_mutant, pass_mutant, fallback, cov_increase,
+                      self.n_pass_compilation != n_pass_compilation_prev, useful_pass_mask,
+                      self.novelty.last_new_edges if self.novelty is not None else None,
+                      node_count if node_count != '?' else None, build_time,
+                      self.novelty.last_hitmap if self.novelty is not None else None)
 
-        node_count = '?' if self.config.use_none else get_node_size(
-            func_mutant)
         self.update_loop_info(pbar, build_time, node_count, 'mut-new')
 
+    def fuzz_pipelined(self, pbar):
+        """Like `fuzz_new`, but the next mutants are made while this one is being built.
+
+        The mutation stage keeps up to `config.pipeline_depth` mutants ready, the build stage
+        takes the oldest one and the feedback stage updates the pool with its result. Mutants
+        are thus made from the pool of up to `pipeline_depth` iterations ago. The stages
+        interleave in a fixed order (not by timing), so that a fixed RNG seed still gives
+        the same run."""
+        if not self.mutant_queue:
+            self.mutate_next()
+        self.queue_depth_sum += len(self.mutant_queue)
+        mutant = self.mutant_queue.popleft()
+        if mutant is None:
+            self.n_failed += 1
+            self.update_loop_info(pbar, 0, 0, 'gen-failure')
+            return
+        seed, func_mutant, pass_mutant, fallback, passes, pass_keys, node_count = mutant
+
+        pending = self.submit_build(
+            func_mutant, passes, pass_keys, node_count if node_count != '?' else None)
+        # Overlapped with the build.
+        while len(self.mutant_queue) < self.config.pipeline_depth:
+            self.mutate_next()
+        t0 = time.time()
+        result = self.finish_build(pending)
+        t1 = time.time()
+        if not result.cached:
+            self.stage_time['build'] += result.build_time
+
+        cov_increase = self.record_result(result, func_mutant, passes, pass_keys)
+        self.feedback(seed, func_mutant, pass_mutant, fallback, cov_increase,
+                      result.compiled is True, result.useful_pass_mask,
+                      self.novelty.last_new_edges if self.novelty is not None else None,
+                      node_count if node_count != '?' else None, result.build_time,
+                      self.novelty.last_hitmap if self.novelty is not None else None)
+        self.stage_time['wait'] += t1 - t0
+        self.stage_time['feedback'] += time.time() - t1
+
+        self.update_loop_info(pbar, result.build_time, node_count, 'mut-pipe')
+
+    def mutate_next(self):
+        """[Mutation stage] Make a mutant and queue it."""
+        t0 = time.time()
+        if self.joint_seed_pool.size() == 0:
+            self.joint_seed_pool.put()  # empty tir by default.
+        try:
+            seed_idx, seed = self.joint_seed_pool.random_pick()
+            func_mutant, pass_mutant, fallback = self.make_mutant(seed)
+            passes, pass_keys = concretize_tir_passes(pass_mutant)
+            node_count = '?' if self.config.use_none else get_node_size(func_mutant)
+            self.mutant_queue.append(
+                (seed, func_mutant, pass_mutant, fallback, passes, pass_keys, node_count))
+        except KeyboardInterrupt as e:
+            raise e
+        except Exception as e:
+            self.mutant_queue.append(None)
+        self.stage_time['mutate'] += time.time() - t0
+
+    def pipeline_stats(self) -> Tuple[float, Dict[str, float]]:
+        """Mean depth of the mutant queue and the utilization of each stage, i.e., the share
+        of the fuzzing time spent in it. The build stage overlaps the others."""
+        duration = max(time.time() - self.start_time, 1e-9)
+        mean_depth = self.queue_depth_sum / self.iter if self.iter else 0.
+        return mean_depth, {name: t / duration for name, t in self.stage_time.items()}
+
+    def fuzz_batch(self, pbar):
+        """Like `fuzz_new`, but with `config.batch_size` mutants (of the same pool state)
+        built together."""
+        n_mutants = self.config.batch_size
+        if self.config.iterations is not None:
+            n_mutants = min(n_mutants, int(self.end_point - self.current_point))
+        if self.joint_seed_pool.size() == 0:
+            self.joint_seed_pool.put()  # empty tir by default.
+
+        mutants = []
+        for _ in range(n_mutants):
+            try:
+                seed_idx, seed = self.joint_seed_pool.random_pick()
+                func_mutant, pass_mutant, fallback = self.make_mutant(seed)
+            except KeyboardInterrupt as e:
+                raise e
+            except Exception as e:
+                self.n_failed += 1
+                self.update_loop_info(pbar, 0, 0, 'gen-failure')
+                continue
+            passes, pass_keys = concretize_tir_passes(pass_mutant)
+            node_count = '?' if self.config.use_none else get_node_size(func_mutant)
+            mutants.append((seed, func_mutant, pass_mutant, fallback, node_count, BatchJob(
+                func_mutant, passes, pass_keys, node_count if node_count != '?' else None)))
+        mutants = self.select_mutants(mutants)
+
+        results = self.build_batch([job for *_, job in mutants])
+        for (seed, func_mutant, pass_mutant, fallback, node_count, job), result in zip(mutants, results):
+            cov_increase = self.record_result(result, func_mutant, job.passes, job.pass_keys)
+            self.feedback(seed, func_mutant, pass_mutant, fallback, cov_increase,
+                          result.compiled is True, result.useful_pass_mask,
+                          self.novelty.last_new_edges if self.novelty is not None else None,
+                          node_count if node_count != '?' else None, result.build_time,
+                          self.novelty.last_hitmap if self.novelty is not None else None)
+            self.update_loop_info(pbar, result.build_time, node_count, 'mut-batch')
+
+    def select_mutants(self, mutants: list) -> list:
+        """The mutants of a batch to build: the top `config.predict_top` of them ranked by the
+        predicted chance to compile, and a few others at random so that the predictor keeps
+        learning from mutants it scores low. Others are dropped without being tested."""
+        if self.predictor is None or not self.predictor.ready() or len(mutants) < 2:
+            return mutants
+        scores = np.array([self.predictor.score(job.func, job.pass_keys) for *_, job in mutants])
+        n_top = max(1, int(np.ceil(len(mutants) * self.config.predict_top)))
+        ranked = np.argsort(-scores, kind='stable')
+        keep = set(ranked[:n_top].tolist())
+        keep.update(idx for idx in ranked[n_top:].tolist() if random.random() < __PREDICT_EXPLORE__)
+        self.n_skipped += len(mutants) - len(keep)
+        return [mutant for idx, mutant in enumerate(mutants) if idx in keep]
+
     def update_loop_info(self, pbar, build_time, node_count, phase):
         # Loop information updating.
         self.iter += 1
         t = time.time()
         compile_rate = self.n_pass_compilation / (
             self.n_pass_compilation + self.n_failed)
+        busy = ''
+        if self.prevalidator is not None:
+            busy += f'%reject: {self.n_rejected / self.iter:.2f}, '
+            if self.prevalidator.verify:
+                busy += f'#false-reject: {self.n_false_reject}, '
+        if self.predictor is not None and self.predictor.ready():
+            precision, recall = self.predictor.precision_recall()
+            busy += f'prec/rec: {precision:.2f}/{recall:.2f}, #skip: {self.n_skipped}, '
+        if self.config.pipeline_depth > 0:
+            _, utilization = self.pipeline_stats()
+            busy += f'%busy(mut/build): {utilization["mutate"]:.2f}/{utilization["build"]:.2f}, '
         pbar.set_description(
             f'#it: {self.iter}, '
             f'#bugs: {self.reporter.n_bug}, '
@@ -249,6 +716,8 @@ class Fuzzer:
             f'time: {time.time() - self.last_time:.2f}, '
             f'#cov: {f"{coverage.get_now()} / {coverage.get_total()}" if self.config.use_coverage else "?"}, '
             f'#node: {node_count}, '
+            f'%cache: {self.n_build_cache_hit / self.iter:.2f}, '
+            + busy
         )
         update = t - self.last_time if self.config.iterations is None else 1
         pbar.update(update)
@@ -260,5 +729,33 @@ class Fuzzer:
         if self.config.use_coverage:
             # The count can be directly calculated if Tzer uses coverage
             self.reporter.record_valid_seed_achieving_new_cov_count(
-                len(self.joint_seed_pool.seeds) - self.joint_seed_pool.initial_pool_size
+                self.joint_seed_pool.n_total() - self.joint_seed_pool.initial_pool_size
             )
+        if self.iter % __POOL_CHECK_INTERVAL__ == 0:
+            self.maintain_seed_pool()
+
+    def maintain_seed_pool(self):
+        """Cull the seed pool (if enabled) and log periodic statistics."""
+        if self.culling:
+            self.cull_seed_pool()
+        if self.predictor is not None and self.predictor.ready():
+            self.reporter.record_predictor_stats(
+                self.predictor.n_observed, self.n_skipped, *self.predictor.precision_recall())
+        if self.config.pipeline_depth > 0:
+            self.reporter.record_pipeline_stats(len(self.mutant_queue), *self.pipeline_stats())
+
+    def cull_seed_pool(self):
+        """Cull the seed pool periodically or when the memory ceiling is reached."""
+        rss_in_mb = psutil.Process().memory_info().rss / 2 ** 20
+        pool = self.joint_seed_pool
+        periodic = self.config.cull_interval > 0 and \
+            self.iter - self.last_cull_iter >= self.config.cull_interval
+        # Culling again does not help unless the pool grew.
+        over_memory = self.config.max_memory_in_mb is not None and \
+            rss_in_mb > self.config.max_memory_in_mb and pool.size() > self.pool_size_after_cull
+        if periodic or over_memory:
+            pool.cull()
+            self.last_cull_iter = self.iter
+            self.pool_size_after_cull = pool.size()
+            rss_in_mb = psutil.Process().memory_info().rss / 2 ** 20
+        self.reporter.record_pool_stats(pool.size(), pool.n_spilled(), rss_in_mb)
@@ -0,0 +1,84 @@
+"""Pass coverage from a (forked) build process to its parent through shared memory.
+
+The child writes `coverage.get_now()` and its hitmap into an anonymous shared mmap created
+by the parent before forking, so no hitmap is pickled through a `mp.Manager` or a pipe.
+The parent reads the region in place as a NumPy array.
+
+Layout of the region: [now: int64][hitmap: uint8 * coverage.get_total()]
+`now < 0` means that the child has not reported (e.g., it crashed before doing so).
+"""
+
+from typing import Dict, Optional
+import ctypes
+import mmap
+import os
+
+import numpy as np
+
+try:
+    from tvm.contrib import coverage
+except Exception as e:
+    print(f'No coverage in linked TVM. {e}')
+
+try:
+    from tvm._ffi.base import _LIB
+    _COPY_HITMAP = _LIB.mcov_copy_hitmap
+except Exception as e:
+    _COPY_HITMAP = None
+
+_HEADER_SIZE = np.dtype(np.int64).itemsize
+
+
+class SharedHitmap:
+    def __init__(self, size: Optional[int] = None) -> None:
+        self.size = coverage.get_total() if size is None else size
+        # Anonymous mmaps are MAP_SHARED and inherited by forked children.
+        self.mem = mmap.mmap(-1, _HEADER_SIZE + max(self.size, 1))
+        self.header = np.frombuffer(self.mem, dtype=np.int64, count=1)
+        self.hitmap = np.frombuffer(
+            self.mem, dtype=np.uint8, count=self.size, offset=_HEADER_SIZE)
+        self.clear()
+
+    def clear(self):
+        self.header[0] = -1
+
+    @property
+    def now(self) -> int:
+        return int(self.header[0])
+
+    def dump(self, now: Optional[int] = None):
+        """[Child] Write the coverage of the current process into the region."""
+        if now is None:
+            now = coverage.get_now()
+        if _COPY_HITMAP is not None:
+            _COPY_HITMAP((ctypes.c_char * self.size).from_buffer(self.mem, _HEADER_SIZE))
+        else:
+            self.hitmap[:] = np.frombuffer(coverage.get_hitmap(), dtype=np.uint8)
+        # Written last so that a partially written hitmap is never taken.
+        self.header[0] = now
+
+    def store(self, hitmap: np.ndarray, now: Optional[int] = None):
+        """Write a hitmap held by the current process into the region."""
+        self.hitmap[:] = hitmap
+        self.header[0] = int(np.count_nonzero(hitmap)) if now is None else now
+
+    def load(self):
+        """[Parent] Replace the coverage of the current process with the reported one."""
+        assert self.now >= 0, 'Nothing has been reported'
+        coverage.set_hitmap(memoryview(self.mem)[_HEADER_SIZE:_HEADER_SIZE + self.size])
+        coverage.set_now(self.now)
+
+
+_shared_hitmaps: Dict[int, SharedHitmap] = {}
+
+
+def shared_hitmap() -> SharedHitmap:
+    """The region that children of the current process report coverage with.
+
+    Regions are per process: a forked process (e.g., a parallel fuzzing worker) must not
+    share its children's region with the ones of its parent.
+    """
+    pid = os.getpid()
+    if pid not in _shared_hitmaps:
+        _shared_hitmaps[pid] = SharedHitmap()
+    return _shared_hitmaps[pid]
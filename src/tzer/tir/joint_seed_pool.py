@@ -1,14 +1,18 @@
 """Joint IR-Pass seed pool to mutate them together.
 """
 
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, replace
+from typing import List, Optional
 import random
 import os
 
+import numpy as np
 from tvm import tir
 
 from ..tvmpass import PassNode
+from .schedule import PowerSchedule, UniformSchedule, FenwickSampler
+from .tree_index import TreeIndex
+from .corpus import SeedCorpus
 from .pass_fuzz.pass_mutator import random_tir_passes, GeneralPassMutator, tir_pass_graph
 from .mutate import Flipper, Nilizer, Deletor, Insertor, SizedGenerator, RecursiveMutatorCombinator, WeightedIRMutatorCombinator
 from .mutate.specific import SpecificMutator
@@ -20,6 +24,9 @@ assert not (__USE_RANDOM_PASS_GEN__ and __USE_FULL_PASS__)
 
 __PASS_BASELINE_TESTING__ = __USE_FULL_PASS__ or __USE_RANDOM_PASS_GEN__
 
+# Chance that a pick reloads a seed spilled to the on-disk corpus.
+__SPILLED_PICK_PROB__ = 0.01
+
 @dataclass
 class JointSeed:
     tir_func: tir.PrimFunc
@@ -27,9 +34,17 @@ class JointSeed:
     n_ir_cont_fail:   int = 0   # #Continous failure time after IR mutation.
     n_pass_cont_fail: int = 0 if not __PASS_BASELINE_TESTING__ else 1000000000000
     # #Continous failure time after Pass mutation.
+    new_edges: Optional[np.ndarray] = None  # Edges first hit by this seed.
+    node_size: Optional[int] = None
+    build_time: Optional[float] = None
+    n_picked: int = 0                       # #Times picked for mutation.
+    edges: Optional[np.ndarray] = None      # Packed bits of all edges hit by this seed.
+    id: int = -1
+    index: Optional[TreeIndex] = None       # Built when entering the pool (not spilled).
 
 class JointSeedPool:
-    def __init__(self, max_gen_size = 1024, general_cfg_mut = False, use_none = False, tir_func_list = None) -> None:
+    def __init__(self, max_gen_size = 1024, general_cfg_mut = False, use_none = False, tir_func_list = None,
+                 schedule: Optional[PowerSchedule] = None, corpus: Optional[SeedCorpus] = None) -> None:
         self.seeds: List[JointSeed] = [JointSeed(tir_func=tir.PrimFunc([], tir.Evaluate(tir.const(0))), pass_seq=random_tir_passes())] # Must be an init seed.
         self.pass_mutator = GeneralPassMutator()
 
@@ -60,14 +75,48 @@ class JointSeedPool:
                 self.seeds.append(JointSeed(tir_func=f, pass_seq=random_tir_passes()))
 
         self.initial_pool_size = len(self.seeds)
-
-    def put(self, tir_func = tir.PrimFunc([], tir.Evaluate(tir.const(0))), pass_seq = None):
+        for i, seed in enumerate(self.seeds):
+            seed.id = i
+            seed.index = TreeIndex(seed.tir_func)
+        self.n_seed_id = len(self.seeds)
+        # Spill of the seeds culled from memory.
+        self.corpus = corpus
+
+        self.schedule = UniformSchedule() if schedule is None else schedule
+        self.sampler = FenwickSampler()
+        self.n_pick_since_refresh = 0
+        self.refresh_energy()
+
+    def put(self, tir_func = tir.PrimFunc([], tir.Evaluate(tir.const(0))), pass_seq = None,
+            new_edges = None, node_size = None, build_time = None, hitmap = None):
         if pass_seq is None:
             pass_seq = random_tir_passes()
-        self.seeds.append(JointSeed(tir_func=tir_func, pass_seq=pass_seq))
-
-    def mutate_ir(self, tir_func):
-        return self.ir_mutator.mutate_ir(tir_func)
+        seed = JointSeed(tir_func=tir_func, pass_seq=pass_seq, new_edges=new_edges,
+                         node_size=node_size, build_time=build_time, id=self.n_seed_id)
+        self.n_seed_id += 1
+        if self.corpus is not None and hitmap is not None:
+            seed.edges = np.packbits(hitmap != 0)
+            self.corpus.observe(seed)
+        if not self.schedule.uniform:
+            self.schedule.observe(seed)
+        self._append(seed)
+
+    def _append(self, seed: JointSeed):
+        if seed.index is None:
+            seed.index = TreeIndex(seed.tir_func)
+        self.seeds.append(seed)
+        if not self.schedule.uniform:
+            self.sampler.append(self.schedule.energy(seed))
+
+    def refresh_energy(self):
+        """Recompute all energies, which drift as the coverage (hit counts) and the
+        averages of the pool change. O(n), so only done once every n picks."""
+        self.n_pick_since_refresh = 0
+        if not self.schedule.uniform:
+            self.sampler.rebuild([self.schedule.energy(s) for s in self.seeds])
+
+    def mutate_ir(self, tir_func, index: Optional[TreeIndex] = None):
+        return self.ir_mutator.mutate_ir(tir_func, index)
 
     def mutate_pass(self, pass_seq):
         def make_rhs(binary_func):
@@ -88,12 +137,60 @@ class JointSeedPool:
 
         return valid_passes
 
+    def _load(self, seed_id: int) -> JointSeed:
+        seed, pass_names = self.corpus.load(seed_id)
+        seed.pass_seq = tir_pass_graph.recover(pass_names)
+        self._append(seed)
+        return seed
+
+    def cull(self):
+        """Keep the favored seeds (and the ones without coverage information, e.g., the
+        initial seeds) in memory and spill the others to the corpus."""
+        if self.corpus is None:
+            return
+        in_memory = {seed.id: seed for seed in self.seeds}
+        keep = {seed.id for seed in self.corpus.favored(in_memory, self._load)}
+        kept = []
+        # `_load` may have appended favored seeds.
+        for seed in self.seeds:
+            if seed.edges is None or seed.id in keep:
+                kept.append(seed)
+            else:
+                self.corpus.spill(replace(seed, pass_seq=[], index=None),
+                                  tir_pass_graph.export_name(seed.pass_seq))
+        self.seeds = kept
+        self.refresh_energy()
+
+    def n_spilled(self) -> int:
+        return 0 if self.corpus is None else len(self.corpus.spilled)
+
     def random_pick(self):
-        idx = random.randint(0, len(self.seeds) - 1)
-        return idx, self.seeds[idx]
+        if self.corpus is not None and self.corpus.spilled and random.random() < __SPILLED_PICK_PROB__:
+            seed = self._load(self.corpus.random_spilled_id())
+            seed.n_picked += 1
+            return len(self.seeds) - 1, seed
+
+        if self.schedule.uniform:
+            idx = random.randint(0, len(self.seeds) - 1)
+            self.seeds[idx].n_picked += 1
+            return idx, self.seeds[idx]
+
+        if self.n_pick_since_refresh >= len(self.seeds):
+            self.refresh_energy()
+        self.n_pick_since_refresh += 1
+        idx = self.sampler.sample()
+        seed = self.seeds[idx]
+        seed.n_picked += 1
+        self.sampler.update(idx, self.schedule.energy(seed))
+        return idx, seed
 
     def delete(self, idx):
         self.seeds.pop(idx)
+        self.refresh_energy()
 
     def size(self) -> int:
         return len(self.seeds)
+
+    def n_total(self) -> int:
+        """#Seeds both in memory and spilled."""
+        return len(self.seeds) + self.n_spilled()
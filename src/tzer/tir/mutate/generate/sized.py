@@ -1,4 +1,4 @@
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
 from tvm import tir
 import tvm
 from tvm.runtime import DataType
@@ -12,6 +12,122 @@ from tzer.tir.semantic import Context
 from .generator import Generator
 from tzer.tir import domain
 
+_T = TypeVar('_T')
+
+# A constructor that fills a hole: `option(generator, context, size)`.
+Option = Callable[['SizedGenerator', Context, int], TIRNode]
+
+# (generator class, hole kind, dtype code/bits/lanes, size bucket) -> options that do not
+# depend on the variables and buffers in the context. Filled on first use.
+_OPTION_TABLE: Dict[tuple, object] = {}
+
+
+def _id_ctx(ctx): return ctx
+def _to_tir_t(dtype): return DataType(dtype) if isinstance(dtype, str) else dtype
+
+
+def _cast_to_scalar(v, dst_scalar_type):
+    u = v
+
+    type_str_arr = str(v.dtype).split('x')
+    cur_scalar_type = DataType(type_str_arr[0])
+    dst_scalar_type = DataType(str(dst_scalar_type))
+
+    if len(type_str_arr) > 1: # vector found. extract it to a scalar.
+        u = tir.Shuffle([v], [random.randint(0, DataType(str(v.dtype)).lanes - 1)])
+
+    if cur_scalar_type != dst_scalar_type:
+        u = tir.Cast(dst_scalar_type, u)
+
+    return u
+
+
+def _unary_op_callback(func_str, ctype = 'float', rtype = 'float', stype = 'float'):
+    rtype = _to_tir_t(rtype) # Must be a scalar type.
+    stype = _to_tir_t(stype)
+    ctype = _to_tir_t(ctype) # Maybe a vector type.
+
+    return (lambda x, *args: call_intrin(rtype,
+            func_str,
+            _cast_to_scalar(x, stype),
+            *args).astype(ctype), [_id_ctx])
+
+
+def _binary_op_callback(func_str, ctype = 'float', rtype = 'float', stype = 'float'):
+    rtype = _to_tir_t(rtype) # Must be a scalar type.
+    stype = _to_tir_t(stype)
+    ctype = _to_tir_t(ctype) # Maybe a vector type.
+    # FIXME(Jiawei): Casting will fail with lanes.
+
+    return (lambda x, y, *args: call_intrin(
+        rtype,
+        func_str,
+        _cast_to_scalar(x, stype),
+        _cast_to_scalar(y, stype),
+        *args).astype(ctype),
+        [_id_ctx, _id_ctx])
+
+
+def _call_options(dtype: DataType) -> list:
+    """Intrinsic calls returning `dtype`, as (call, argument context getters)."""
+    # can be refined according to each intrinsic
+    numeric = [
+        _unary_op_callback('tir.exp', dtype),
+        _unary_op_callback('tir.exp2', dtype),
+        _unary_op_callback('tir.exp10', dtype),
+        _unary_op_callback('tir.erf', dtype),
+        _unary_op_callback('tir.tanh', dtype),
+        _unary_op_callback('tir.sigmoid', dtype),
+        _unary_op_callback('tir.log', dtype),
+        _unary_op_callback('tir.log2', dtype),
+        _unary_op_callback('tir.log10', dtype),
+        _unary_op_callback('tir.log1p', dtype),
+        _unary_op_callback('tir.tan', dtype),
+        _unary_op_callback('tir.cos', dtype),
+        _unary_op_callback('tir.cosh', dtype),
+        _unary_op_callback('tir.acos', dtype),
+        _unary_op_callback('tir.acosh', dtype),
+        _unary_op_callback('tir.sin', dtype),
+        _unary_op_callback('tir.sinh', dtype),
+        _unary_op_callback('tir.asin', dtype),
+        _unary_op_callback('tir.asinh', dtype),
+        _unary_op_callback('tir.atan', dtype),
+        _unary_op_callback('tir.atanh', dtype),
+        _unary_op_callback('tir.sqrt', dtype),
+        _unary_op_callback('tir.rsqrt', dtype),
+        _binary_op_callback('tir.ldexp', dtype),
+        _binary_op_callback('tir.pow', dtype),
+        _binary_op_callback('tir.atan2', dtype),
+    ]
+
+    numeric += [
+        _unary_op_callback('tir.floor', dtype),
+        _unary_op_callback('tir.ceil', dtype),
+        _unary_op_callback('tir.trunc', dtype),
+        _unary_op_callback('tir.fabs', dtype),
+        _unary_op_callback('tir.round', dtype),
+        _unary_op_callback('tir.nearbyint', dtype),
+        _unary_op_callback('tir.isnan', ctype=dtype, rtype='bool'),
+        _unary_op_callback('tir.isfinite', ctype=dtype, rtype='bool'),
+        _unary_op_callback('tir.isinf', ctype=dtype, rtype='bool'),
+        _unary_op_callback('tir.clz', ctype=dtype, rtype='int', stype='int'),
+        (lambda *args: call_intrin(dtype, 'tir.ret', *args).astype(dtype), [_id_ctx]),
+        _unary_op_callback('tir.popcount', ctype=dtype, rtype='int', stype='int'),
+        _binary_op_callback('tir.nextafter', dtype),
+        _binary_op_callback('tir.hypot', dtype),
+        _binary_op_callback('tir.copysign', dtype),
+        # (lambda *args: call_intrin(dtype, 'tir.fmod', *args), [_id_ctx, _id_ctx]), # tvm-llvm do not support tir.fmod.
+        (lambda x, y, z, *args: call_intrin(
+                _to_tir_t('int'),
+                'tir.q_multiply_shift',
+                _cast_to_scalar(x, 'int'),
+                random.randint(0, 31), # must be constant int.
+                _cast_to_scalar(y, 'int'),
+                _cast_to_scalar(z, 'int'),
+                *args).astype(dtype), [_id_ctx, _id_ctx, _id_ctx])
+    ]
+    return numeric
+
 
 class SizedGenerator(Generator):
     def __init__(self, get_size: Callable[[], int]) -> None:
@@ -52,226 +168,129 @@ class SizedGenerator(Generator):
 
     # Methods below are private. Please don't call them directly
 
-    def get_satisfied_options_for_prim_expr(self, context: Context, size: int) -> List[Callable[[Context, int], TIRNode]]:
-        """The core analysis"""
+    def get_satisfied_options_for_prim_expr(self, context: Context, size: int) -> List[Option]:
+        """The core analysis: the constructors that can fill an expression hole of `size`
+        nodes, as `option(generator, context, size)`. The options that only depend on the
+        dtype and size are looked up in `_OPTION_TABLE`; only those on the variables and
+        buffers in the context are added per call."""
         constraint = context.constraint
         assert isinstance(constraint, PrimExprConstraint)
+        dtype = constraint.dtype
+        key = (dtype.type_code, dtype.bits, dtype.lanes)
         if size == 0:
-            satisfied: List[Tuple[int, Callable[[Context, int], TIRNode]]] = []  # noqa
+            imm_options, scalar_constraint = self._option_table(
+                ('leaf', *key), lambda: self._make_leaf_options(constraint))
+            satisfied = imm_options
             if constraint.is_dtype_numeric and constraint.var_should_be_bound:
-                satisfied_vars = [
-                    v for v in context.bound_variables
-                    if DataType(v.dtype) == constraint.dtype
-                ]
+                satisfied_vars = context.bound_variables.of_dtype(key)
                 if len(satisfied_vars) > 0:
-                    satisfied.append((10, lambda ctx, size: self.generate_var(
+                    satisfied = [(10, lambda self, ctx, size: self.generate_var(
                         ctx.with_additional_information(satisfied_vars)
-                    )))
-            if constraint.is_dtype_int or constraint.is_dtype_uint or constraint.is_dtype_bool:
-                satisfied.append(
-                    (1, lambda ctx, size: self.generate_intimm(ctx)))
-            if constraint.is_dtype_float:
-                satisfied.append(
-                    (1, lambda ctx, size: self.generate_floatimm(ctx)))
+                    )), *imm_options]
             scalar_option = util.weighted_select(satisfied)
-            return [scalar_option] if constraint.dtype.lanes == 1 else [lambda ctx, size: tir.Broadcast(
-                scalar_option(ctx.with_constraint_being(
-                    PrimExprConstraint(str(constraint.dtype).split('x')[  # type: ignore
-                                       0])
-                ), size),
+            return [scalar_option] if scalar_constraint is None else [lambda self, ctx, size: tir.Broadcast(
+                scalar_option(self, ctx.with_constraint_being(scalar_constraint), size),
                 constraint.dtype.lanes,  # type: ignore
             )]
+
+        # Shuffle needs `lanes` indices and at least `lanes` vectors.
+        shuffle = size - 1 - dtype.lanes >= dtype.lanes
+        satisfied_1 = self._option_table(
+            ('expr', *key, shuffle), lambda: self._make_expr_options(constraint, shuffle))
+        possible_vars = context.bound_variables.pointers_to(key)
+        possible_buffers = context.buffers.of_dtype(key)
+        if len(possible_vars) == 0 and len(possible_buffers) == 0:
+            return satisfied_1
+        satisfied_1 = list(satisfied_1)
+        if len(possible_vars) > 0:
+            satisfied_1.append(lambda self, ctx, size: self.generate_sized_load(
+                ctx.with_additional_information(possible_vars),
+                size,
+            ))
+        if len(possible_buffers) > 0:
+            satisfied_1.append(lambda self, ctx, size: self.generate_sized_bufferload(
+                ctx.with_additional_information(possible_buffers),
+                size,
+            ))
+        return satisfied_1
+
+    def _option_table(self, key: tuple, make: Callable[[], _T]) -> _T:
+        """Options under `key`, made once per generator class."""
+        key = (type(self), *key)
+        options = _OPTION_TABLE.get(key)
+        if options is None:
+            options = _OPTION_TABLE[key] = make()
+        return options
+
+    def _make_leaf_options(self, constraint: PrimExprConstraint) -> Tuple[List[Tuple[int, Option]], Optional[PrimExprConstraint]]:
+        """Weighted immediates of the scalar type of `constraint`, and the constraint of the
+        broadcast scalar if `constraint` is a vector type."""
+        satisfied: List[Tuple[int, Option]] = []
+        if constraint.is_dtype_int or constraint.is_dtype_uint or constraint.is_dtype_bool:
+            satisfied.append((1, lambda self, ctx, size: self.generate_intimm(ctx)))
+        if constraint.is_dtype_float:
+            satisfied.append((1, lambda self, ctx, size: self.generate_floatimm(ctx)))
+        scalar_constraint = None
+        if constraint.dtype.lanes != 1:
+            scalar_constraint = PrimExprConstraint(str(constraint.dtype).split('x')[0])  # type: ignore
+        return satisfied, scalar_constraint
+
+    def _make_expr_options(self, constraint: PrimExprConstraint, shuffle: bool) -> List[Option]:
+        cls = type(self)
+        boolean_only_returns: List[Option] = [
+            cls.generate_sized_eq,
+            cls.generate_sized_ne,
+            cls.generate_sized_lt,
+            cls.generate_sized_le,
+            cls.generate_sized_gt,
+            cls.generate_sized_ge,
+            cls.generate_sized_and,
+            cls.generate_sized_or,
+            cls.generate_sized_not,
+        ]
+        int_uint_only_returns: List[Option] = [
+            cls.generate_sized_floordiv,
+            cls.generate_sized_floormod,
+        ]
+        numeric_returns: List[Option] = [
+            cls.generate_sized_add,
+            cls.generate_sized_sub,
+            cls.generate_sized_mul,
+            cls.generate_sized_div,
+            cls.generate_sized_mod,
+            cls.generate_sized_min,
+            cls.generate_sized_max,
+            cls.generate_sized_cast,
+            cls.generate_sized_let,
+        ]
+
+        satisfied: List[Option] = []
+        if constraint.is_dtype_bool:
+            satisfied = boolean_only_returns + numeric_returns
+        elif constraint.is_dtype_int or constraint.is_dtype_uint:
+            satisfied = int_uint_only_returns + numeric_returns
+        elif constraint.is_dtype_float:
+            satisfied = numeric_returns
         else:
-            boolean_only_returns: List[Callable[[Context, int], TIRNode]] = [
-                self.generate_sized_eq,
-                self.generate_sized_ne,
-                self.generate_sized_lt,
-                self.generate_sized_le,
-                self.generate_sized_gt,
-                self.generate_sized_ge,
-                self.generate_sized_and,
-                self.generate_sized_or,
-                self.generate_sized_not,
-            ]
-            # float_only_returns: List[Callable[[Context, int], TIRNode]] = [
-            #     lambda ctx, size: self.generate_floatimm(ctx),
-            # ]
-            # numeric_without_float_returns: List[Callable[[Context, int], TIRNode]] = [
-            #     lambda ctx, size: self.generate_intimm(ctx),
-            # ]
-            int_uint_only_returns: List[Callable[[Context, int], TIRNode]] = [
-                self.generate_sized_floordiv,
-                self.generate_sized_floormod,
-            ]
-
-            numeric_returns: List[Callable[[Context, int], TIRNode]] = [
-                self.generate_sized_add,
-                self.generate_sized_sub,
-                self.generate_sized_mul,
-                self.generate_sized_div,
-                self.generate_sized_mod,
-                self.generate_sized_min,
-                self.generate_sized_max,
-                self.generate_sized_cast,
-                self.generate_sized_let,
-            ]
-
-            # _1 here to pass the type checker
-            satisfied_1: List[Callable[[Context, int], TIRNode]] = []
-            if constraint.is_dtype_bool:
-                satisfied_1 = boolean_only_returns + numeric_returns
-            elif constraint.is_dtype_int or constraint.is_dtype_uint:
-                satisfied_1 = int_uint_only_returns + numeric_returns
-            elif constraint.is_dtype_float:
-                satisfied_1 = numeric_returns
-            else:
-                raise NotImplementedError(
-                    "Should not happen!", constraint.dtype)
-            # for v in context.bound_variables:
-            #     if v.dtype == 'handle':
-            #         if 'type_annotation' in dir(v):
-            #             if isinstance(v.type_annotation, tvm.ir.PointerType):
-            #                 print(v.type_annotation.element_type, constraint.dtype)
-            possible_vars = [
-                v for v in context.bound_variables
-                if v.dtype == 'handle'
-                and 'type_annotation' in dir(v)
-                and isinstance(v.type_annotation, tvm.ir.PointerType)
-                and DataType(v.type_annotation.element_type.dtype) == constraint.dtype
-            ]
-            if len(possible_vars) > 0:
-                satisfied_1.append(lambda ctx, size: self.generate_sized_load(
-                    ctx.with_additional_information(possible_vars),
-                    size,
-                ))
-            possible_buffers = [buffer for buffer in context.buffers
-                                if DataType(buffer.dtype) == constraint.dtype]
-            if len(possible_buffers) > 0:
-                satisfied_1.append(lambda ctx, size: self.generate_sized_bufferload(
-                    ctx.with_additional_information(possible_buffers),
-                    size,
-                ))
+            raise NotImplementedError(
+                "Should not happen!", constraint.dtype)
 
-            # Shuffle
-            if size - 1 - constraint.dtype.lanes >= constraint.dtype.lanes:
-                satisfied_1.append(self.generate_sized_shuffle)
-
-            # Call
-            def id_ctx(ctx): return ctx
-            def to_tir_t(dtype): return DataType(dtype) if isinstance(dtype, str) else dtype
-            def cast_to_scalar(v, dst_scalar_type):
-                    u = v
-                    
-                    type_str_arr = str(v.dtype).split('x')
-                    cur_scalar_type = DataType(type_str_arr[0])
-                    dst_scalar_type = DataType(str(dst_scalar_type))
-
-                    if len(type_str_arr) > 1: # vector found. extract it to a scalar.
-                        u = tir.Shuffle([v], [random.randint(0, DataType(str(v.dtype)).lanes - 1)])              
-
-                    if cur_scalar_type != dst_scalar_type:
-                        u = tir.Cast(dst_scalar_type, u)
-
-                    return u
-
-            def unary_op_callback(func_str, ctype = 'float', rtype = 'float', stype = 'float'):
-                rtype = to_tir_t(rtype) # Must be a scalar type.
-                stype = to_tir_t(stype)
-                ctype = to_tir_t(ctype) # Maybe a vector type.
-
-                return (lambda x, *args: call_intrin(rtype,
-                        func_str, 
-                        cast_to_scalar(x, stype),
-                        *args).astype(ctype), [id_ctx])
-
-            def binary_op_callback(func_str, ctype = 'float', rtype = 'float', stype = 'float'):
-                rtype = to_tir_t(rtype) # Must be a scalar type.
-                stype = to_tir_t(stype)
-                ctype = to_tir_t(ctype) # Maybe a vector type.
-                # FIXME(Jiawei): Casting will fail with lanes.
-
-                return (lambda x, y, *args: call_intrin(
-                    rtype,
-                    func_str, 
-                    cast_to_scalar(x, stype),
-                    cast_to_scalar(y, stype),
-                    *args).astype(ctype), 
-                    [id_ctx, id_ctx])
-
-
-            dtype = constraint.dtype
-            # can be refined according to each intrinsic
-            numeric = [
-                unary_op_callback('tir.exp', dtype),
-                unary_op_callback('tir.exp2', dtype),
-                unary_op_callback('tir.exp10', dtype),
-                unary_op_callback('tir.erf', dtype),
-                unary_op_callback('tir.tanh', dtype),
-                unary_op_callback('tir.sigmoid', dtype),
-                unary_op_callback('tir.log', dtype),
-                unary_op_callback('tir.log2', dtype),
-                unary_op_callback('tir.log10', dtype),
-                unary_op_callback('tir.log1p', dtype),
-                unary_op_callback('tir.tan', dtype),
-                unary_op_callback('tir.cos', dtype),
-                unary_op_callback('tir.cosh', dtype),
-                unary_op_callback('tir.acos', dtype),
-                unary_op_callback('tir.acosh', dtype),
-                unary_op_callback('tir.sin', dtype),
-                unary_op_callback('tir.sinh', dtype),
-                unary_op_callback('tir.asin', dtype),
-                unary_op_callback('tir.asinh', dtype),
-                unary_op_callback('tir.atan', dtype),
-                unary_op_callback('tir.atanh', dtype),
-                unary_op_callback('tir.sqrt', dtype),
-                unary_op_callback('tir.rsqrt', dtype),
-                binary_op_callback('tir.ldexp', dtype),
-                binary_op_callback('tir.pow', dtype),
-                binary_op_callback('tir.atan2', dtype),
-            ]
-
-            numeric += [
-                unary_op_callback('tir.floor', dtype),
-                unary_op_callback('tir.ceil', dtype),
-                unary_op_callback('tir.trunc', dtype),
-                unary_op_callback('tir.fabs', dtype),
-                unary_op_callback('tir.round', dtype),
-                unary_op_callback('tir.nearbyint', dtype),
-                unary_op_callback('tir.isnan', ctype=dtype, rtype='bool'),
-                unary_op_callback('tir.isfinite', ctype=dtype, rtype='bool'),
-                unary_op_callback('tir.isinf', ctype=dtype, rtype='bool'),
-                unary_op_callback('tir.clz', ctype=dtype, rtype='int', stype='int'),
-                (lambda *args: call_intrin(dtype, 'tir.ret', *args).astype(dtype), [id_ctx]),
-                unary_op_callback('tir.popcount', ctype=dtype, rtype='int', stype='int'),
-                binary_op_callback('tir.nextafter', dtype),
-                binary_op_callback('tir.hypot', dtype),
-                binary_op_callback('tir.copysign', dtype),
-                # (lambda *args: call_intrin(dtype, 'tir.fmod', *args), [id_ctx, id_ctx]), # tvm-llvm do not support tir.fmod.
-                (lambda x, y, z, *args: call_intrin(
-                        to_tir_t('int'),
-                        'tir.q_multiply_shift', 
-                        cast_to_scalar(x, 'int'),
-                        random.randint(0, 31), # must be constant int.
-                        cast_to_scalar(y, 'int'),
-                        cast_to_scalar(z, 'int'),
-                        *args).astype(dtype), [id_ctx, id_ctx, id_ctx])
-            ]
-            satisfied_call = []
-            if constraint.is_dtype_numeric:
-                satisfied_call.extend(numeric)
-            if len(satisfied_call) > 0:
-                satisfied_1.append(lambda ctx, size: self.generate_sized_call(
-                    ctx.with_additional_information(satisfied_call),
-                    size,
-                ))
+        if shuffle:
+            satisfied.append(cls.generate_sized_shuffle)
 
-            return satisfied_1
+        if constraint.is_dtype_numeric:
+            satisfied_call = _call_options(constraint.dtype)
+            satisfied.append(lambda self, ctx, size: self.generate_sized_call(
+                ctx.with_additional_information(satisfied_call),
+                size,
+            ))
+        return satisfied
 
     def generate_sized_prim_expr(self, context: Context, size: int) -> TIRNode:
         constraint = context.constraint
         assert isinstance(constraint, PrimExprConstraint)
         satsified = self.get_satisfied_options_for_prim_expr(context, size)
-        return random.choice(satsified)(context, size)
+        return random.choice(satsified)(self, context, size)
 
     def generate_var(self, context: Context) -> TIRNode:
         constraint = context.constraint
@@ -350,8 +369,7 @@ class SizedGenerator(Generator):
             self.generate_sized(context.with_constraint_being(
                 PrimExprConstraint(new_var.dtype)),
                 value_size),
-            self.generate_sized(context.with_bound_vars_being(
-                [*context.bound_variables, new_var]),
+            self.generate_sized(context.with_bound_vars_added(new_var),
                 body_size),
         )
 
@@ -552,47 +570,45 @@ class SizedGenerator(Generator):
         constraint = context.constraint
         assert isinstance(constraint, StmtConstraint)
         if size == 0:
-            options_0 = [lambda context: tir.Evaluate(tir.const(0))]
-            if len(context.buffers) > 0:
-                options_0.append(lambda context: self.generate_prefetch(
-                    context.with_additional_information(context.buffers),
+            if len(context.buffers) > 0 and random.random() < 0.5:
+                return self.generate_prefetch(
+                    context.with_additional_information(context.buffers))
+            return tir.Evaluate(tir.const(0))
+        options = self._option_table(('stmt',), self._make_stmt_options)
+        possible_vars = context.bound_variables.pointers_to()
+        possible_buffers = context.buffers
+        if len(possible_vars) > 0 or len(possible_buffers) > 0:
+            options = list(options)
+            if len(possible_vars) > 0:
+                options.append(lambda self, ctx, size: self.generate_sized_store(
+                    ctx.with_additional_information(possible_vars),
+                    size,
                 ))
-            return random.choice(options_0)(context)
-        options = [
-            self.generate_sized_attrstmt,
-            self.generate_sized_ifthenelse,
-            self.generate_sized_letstmt,
-            self.generate_sized_for,
-            self.generate_sized_while,
-            self.generate_sized_allocate,
-            # self.generate_sized_bufferrealize,
-            self.generate_sized_assertstmt,
-            # self.generate_sized_producerstore,
-            # self.generate_sized_producerrealize,
-            self.generate_sized_seqstmt,
-            self.generate_sized_evaluate,
-            # self.generate_sized_block,
-            # self.generate_sized_blockrealize,
-        ]
-        possible_vars = [
-            v for v in context.bound_variables
-            if v.dtype == 'handle'
-            and 'type_annotation' in dir(v)
-            and isinstance(v.type_annotation, tvm.ir.PointerType)
-        ]
-        if len(possible_vars) > 0:
-            options.append(lambda ctx, size: self.generate_sized_store(
-                ctx.with_additional_information(possible_vars),
-                size,
-            ))
+            if len(possible_buffers) > 0:
+                options.append(lambda self, ctx, size: self.generate_sized_bufferstore(
+                    ctx.with_additional_information(possible_buffers),
+                    size,
+                ))
+        return random.choice(options)(self, context, size)
 
-        possible_buffers = context.buffers
-        if len(possible_buffers) > 0:
-            options.append(lambda ctx, size: self.generate_sized_bufferstore(
-                ctx.with_additional_information(possible_buffers),
-                size,
-            ))
-        return random.choice(options)(context, size)
+    def _make_stmt_options(self) -> List[Option]:
+        cls = type(self)
+        return [
+            cls.generate_sized_attrstmt,
+            cls.generate_sized_ifthenelse,
+            cls.generate_sized_letstmt,
+            cls.generate_sized_for,
+            cls.generate_sized_while,
+            cls.generate_sized_allocate,
+            # cls.generate_sized_bufferrealize,
+            cls.generate_sized_assertstmt,
+            # cls.generate_sized_producerstore,
+            # cls.generate_sized_producerrealize,
+            cls.generate_sized_seqstmt,
+            cls.generate_sized_evaluate,
+            # cls.generate_sized_block,
+            # cls.generate_sized_blockrealize,
+        ]
 
     # src_doms = [ir.Range, tir.Var, IterType, ThreadTag]
     # target_dom = tir.IterVar
@@ -651,7 +667,7 @@ class SizedGenerator(Generator):
             ), self.generate_sized(
                 context
                 .with_constraint_being(StmtConstraint())
-                .with_bound_vars_being([*context.bound_variables, var]),
+                .with_bound_vars_added(var),
                 body_size,
             )
         )
@@ -673,7 +689,7 @@ class SizedGenerator(Generator):
             self.generate_sized(
                 context
                 .with_constraint_being(StmtConstraint())
-                .with_bound_vars_being([*context.bound_variables, loop_var]),
+                .with_bound_vars_added(loop_var),
                 body_size
             ),
         )
@@ -1,10 +1,13 @@
+from typing import Optional
 from tvm import tir
 from tzer.tir.util import TIRNode
 from tzer.tir.semantic import Context
+from tzer.tir.tree_index import TreeIndex
 
 
 class IRMutator:
-    def mutate_ir(self, op: tir.PrimFunc) -> tir.PrimFunc:
+    def mutate_ir(self, op: tir.PrimFunc, index: Optional[TreeIndex] = None) -> tir.PrimFunc:
+        """`index`, if given, is the `TreeIndex` of `op`."""
         raise NotImplementedError
 
 
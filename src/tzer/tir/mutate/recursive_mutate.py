@@ -4,9 +4,10 @@ from tzer.tir import util
 from tzer.tir.semantic.constraint import PrimExprConstraint, StmtConstraint
 from tzer.tir.visit import TIRAbstractTransformer
 from tzer.tir.util import TIRNode
+from tzer.tir.tree_index import TreeIndex
 from dataclasses import dataclass
 import random
-from tzer.tir.visit.size import MemoizedGetSize, get_node_size
+from tzer.tir.visit.size import get_node_size
 from tzer.tir.semantic import Context, context
 from tzer.tir import semantic
 from tzer.tir.semantic import Constraint
@@ -37,29 +38,32 @@ class RecursiveMutatorCombinator(TIRAbstractTransformer[Context], Mutator, IRMut
     ) -> None:
         self.touch_control_flow = touch_control_flow
         self.weighted_mutators = weighted_mutators
-        self.reset_memoized_size_object()
 
-    def mutate_ir(self, op: tir.PrimFunc) -> tir.PrimFunc:
-        return self.mutate(op, Context.prim_func_context())
+    def mutate_ir(self, op: tir.PrimFunc, index: Optional[TreeIndex] = None) -> tir.PrimFunc:
+        if index is None:
+            return self.mutate(op, Context.prim_func_context())
+        # Pick the node uniformly from the index instead of descending from the root.
+        idx = index.random_target(self.touch_control_flow)
+        if idx is None:
+            return op
+        node = index.nodes[idx]
+        mutant = self.mutate_node(node, index.context(idx))
+        return op if mutant is node else index.replace(idx, mutant)
 
     # def visit(self, op, arg):
     #     print(type(op))
     #     return super().visit(op, arg)
 
     def mutate(self, op: TIRNode, context: Context) -> TIRNode:
-        result = self(op, context)
-        self.reset_memoized_size_object()
-        return result
+        return self(op, context)
 
     def will_modify(self, op: TIRNode, context: Context) -> bool:
         return len([_ for _, mutator in self.weighted_mutators
                     if mutator.will_modify(op, context)]) > 0
 
-    def reset_memoized_size_object(self):
-        self._get_node_size = MemoizedGetSize()
-
     def get_node_size(self, op) -> int:
-        return self._get_node_size(op, None)
+        # Memoized across mutations: a mutant shares all but the mutated path with its seed.
+        return get_node_size(op)
 
     def mutate_node(self, op: TIRNode, context: Context) -> TIRNode:
         # if isinstance(op, tir.Var):
@@ -81,7 +85,7 @@ class RecursiveMutatorCombinator(TIRAbstractTransformer[Context], Mutator, IRMut
                 params=op.params,
                 body=self(op.body, context
                      .with_constraint_being(semantic.StmtConstraint())
-                     .with_bound_vars_being([*op.params, *context.bound_variables])),
+                     .with_bound_vars_added(*op.params)),
                 ret_type=op.ret_type,
                 buffer_map=op.buffer_map,
                 attrs=op.attrs,
@@ -153,7 +157,7 @@ class RecursiveMutatorCombinator(TIRAbstractTransformer[Context], Mutator, IRMut
                 op.value,
                 self(op.body, context
                      .with_constraint_being(PrimExprConstraint(op.body.dtype))
-                     .with_bound_vars_being([*context.bound_variables, op.var])
+                     .with_bound_vars_added(op.var)
                      )
             ))
         ]
@@ -448,7 +452,7 @@ class RecursiveMutatorCombinator(TIRAbstractTransformer[Context], Mutator, IRMut
                 op.value,
                 self(op.body, context
                      .with_constraint_being(StmtConstraint())
-                     .with_bound_vars_being([*context.bound_variables, op.var]))
+                     .with_bound_vars_added(op.var))
             )),
         ]
         return util.weighted_select(options)()
@@ -531,7 +535,7 @@ class RecursiveMutatorCombinator(TIRAbstractTransformer[Context], Mutator, IRMut
                 op.condition,
                 self(op.body, context
                      .with_constraint_being(StmtConstraint())
-                     .with_bound_vars_being([*context.bound_variables, op.buffer_var]))
+                     .with_bound_vars_added(op.buffer_var))
             ))
         ]
         extents = list(op.extents)
@@ -732,7 +736,7 @@ class RecursiveMutatorCombinator(TIRAbstractTransformer[Context], Mutator, IRMut
                 op.name_hint,
                 self(op.body, context
                      .with_constraint_being(semantic.StmtConstraint())
-                     .with_bound_vars_being([*context.bound_variables, *[v.var for v in op.iter_vars]])),
+                     .with_bound_vars_added(*[v.var for v in op.iter_vars])),
                 op.init,
                 op.alloc_buffers,
                 op.match_buffers,
@@ -1,12 +1,13 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from tvm import tir
 from .mutator import IRMutator
 from tzer.tir import util
+from tzer.tir.tree_index import TreeIndex
 
 
 class WeightedIRMutatorCombinator(IRMutator):
     def __init__(self, weighted_ir_mutators: List[Tuple[int, IRMutator]]) -> None:
         self.weighted_ir_mutators = weighted_ir_mutators
 
-    def mutate_ir(self, op: tir.PrimFunc) -> tir.PrimFunc:
-        return util.weighted_select(self.weighted_ir_mutators).mutate_ir(op)
+    def mutate_ir(self, op: tir.PrimFunc, index: Optional[TreeIndex] = None) -> tir.PrimFunc:
+        return util.weighted_select(self.weighted_ir_mutators).mutate_ir(op, index)
@@ -0,0 +1,116 @@
+"""Edge-level coverage novelty.
+
+Instead of comparing `coverage.get_now()` before and after a test, each build child resets
+its coverage so that its hitmap holds the edges (i.e., instrumentation guards) hit by that
+test only. The fuzzer keeps a `NoveltyIndex` of the campaign:
+
+- the global edges as a packed bit array, living in an anonymous shared mmap so that build
+  children (forked at any time) can tell which of their edges are new;
+- per-edge hit counts (number of tests hitting each edge), classified in AFL-style buckets
+  to tell rare edges from common ones.
+"""
+
+from typing import Optional
+import mmap
+
+import numpy as np
+
+try:
+    from tvm.contrib import coverage
+except Exception as e:
+    print(f'No coverage in linked TVM. {e}')
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+# AFL-style buckets of hit counts: 1, 2, 3, 4-7, 8-15, 16-31, 32-127, 128+
+_BUCKET_LOWER_BOUNDS = np.array([1, 2, 3, 4, 8, 16, 32, 128], dtype=np.uint32)
+N_BUCKETS = len(_BUCKET_LOWER_BOUNDS)
+
+_NO_EDGE = np.zeros(0, dtype=np.int64)
+
+
+def hit_bucket(counts: np.ndarray) -> np.ndarray:
+    """AFL-style bucket (0 ~ N_BUCKETS - 1) of each hit count. Counts must be positive."""
+    return np.searchsorted(_BUCKET_LOWER_BOUNDS, counts, side='right') - 1
+
+
+class NoveltyIndex:
+    def __init__(self, size: Optional[int] = None) -> None:
+        self.size = coverage.get_total() if size is None else size
+        n_bytes = (self.size + 7) // 8
+        # Anonymous mmaps are MAP_SHARED and inherited by forked children.
+        self.mem = mmap.mmap(-1, max(n_bytes, 1))
+        self.bits = np.frombuffer(self.mem, dtype=np.uint8, count=n_bytes)
+        self.hit_counts = np.zeros(self.size, dtype=np.uint32)
+        self.n_edges = 0
+        # Set in forked fuzzing workers, which send per-test hitmaps to the coordinator
+        # (i.e., the only writer of the index) instead of updating the index.
+        self.read_only = False
+        # Result of the last `observe`.
+        self.last_new_edges = _NO_EDGE
+        self.last_hitmap: Optional[np.ndarray] = None
+
+    def _new_bits(self, hitmap: np.ndarray) -> np.ndarray:
+        return np.bitwise_and(np.packbits(hitmap != 0), np.invert(self.bits))
+
+    def count_new(self, hitmap: np.ndarray) -> int:
+        """Number of edges hit in `hitmap` but not in the index."""
+        return int(_POPCOUNT[self._new_bits(hitmap)].sum())
+
+    def new_edges(self, hitmap: np.ndarray) -> np.ndarray:
+        """Indices of edges hit in `hitmap` but not in the index."""
+        return np.flatnonzero(np.unpackbits(self._new_bits(hitmap), count=self.size))
+
+    def update(self, hitmap: np.ndarray) -> np.ndarray:
+        """Add the edges of a test to the index. Returns the newly hit ones."""
+        assert not self.read_only
+        new_bits = self._new_bits(hitmap)
+        self.hit_counts[hitmap != 0] += 1
+        if not new_bits.any():
+            return _NO_EDGE
+        np.bitwise_or(self.bits, new_bits, out=self.bits)
+        new = np.flatnonzero(np.unpackbits(new_bits, count=self.size))
+        self.n_edges += len(new)
+        # Keep the coverage of the fuzzer (reported and dumped) in sync.
+        coverage.set_hitmap(np.unpackbits(self.bits, count=self.size))
+        coverage.set_now(self.n_edges)
+        return new
+
+    def observe(self, hitmap: np.ndarray) -> np.ndarray:
+        """Look at the per-test `hitmap` reported by a build child."""
+        self.last_hitmap = hitmap
+        if self.read_only:
+            self.last_new_edges = self.new_edges(hitmap)
+        else:
+            self.last_new_edges = self.update(hitmap)
+        return self.last_new_edges
+
+    def forget_last(self):
+        self.last_new_edges = _NO_EDGE
+        self.last_hitmap = None
+
+    def rarity(self, edges: Optional[np.ndarray]) -> int:
+        """How rare the rarest of `edges` is: from 1 (hit by 128+ tests) to `N_BUCKETS`
+        (hit by a single test). 0 if there is no edge."""
+        if edges is None or len(edges) == 0:
+            return 0
+        return N_BUCKETS - int(hit_bucket(self.hit_counts[edges].min()))
+
+
+class TestCoverage:
+    """[Build child] Edges of the running test that are new to the index.
+
+    The child's hitmap is only copied and compared again when its coverage grows.
+    """
+
+    def __init__(self, index: NoveltyIndex) -> None:
+        self.index = index
+        self.local_now = -1
+        self.n_new = 0
+
+    def get_now(self) -> int:
+        now = coverage.get_now()
+        if now != self.local_now:
+            self.local_now = now
+            self.n_new = self.index.count_new(
+                np.frombuffer(coverage.get_hitmap(), dtype=np.uint8))
+        return self.n_new
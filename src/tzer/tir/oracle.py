@@ -1,6 +1,9 @@
 import os
 from typing import Any, List, Optional, Union
 import multiprocessing as mp
+import pickle
+import shutil
+import tempfile
 import time
 import numpy as np
 import psutil
@@ -9,11 +12,20 @@ import tvm
 import tvm.testing
 from tvm import tir
 from . import util, error
+from .hitmap import SharedHitmap, shared_hitmap
+from .novelty import NoveltyIndex, TestCoverage
+from .pass_cache import PassPrefixCache
+from .ref_cache import Reference, ReferenceCache
+from .sandbox import BuildMonitor, ResourceLimits, cpu_limit_exceeded
 from enum import Enum
 
 
 __USE_PASS__ = os.getenv('PASS') is not None
 
+# How the non-opt. module of differential tests is compiled: concurrently with the optimized
+# one (see `ConcurrentNopt`) or before it.
+NOPT_BUILDS = ['concurrent', 'sequential']
+
 try:
     from tvm.contrib import coverage
 except Exception as e:
@@ -90,155 +102,534 @@ def run_module(
         # assert 'ret' in d and 'params' in d and 'exc' not in d
         return RunOutcome(d['params'], d['ret'], RunOutcomeStatus.SUCCESS)
 
-def build_and_test(
+def export_reference(nopt_mod, lib_path: str) -> Optional[str]:
+    try:
+        nopt_mod.export_library(lib_path)
+        return lib_path
+    except Exception:
+        return None
+
+
+def load_reference(ref: Reference):
+    """The reference module, or None if it was not exported or has been evicted."""
+    if ref.lib_path is None:
+        return None
+    try:
+        return tvm.runtime.load_module(ref.lib_path)
+    except Exception:
+        return None
+
+
+_NOPT_STATUS_NAME = 'status.pkl'
+_nopt_hitmaps = {}
+
+
+def _nopt_hitmap() -> SharedHitmap:
+    pid = os.getpid()
+    if pid not in _nopt_hitmaps:
+        _nopt_hitmaps[pid] = SharedHitmap()
+    return _nopt_hitmaps[pid]
+
+
+class ConcurrentNopt:
+    """Compile the non-opt. module in a forked process while the caller compiles the
+    optimized one.
+
+    To classify bugs as the sequential build (non-opt. first) does, the caller waits for it
+    (see `join`) before raising anything of the optimized side. If the caller dies or hangs
+    in `BuildStage.COMPILE_OPT` meanwhile, the parent settles the stage with
+    `settle_concurrent_nopt` using `d['nopt_pid']` and the status file in `d['nopt_dir']`.
+    """
+
+    def __init__(self, mod: tvm.ir.IRModule, d: dict, use_cov: bool, lib_path: Optional[str] = None) -> None:
+        self.folder = tempfile.mkdtemp(prefix='tzer-nopt-')
+        self.lib_path = lib_path if lib_path is not None else os.path.join(self.folder, 'nopt.so')
+        self.shared = _nopt_hitmap() if use_cov else None
+        if self.shared is not None:
+            self.shared.clear()
+        self.pid = os.fork()
+        if self.pid == 0:
+            try:
+                self._run(mod)
+            finally:
+                os._exit(1)
+        d['nopt_pid'] = self.pid
+        d['nopt_dir'] = self.folder
+
+    def _run(self, mod: tvm.ir.IRModule):
+        # ('build', exception) if the compilation fails, ('export', exception) if the module
+        # cannot be exported (then the caller builds it again), and None if succeeded.
+        status = None
+        try:
+            with tvm.transform.PassContext(opt_level=0):
+                nopt_mod = tvm.build(mod)
+            try:
+                nopt_mod.export_library(self.lib_path)
+            except Exception as e:
+                status = ('export', e)
+        except Exception as e:
+            status = ('build', e)
+        if self.shared is not None:
+            self.shared.dump()
+        _write_nopt_status(self.folder, status)
+        os._exit(0)
+
+    def join(self, d: dict, mod: tvm.ir.IRModule):
+        """Returns the non-opt. module, or raises/crashes as the sequential build would."""
+        stage = d['stage']
+        d['stage'] = BuildStage.COMPILE_NOPT
+        _, exit_status = os.waitpid(self.pid, 0)
+        # A killed child may not have dumped its whole hitmap.
+        if os.WIFEXITED(exit_status) and self.shared is not None and self.shared.now >= 0:
+            merged = np.maximum(np.frombuffer(coverage.get_hitmap(), dtype=np.uint8),
+                                self.shared.hitmap)
+            coverage.set_hitmap(bytearray(merged))  # Must be writable.
+            coverage.set_now(int(np.count_nonzero(merged)))
+        if not os.WIFEXITED(exit_status) or os.WEXITSTATUS(exit_status) != 0:
+            # Crashed in non-opt. compilation (the stage is reported as such).
+            os._exit(1)
+        status = _read_nopt_status(self.folder)
+        if status is not None and status[0] == 'build':
+            self.close()
+            raise status[1]
+        if status is None:
+            nopt_mod = tvm.runtime.load_module(self.lib_path)
+        else:
+            # Failed to export: the library may be partially written (and, if it is the path
+            # of a reference, outside of `self.folder`).
+            if os.path.exists(self.lib_path):
+                os.remove(self.lib_path)
+            with tvm.transform.PassContext(opt_level=0):
+                nopt_mod = tvm.build(mod)
+        self.close()
+        d['stage'] = stage
+        return nopt_mod
+
+    def exported(self) -> bool:
+        return os.path.exists(self.lib_path)
+
+    def close(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+def _write_nopt_status(folder: str, status):
+    tmp_path = os.path.join(folder, _NOPT_STATUS_NAME + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        try:
+            pickle.dump(status, f)
+        except Exception:
+            # Unpicklable exception: keep its message.
+            f.seek(0)
+            f.truncate()
+            pickle.dump((status[0], Exception(str(status[1]))), f)
+    os.rename(tmp_path, os.path.join(folder, _NOPT_STATUS_NAME))
+
+
+def _read_nopt_status(folder: str):
+    """The status written by `ConcurrentNopt`. Raises FileNotFoundError if not written."""
+    with open(os.path.join(folder, _NOPT_STATUS_NAME), 'rb') as f:
+        return pickle.load(f)
+
+
+def settle_concurrent_nopt(d: dict, crashed: bool, timeout: float) -> bool:
+    """[Parent] The test process is dead (`crashed` or killed for timeout). If it died in
+    `COMPILE_OPT` while the concurrent non-opt. compilation was running, wait for the latter
+    (at most `timeout` seconds) and attribute the outcome as a sequential build would, i.e.,
+    to the non-opt. compilation unless it succeeded. Returns if the test is seen as crashed.
+    """
+    if 'nopt_pid' not in d:
+        return crashed
+    folder = d['nopt_dir']
+    try:
+        if d['stage'] != BuildStage.COMPILE_OPT:
+            return crashed
+        try:
+            child = psutil.Process(d['nopt_pid'])
+            try:
+                child.wait(max(timeout, 0))
+            except psutil.TimeoutExpired:
+                child.kill()
+        except psutil.NoSuchProcess:
+            pass
+        try:
+            status = _read_nopt_status(folder)
+        except (FileNotFoundError, EOFError):
+            # Crashed or hung.
+            d['stage'] = BuildStage.COMPILE_NOPT
+            return True
+        if status is not None and status[0] == 'build':
+            d['stage'] = BuildStage.COMPILE_NOPT
+            d['exc'] = status[1]
+            return False
+        return crashed
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def build_and_test_in_process(
     func: tir.PrimFunc,
     passes: List[tvm.ir.transform.Pass],
-    build_timeout: float,
     diff_test_round: int,
     use_cov: bool,
-    useful_pass_mask = None
+    d: dict,
+    shared: Optional[SharedHitmap] = None,
+    novelty: Optional[NoveltyIndex] = None,
+    pass_keys: Optional[list] = None,
+    prefix_cache: Optional[PassPrefixCache] = None,
+    ref_cache: Optional[ReferenceCache] = None,
+    concurrent_nopt: bool = False,
 ):
-    def wrapper(
-        func: tir.PrimFunc,
-        passes: List[tvm.ir.transform.Pass],
-        use_cov: bool,
-        d: dict,
-    ):
-        d['stage'] = BuildStage.COMPILE_NOPT
-        try:
-            useless_pass_idx = []
-            mod = tir_primfunc_to_mod(func)
-            if diff_test_round > 0 or not __USE_PASS__: # diff. test.
+    """Build (and differentially test) `func` in the calling process.
+
+    The progress is tracked by `d['stage']` so that the caller can tell which stage a
+    crash or a hang happened in. Meant to be called inside a disposable (sub)process.
+    If the coverage grows, it is reported to the parent through `shared`. With `novelty`,
+    the coverage is reset first so that the reported hitmap is the one of this test only.
+    With `pass_keys` (see `PassNode.concretize`) and a `prefix_cache`, the longest cached
+    pass prefix is skipped. Skipped passes are deterministic re-runs, i.e., useless passes.
+    With a `ref_cache`, the reference side of differential tests is reused if `func` was
+    tested before, and new references are reported in `d['ref']`. With `concurrent_nopt`, the
+    non-opt. module is compiled in a forked process meanwhile (see `ConcurrentNopt`).
+    """
+    d['stage'] = BuildStage.COMPILE_NOPT
+    if use_cov:
+        if novelty is not None:
+            coverage.reset()
+            cov = TestCoverage(novelty)
+        else:
+            cov = coverage
+        base_cov = coverage.get_now()
+    nopt_job = None
+    try:
+        useless_pass_idx = []
+        mod = root_mod = tir_primfunc_to_mod(func)
+        ref = None
+        if ref_cache is not None and diff_test_round > 0:
+            func_hash = tvm.ir.structural_hash(func)
+            ref = ref_cache.get(func_hash)
+        nopt_mod = None
+        if ref is not None and len(ref.rounds) < diff_test_round:
+            nopt_mod = load_reference(ref)
+            if nopt_mod is None:
+                ref = None
+        if ref is None and (diff_test_round > 0 or not __USE_PASS__): # diff. test.
+            if concurrent_nopt and __USE_PASS__:
+                nopt_job = ConcurrentNopt(
+                    mod, d, use_cov,
+                    ref_cache.lib_path(func_hash) if ref_cache is not None else None)
+            else:
                 with tvm.transform.PassContext(opt_level=0):
                     nopt_mod = tvm.build(mod)
+                if ref_cache is not None and diff_test_round > 0:
+                    ref = Reference(export_reference(nopt_mod, ref_cache.lib_path(func_hash)))
+                    d['ref'] = (func_hash, ref)
 
-            if __USE_PASS__:
-                if use_cov:
-                    last_cov = coverage.get_now()
-                d['stage'] = BuildStage.COMPILE_OPT
-                with tvm.transform.PassContext(opt_level=4):
-                    for idx, single_pass in enumerate(passes):
-                        mod = tvm.transform.Sequential(
-                            [single_pass],
-                            opt_level=4
-                        )(mod)
-                        if use_cov:
-                            cur_cov = coverage.get_now()
-                            if last_cov == cur_cov:
-                                useless_pass_idx.append(idx)
-                            last_cov = cur_cov
-                    opt_mod = tvm.build(mod)
-        except Exception as e:
-            raise e
-        finally:
+        if __USE_PASS__:
             if use_cov:
-                d['cov'] = coverage.get_now(), coverage.get_hitmap()
-                d['useless_pass_idx'] = useless_pass_idx
-
-        if diff_test_round > 0:
-            assert __USE_PASS__
-            d['stage'] = BuildStage.DIFF_TEST
-            for _ in range(diff_test_round):
-                # no crash
+                last_cov = cov.get_now()
+            d['stage'] = BuildStage.COMPILE_OPT
+            n_cached = 0
+            use_cache = prefix_cache is not None and pass_keys is not None
+            if use_cache:
+                root_hash = tvm.ir.structural_hash(mod)
+                n_cached, cached_mod = prefix_cache.lookup(root_hash, pass_keys)
+                if cached_mod is not None:
+                    mod = cached_mod
+                    useless_pass_idx.extend(range(n_cached))
+            with tvm.transform.PassContext(opt_level=4):
+                for idx in range(n_cached, len(passes)):
+                    single_pass = passes[idx]
+                    mod = tvm.transform.Sequential(
+                        [single_pass],
+                        opt_level=4
+                    )(mod)
+                    if use_cov:
+                        cur_cov = cov.get_now()
+                        if last_cov == cur_cov:
+                            useless_pass_idx.append(idx)
+                        last_cov = cur_cov
+                    if use_cache:
+                        prefix_cache.put(root_hash, pass_keys[:idx + 1], mod)
+                opt_mod = tvm.build(mod)
+
+        if nopt_job is not None:
+            job, nopt_job = nopt_job, None
+            nopt_mod = job.join(d, root_mod)
+            if ref_cache is not None:
+                ref = Reference(job.lib_path if job.exported() else None)
+                d['ref'] = (func_hash, ref)
+    except Exception as e:
+        if nopt_job is not None:
+            # The outcome of the non-opt. compilation comes first.
+            nopt_job.join(d, root_mod)
+        raise e
+    finally:
+        if use_cov:
+            d['useless_pass_idx'] = useless_pass_idx
+            if shared is not None and coverage.get_now() > base_cov:
+                shared.dump()
+
+    if diff_test_round > 0:
+        assert __USE_PASS__
+        d['stage'] = BuildStage.DIFF_TEST
+        for round_idx in range(diff_test_round):
+            # no crash
+            cached_round = ref is not None and round_idx < len(ref.rounds)
+            if cached_round:
+                params, nopt_result, nopt_time = ref.rounds[round_idx]
+            else:
                 params = util.gen_np_params_for_tir(func)
-                d['params'] = params
+            d['params'] = params
 
-                t0 = time.time()
-                opt_result = run_module(opt_mod, params)
-                opt_time = time.time() - t0
+            t0 = time.time()
+            opt_result = run_module(opt_mod, params)
+            opt_time = time.time() - t0
 
+            if not cached_round:
                 t0 = time.time()
                 nopt_result = run_module(nopt_mod, params)
                 nopt_time = time.time() - t0
+                if ref is not None:
+                    ref.rounds.append((params, nopt_result, nopt_time))
+                    d['ref'] = (func_hash, ref)
 
-                if not util.no_perf_degrad(opt_time, nopt_time):
-                    raise error.PerfDegradation
+            if not util.no_perf_degrad(opt_time, nopt_time):
+                raise error.PerfDegradation
+
+            if not outcome_equal(opt_result, nopt_result):
+                raise error.IncorrectResult
+
+    d['stage'] = BuildStage.FINISHED
+
+
+def no_exception_build_and_test_in_process(
+    func: tir.PrimFunc,
+    passes: List[tvm.ir.transform.Pass],
+    diff_test_round: int,
+    use_cov: bool,
+    d: dict,
+    shared: Optional[SharedHitmap] = None,
+    novelty: Optional[NoveltyIndex] = None,
+    pass_keys: Optional[list] = None,
+    prefix_cache: Optional[PassPrefixCache] = None,
+    ref_cache: Optional[ReferenceCache] = None,
+    limits: Optional[ResourceLimits] = None,
+    concurrent_nopt: bool = False,
+):
+    if limits is not None:
+        limits.apply()
+    try:
+        build_and_test_in_process(
+            func, passes, diff_test_round, use_cov, d, shared, novelty, pass_keys, prefix_cache,
+            ref_cache, concurrent_nopt)
+    except AssertionError as e:
+        raise e
+    except Exception as e:
+        d['exc'] = e
+    finally:
+        # Wall time when the build ended, for callers not waiting on it meanwhile.
+        d['end_time'] = time.time()
+
+
+def kill_process_tree(pid: int):
+    """Terminate the children of `pid` (e.g., compilers spawned by TVM)."""
+    try:
+        children = psutil.Process(pid).children(recursive=False)
+    except psutil.NoSuchProcess:
+        return
+    for child in children:
+        child: psutil.Process  # type: ignore
+        try:
+            child.terminate()
+            child.wait()
+            # print(f'{child} is terminated')
+        except psutil.NoSuchProcess:
+            pass
 
-                if not outcome_equal(opt_result, nopt_result):
-                    raise error.IncorrectResult
 
-        d['stage'] = BuildStage.FINISHED
+def is_dead_loop(d: dict, duration: Optional[float], build_timeout: float) -> bool:
+    return duration is not None and duration >= build_timeout and (
+        d['stage'] == BuildStage.COMPILE_NOPT or d['stage'] == BuildStage.DIFF_TEST)
 
-    def no_exception_wrapper(
+
+def sync_coverage(d: dict, shared: SharedHitmap, useful_pass_mask=None):
+    """Merge the coverage reported by a build process into the current process."""
+    if coverage.get_now() < shared.now:
+        shared.load()
+
+        if 'useless_pass_idx' in d and useful_pass_mask is not None:
+            useful_pass_mask[d['useless_pass_idx']] = 0
+
+
+def sync_novelty(d: dict, shared: SharedHitmap, novelty: NoveltyIndex, useful_pass_mask=None):
+    """Feed the per-test coverage reported by a build process to the novelty index."""
+    novelty.forget_last()
+    if shared.now > 0:
+        new_edges = novelty.observe(shared.hitmap)
+        if len(new_edges) > 0 and 'useless_pass_idx' in d and useful_pass_mask is not None:
+            useful_pass_mask[d['useless_pass_idx']] = 0
+
+
+def check_outcome(d: dict, crashed: bool):
+    """Raise the error (if any) of a finished build according to its last stage."""
+    if crashed:
+        if d['stage'] == BuildStage.COMPILE_NOPT:
+            # assert not 'cov_now' in d
+            raise error.RuntimeFailure('Failed in non-opt compilation')
+        elif d['stage'] == BuildStage.COMPILE_OPT:
+            # assert 'cov_now' in d
+            raise error.RuntimeFailure(
+                'Failed in optimized compilation but succeeded in non-opt comp.')
+        else:
+            raise error.RuntimeFailure(f"Failed in stage: {d['stage']}")
+    else:
+        # assert 'cov_now' in d
+        if 'exc' in d:
+            e: Exception = d['exc']
+            if isinstance(e, MemoryError):
+                raise error.OutOfMemory(f"MemoryError in stage: {d['stage']}")
+            elif type(e) == error.PerfDegradation:
+                raise error.PerfDegradation(d['params'])
+            elif type(e) == error.IncorrectResult:
+                raise error.IncorrectResult(d['params'])
+            else:
+                # print('=====================================================================')
+                # print(f'Error during compilation ({type(e)})!!! Check the semantic validity of TIR generated by Tzer')
+                # print(func)
+                # print(e)
+                raise e
+        else:
+            assert d['stage'] == BuildStage.FINISHED
+
+
+def build_and_test(
+    func: tir.PrimFunc,
+    passes: List[tvm.ir.transform.Pass],
+    build_timeout: float,
+    diff_test_round: int,
+    use_cov: bool,
+    useful_pass_mask = None,
+    novelty: Optional[NoveltyIndex] = None,
+    ref_cache: Optional[ReferenceCache] = None,
+    limits: Optional[ResourceLimits] = None,
+    concurrent_nopt: bool = False,
+):
+    BuildProcess(func, passes, build_timeout, diff_test_round, use_cov, useful_pass_mask,
+                 novelty, ref_cache, limits, concurrent_nopt).wait()
+
+
+class BuildProcess:
+    """`build_and_test` in two steps: the build process is started on construction and
+    `wait` gives its outcome, so the caller can do something else (e.g., mutate the next
+    test) meanwhile. `end_time` is set by `wait` to the time when the build ended, and
+    `cpu_time` to the CPU time it used (see `BuildMonitor.elapsed`)."""
+
+    def __init__(
+        self,
         func: tir.PrimFunc,
         passes: List[tvm.ir.transform.Pass],
+        build_timeout: float,
+        diff_test_round: int,
         use_cov: bool,
-        d: dict,
-    ):
-        try:
-            wrapper(func, passes, use_cov, d)
-        except AssertionError as e:
-            raise e
-        except Exception as e:
-            d['exc'] = e
-
-    with mp.Manager() as manager:
-        d: dict = manager.dict()  # type: ignore
-        p = mp.Process(target=no_exception_wrapper, args=(
+        useful_pass_mask = None,
+        novelty: Optional[NoveltyIndex] = None,
+        ref_cache: Optional[ReferenceCache] = None,
+        limits: Optional[ResourceLimits] = None,
+        concurrent_nopt: bool = False,
+    ) -> None:
+        self.build_timeout = build_timeout
+        self.use_cov = use_cov
+        self.useful_pass_mask = useful_pass_mask
+        self.novelty = novelty
+        self.ref_cache = ref_cache
+        self.limits = limits
+        self.end_time: Optional[float] = None
+        self.cpu_time: Optional[float] = None
+        self.shared = shared_hitmap() if use_cov else None
+        if self.shared is not None:
+            self.shared.clear()
+        if novelty is not None:
+            novelty.forget_last()
+        self.manager = mp.Manager()
+        self.d: dict = self.manager.dict()  # type: ignore
+        self.p = mp.Process(target=no_exception_build_and_test_in_process, args=(
             func, 
             passes, 
+            diff_test_round,
             use_cov,
-            d
+            self.d,
+            self.shared,
+            novelty,
+            None,
+            None,
+            ref_cache,
+            limits,
+            concurrent_nopt,
         ))
+        self.monitor = None
+        try:
+            self.p.start()
+            # Timeouts are in CPU time (see `BuildMonitor`).
+            self.monitor = BuildMonitor(self.p.pid, build_timeout)
+        except Exception as e:
+            self.start_error = e
+        else:
+            self.start_error = None
 
+    def wait(self):
+        try:
+            self._wait()
+        finally:
+            if self.end_time is None:
+                self.end_time = time.time()
+            self.manager.shutdown()
+
+    def _wait(self):
+        p, d, monitor = self.p, self.d, self.monitor
+        build_timeout, use_cov, shared = self.build_timeout, self.use_cov, self.shared
         p_duration = None
         try:
-            p.start()
-            p_strt_time = time.time()
-            p.join(timeout=build_timeout)
-            p_duration = time.time() - p_strt_time
+            if self.start_error is not None:
+                raise self.start_error
+            while True:
+                p.join(timeout=monitor.POLL_INTERVAL)
+                if not p.is_alive() or monitor.expired():
+                    break
+            p_duration = monitor.elapsed()
         finally:
-            if p.is_alive():
-                for child in psutil.Process(p.pid).children(recursive=False):
-                    child: psutil.Process  # type: ignore
-                    try:
-                        child.terminate()
-                        child.wait()
-                        # print(f'{child} is terminated')
-                    except psutil.NoSuchProcess:
-                        pass
+            timed_out = p.is_alive()
+            if timed_out:
+                kill_process_tree(p.pid)
                 p.terminate()
                 p.join()
+            elif cpu_limit_exceeded(p.exitcode):
+                timed_out = True
+                p_duration = build_timeout
+            self.cpu_time = p_duration
+            crashed = p.exitcode != 0
+            if crashed:
+                crashed = settle_concurrent_nopt(
+                    d, crashed, build_timeout - (p_duration or 0))
+            self.end_time = d.get('end_time', time.time())
+
+            if timed_out and crashed and is_dead_loop(d, p_duration, build_timeout):
+                # assert not 'cov_now' in d
+                raise error.MaybeDeadLoop
 
-                if p_duration is not None and p_duration >= build_timeout and (
-                    d['stage'] == BuildStage.COMPILE_NOPT or d['stage'] == BuildStage.DIFF_TEST):
-                    # assert not 'cov_now' in d
-                    raise error.MaybeDeadLoop
-
-            if use_cov and 'cov' in d:
-                now, hitmap = d['cov']
-                if coverage.get_now() < now:
-                    coverage.set_now(now)
-                    coverage.set_hitmap(hitmap)
-
-                    if 'useless_pass_idx' in d and useful_pass_mask is not None:
-                        useful_pass_mask[d['useless_pass_idx']] = 0
+            if use_cov:
+                if self.novelty is not None:
+                    sync_novelty(d, shared, self.novelty, self.useful_pass_mask)
+                else:
+                    sync_coverage(d, shared, self.useful_pass_mask)
         
         assert not p.is_alive(), 'The build process is expected to be dead.'
 
-        if p.exitcode != 0:
-            if d['stage'] == BuildStage.COMPILE_NOPT:
-                # assert not 'cov_now' in d
-                raise error.RuntimeFailure('Failed in non-opt compilation')
-            elif d['stage'] == BuildStage.COMPILE_OPT:
-                # assert 'cov_now' in d
-                raise error.RuntimeFailure(
-                    'Failed in optimized compilation but succeeded in non-opt comp.')
-            else:
-                raise error.RuntimeFailure(f"Failed in stage: {d['stage']}")
-        else:
-            # assert 'cov_now' in d
-            if 'exc' in d:
-                e: Exception = d['exc']
-                if type(e) == error.PerfDegradation:
-                    raise error.PerfDegradation(d['params'])
-                elif type(e) == error.IncorrectResult:
-                    raise error.IncorrectResult(d['params'])
-                else:
-                    # print('=====================================================================')
-                    # print(f'Error during compilation ({type(e)})!!! Check the semantic validity of TIR generated by Tzer')
-                    # print(func)
-                    # print(e)
-                    raise e
-            else:
-                assert d['stage'] == BuildStage.FINISHED
\ No newline at end of file
+        if self.ref_cache is not None and 'ref' in d:
+            self.ref_cache.put(*d['ref'])
+
+        if crashed and not timed_out and monitor is not None and \
+                monitor.out_of_memory(p.exitcode, self.limits):
+            raise error.OutOfMemory(
+                f'Exit code {p.exitcode}, peak memory {monitor.peak_memory / 2 ** 20:.0f} MB')
+
+        check_outcome(d, crashed=crashed)
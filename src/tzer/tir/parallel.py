@@ -0,0 +1,241 @@
+"""Fuzz with multiple worker processes sharing one seed pool.
+
+The coordinator (i.e., the process running `ParallelFuzzer.start`) owns the joint seed pool
+and the global coverage. Each worker is forked from it and repeatedly receives a seed,
+mutates it, builds the mutant with its own executor and sends back the mutant. Hitmaps are
+never pickled: a worker writes the per-test hitmap to its own shared region, from which the
+coordinator updates the novelty index. The index's global edges are shared with the workers
+(and their build children), so coverage feedback and the seed pool stay exactly as in the
+single-process `Fuzzer`.
+"""
+
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional
+import multiprocessing as mp
+import random
+
+import numpy as np
+from tqdm import tqdm
+
+from .fuzz import Fuzzer
+from .hitmap import SharedHitmap
+from .config import Config
+from .joint_seed_pool import JointSeed
+from .pass_fuzz.pass_mutator import tir_pass_graph, concretize_tir_passes
+from .visit import get_node_size
+
+
+def _worker_loop(fuzzer: 'ParallelFuzzer', worker_id: int, rng_seed: int, conn, shared):
+    random.seed(rng_seed + worker_id)
+    np.random.seed((rng_seed + worker_id) % (2 ** 32))
+    # Records are written by the coordinator only. Its buffers were flushed before forking.
+    fuzzer.reporter.cov_by_time_file = None
+    fuzzer.reporter.tir_by_time_file = None
+    fuzzer.executor = fuzzer.new_executor()
+    fuzzer.worker_hitmap = shared
+    if fuzzer.novelty is not None:
+        # Only the coordinator updates the index.
+        fuzzer.novelty.read_only = True
+    conn.send(('ready', None))
+    try:
+        while True:
+            try:
+                job = conn.recv()
+            except EOFError:
+                return
+            if job is None:
+                return
+            func, pass_names, n_ir_cont_fail, n_pass_cont_fail = job
+            seed = JointSeed(
+                tir_func=func,
+                pass_seq=tir_pass_graph.recover(pass_names),
+                n_ir_cont_fail=n_ir_cont_fail,
+                n_pass_cont_fail=n_pass_cont_fail)
+            conn.send(('done', fuzzer.run_job(seed)))
+    finally:
+        fuzzer.executor.close()
+
+
+@dataclass
+class _Worker:
+    process: mp.Process
+    conn: object
+    shared: Optional[SharedHitmap]      # Where the worker reports per-test coverage.
+    seed: Optional[JointSeed] = None    # Seed being mutated by the worker.
+
+
+class ParallelFuzzer(Fuzzer):
+    def __init__(self, config: Config) -> None:
+        super().__init__(config)
+        self.workers: List[_Worker] = []
+        self.worker_hitmap: Optional[SharedHitmap] = None
+
+    def run_job(self, seed: JointSeed) -> dict:
+        """Mutate and build the seed in a worker. The result is sent to the coordinator."""
+        try:
+            func_mutant, pass_mutant, fallback = self.make_mutant(seed)
+        except KeyboardInterrupt as e:
+            raise e
+        except Exception as e:
+            return {'gen_failure': True}
+
+        passes, pass_keys = concretize_tir_passes(pass_mutant)
+        node_count = '?' if self.config.use_none else get_node_size(func_mutant)
+
+        result = self.build(func_mutant, passes, pass_keys,
+                            node_count if node_count != '?' else None)
+        self.report_bug(result, func_mutant, passes)
+
+        if self.novelty is not None and self.novelty.last_hitmap is not None:
+            self.worker_hitmap.store(self.novelty.last_hitmap)
+
+        return {
+            'gen_failure': False,
+            'func': func_mutant,
+            'pass_names': tir_pass_graph.export_name(pass_mutant),
+            'fallback': fallback,
+            'compiled': result.compiled,
+            'cached': result.cached,
+            'rejected': result.rejected,
+            'bug': result.bug is not None,
+            'build_time': result.build_time,
+            'useful_pass_mask': result.useful_pass_mask,
+            'node_count': node_count,
+            'pass_keys': pass_keys,
+        }
+
+    def _spawn_worker(self, worker_id: int, rng_seed: int) -> _Worker:
+        # Avoid writing buffered records twice (by the coordinator and by the child).
+        for f in [self.reporter.cov_by_time_file, self.reporter.tir_by_time_file,
+                  self.reporter.pool_by_time_file]:
+            if f is not None:
+                f.flush()
+        shared = SharedHitmap() if self.config.use_coverage else None
+        parent_conn, child_conn = mp.Pipe()
+        process = mp.Process(
+            target=_worker_loop, args=(self, worker_id, rng_seed, child_conn, shared))
+        process.start()
+        child_conn.close()
+        msg, _ = parent_conn.recv()
+        assert msg == 'ready'
+        return _Worker(process=process, conn=parent_conn, shared=shared)
+
+    def _stop_worker(self, worker: _Worker):
+        try:
+            worker.conn.send(None)
+        except (BrokenPipeError, ConnectionError):
+            pass
+        worker.process.join(timeout=self.config.building_timeout_in_seconds)
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join()
+        worker.conn.close()
+
+    def _can_dispatch(self, n_in_flight: int) -> bool:
+        if self.config.iterations is not None:
+            return self.current_point + n_in_flight < self.end_point
+        return self.current_point < self.end_point
+
+    def _dispatch(self, worker: _Worker):
+        if self.joint_seed_pool.size() == 0:
+            self.joint_seed_pool.put()  # empty tir by default.
+        _, seed = self.joint_seed_pool.random_pick()
+        if worker.shared is not None:
+            worker.shared.clear()
+        worker.conn.send((
+            seed.tir_func,
+            tir_pass_graph.export_name(seed.pass_seq),
+            seed.n_ir_cont_fail,
+            seed.n_pass_cont_fail))
+        worker.seed = seed
+
+    def _collect(self, pbar, worker: _Worker, result: dict):
+        seed = worker.seed
+        worker.seed = None
+        if result['gen_failure']:
+            self.n_failed += 1
+            self.update_loop_info(pbar, 0, 0, 'gen-failure')
+            return
+
+        if result['bug']:
+            # Already reported by the worker.
+            self.reporter.n_bug += 1
+        if result['cached']:
+            self.n_build_cache_hit += 1
+        if result['rejected']:
+            self.n_rejected += 1
+            if result['compiled'] is True:
+                self.n_false_reject += 1
+        if result['compiled'] is True:
+            self.n_pass_compilation += 1
+        elif result['compiled'] is False:
+            self.n_failed += 1
+
+        cov_increase = 1
+        new_edges = None
+        if self.novelty is not None:
+            new_edges = np.zeros(0, dtype=np.int64)
+            if worker.shared.now > 0:
+                new_edges = self.novelty.update(worker.shared.hitmap)
+            cov_increase = len(new_edges)
+
+        if self.reporter.cov_by_time_file:
+            self.reporter.record_coverage()
+
+        if self.reporter.tir_by_time_file:
+            self.reporter.record_tir_and_passes(result['func'], result['pass_keys'])
+
+        self.feedback(
+            seed,
+            result['func'],
+            tir_pass_graph.recover(result['pass_names']),
+            result['fallback'],
+            cov_increase,
+            result['compiled'] is True,
+            result['useful_pass_mask'],
+            new_edges,
+            result['node_count'] if result['node_count'] != '?' else None,
+            result['build_time'],
+            worker.shared.hitmap if worker.shared is not None and worker.shared.now > 0 else None)
+
+        self.update_loop_info(pbar, result['build_time'], result['node_count'], 'mut-new')
+
+    def start(self):
+        self.ready()
+        rng_seed = random.randrange(2 ** 32)
+        self.workers = [self._spawn_worker(i, rng_seed)
+                        for i in range(self.config.n_workers)]
+        try:
+            with tqdm(total=int(self.end_point - self.start_point)) as pbar:
+                idle = list(range(len(self.workers)))
+                busy: Dict[object, int] = {}
+                while True:
+                    while idle and self._can_dispatch(len(busy)):
+                        idx = idle.pop()
+                        self._dispatch(self.workers[idx])
+                        busy[self.workers[idx].conn] = idx
+                    if not busy:
+                        break
+                    for conn in wait(list(busy.keys())):
+                        idx = busy.pop(conn)
+                        worker = self.workers[idx]
+                        try:
+                            msg, result = conn.recv()
+                            assert msg == 'done'
+                            self._collect(pbar, worker, result)
+                        except (EOFError, ConnectionError):
+                            # The worker itself (rather than a build) crashed.
+                            print(f'Worker {idx} exited unexpectedly. Respawning it.')
+                            worker.seed = None
+                            self._stop_worker(worker)
+                            self.n_failed += 1
+                            self.update_loop_info(pbar, 0, 0, 'worker-failure')
+                            self.workers[idx] = self._spawn_worker(
+                                idx, random.randrange(2 ** 32))
+                        idle.append(idx)
+        finally:
+            for worker in self.workers:
+                self._stop_worker(worker)
+            self.executor.close()
+        self.dump_hitmap()
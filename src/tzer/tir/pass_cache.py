@@ -0,0 +1,53 @@
+"""Cache the TIR modules produced by prefixes of pass sequences.
+
+Seeds keep (and mutate) their pass sequences, so consecutive tests often share long pass
+prefixes. Like `tzer.pass_opt.OptimizeTree` does for Relay, the module obtained after each
+prefix is kept, keyed by the structural hash of the input module and the keys of the
+concretized passes (see `PassNode.concretize`), so that only the differing suffix re-runs.
+
+The cache only helps in a process that runs many tests, i.e., the fork-server worker.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+import tvm
+
+
+class PassPrefixCache:
+    def __init__(self, capacity_in_mb: float) -> None:
+        self.capacity = int(capacity_in_mb * 2 ** 20)
+        # Key: (hash of input module, *pass keys) -> (module, estimated bytes)
+        self.entries: 'OrderedDict[tuple, Tuple[tvm.ir.IRModule, int]]' = OrderedDict()
+        self.n_bytes = 0
+        self.n_lookup = 0
+        self.n_hit = 0
+        self.n_pass_skipped = 0
+
+    def lookup(self, root_hash: int, pass_keys: List[Hashable]) -> Tuple[int, Optional[tvm.ir.IRModule]]:
+        """Returns the length of the longest cached prefix and the module after it."""
+        self.n_lookup += 1
+        for n in range(len(pass_keys), 0, -1):
+            key = (root_hash, *pass_keys[:n])
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.n_hit += 1
+                self.n_pass_skipped += n
+                return n, self.entries[key][0]
+        return 0, None
+
+    def put(self, root_hash: int, pass_keys: List[Hashable], mod: tvm.ir.IRModule):
+        """Cache `mod`, the result of applying passes of `pass_keys` to the root module."""
+        key = (root_hash, *pass_keys)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        # The serialized size is a good enough estimation of the memory held by `mod`.
+        size = len(tvm.ir.save_json(mod))
+        if size > self.capacity:
+            return
+        self.entries[key] = (mod, size)
+        self.n_bytes += size
+        while self.n_bytes > self.capacity:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.n_bytes -= evicted_size
@@ -1,6 +1,5 @@
 from multiprocessing import Manager
 from multiprocessing.context import Process
-import queue
 import tvm
 
 from time import time
@@ -11,6 +10,7 @@ from tzer.tir.domain.node import LazyDomNode
 from tzer.tir.error import *
 
 from tzer.tvmpass import PassDependenceGraph
+from tzer.tir.hitmap import shared_hitmap
 from tzer.evolution.fitness import MAX, FitnessElites
 
 try:
@@ -28,6 +28,11 @@ def random_tir_passes():
 def export_tir_pass(nodes):
     return tir_pass_graph.export_name(nodes)
 
+def concretize_tir_passes(nodes):
+    """Returns the concrete TVM passes of `nodes` and their keys (see `PassNode.concretize`)."""
+    concrete = [node.concretize() for node in nodes]
+    return [p for p, _ in concrete], [key for _, key in concrete]
+
 def lower_tir_primfunc(f: tir.PrimFunc) -> tvm.ir.IRModule:
     return tvm.IRModule({"main": f})
 
@@ -59,16 +64,6 @@ def build_opt_tir_module(ir_m, tir_pass_nodes) -> tir.PrimFunc:
 
 
 def infer_pass_from_tir(root: LazyDomNode):
-        tree = queue.Queue()
-        tree.put(root)
-        nodes = []
-        while not tree.empty():
-            n = tree.get()
-            for c in n.children:
-                tree.put(c)
-            nodes.append(n)
-
-
         common_nodes = [
             tir_pass_graph.tir_pass_nodes['CoProcSync'],
             tir_pass_graph.tir_pass_nodes['CombineContextCall'],
@@ -92,7 +87,7 @@ def infer_pass_from_tir(root: LazyDomNode):
 
         specific_nodes = []
 
-        node_types = [type(i.cons) for i in nodes]
+        node_types = (type(node.cons) for node in root.iter_nodes())
 
         for t in node_types:
             if t == While or t == For:
@@ -163,6 +158,8 @@ class CFPassMutator:
         
         manager = Manager()
         return_dict = manager.dict()
+        shared = shared_hitmap()
+        shared.clear()
 
         def run(func, args, kwargs, return_dict):
 
@@ -181,8 +178,7 @@ class CFPassMutator:
             return_dict['blocks'] = coverage.get_now()
             return_dict['execute_time'] = time() - start_time
             coverage.pop()
-            return_dict['cov'] = coverage.get_now()
-            return_dict['hitmap'] = coverage.get_hitmap()
+            shared.dump()
 
         old_coverage = coverage.get_now()
 
@@ -190,8 +186,8 @@ class CFPassMutator:
         p.start()
         p.join(timeout=self.timeout)
 
-        coverage.set_now(return_dict['cov'])
-        coverage.set_hitmap(return_dict['hitmap'])
+        if shared.now >= 0:
+            shared.load()
 
         return_dict['inc_cov'] = coverage.get_now() - old_coverage
         self.evolution.set_genotypes_result(index, return_dict)
@@ -0,0 +1,101 @@
+"""Online prediction of which mutants compile, to build the most promising ones of a batch.
+
+A `ValidityPredictor` is a logistic regression over cheap features of a test (func, passes):
+
+- the histogram of node kinds of the function (in log scale), memoized by node so that a
+  mutant only costs a visit of the nodes it does not share with its seed;
+- its size and number of passes (in log scale);
+- a bag of words of its pass names.
+
+It is trained by one AdaGrad step per build outcome (`BuildResult.compiled`, i.e., a test
+raising `RuntimeFailure` or timing out did compile), which takes microseconds on CPU. Each
+outcome is first predicted, so that the precision and recall of the predictor (on the class
+"compiles") over recent builds tell how it drifts over the campaign.
+"""
+
+from collections import deque
+from typing import Deque, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from tvm import tir
+
+from .visit.cache import NodeCache
+from .visit.path import KIND_NAMES, children, node_spec
+
+HISTOGRAM_CACHE = NodeCache()
+
+_N_KINDS = len(KIND_NAMES)
+
+
+def kind_histogram(op) -> np.ndarray:
+    """Number of nodes of each kind (see `KIND_NAMES`) in `op`. Do not modify the result."""
+    res = HISTOGRAM_CACHE.get(op)
+    if res is not None:
+        return res
+    res = np.zeros(_N_KINDS, dtype=np.int32)
+    res[node_spec(type(op))[0]] = 1
+    for child in children(op):
+        res += kind_histogram(child)
+    HISTOGRAM_CACHE.put(op, res)
+    return res
+
+
+class ValidityPredictor:
+    N_PASS_FEATURES = 128   # Pass names beyond it share features.
+    MIN_SAMPLES = 100       # Outcomes observed before the predictor is used.
+    WINDOW = 1000           # Recent predictions to compute precision and recall.
+    LEARNING_RATE = 0.1
+
+    def __init__(self) -> None:
+        self.n_features = 1 + _N_KINDS + 2 + self.N_PASS_FEATURES
+        self.weights = np.zeros(self.n_features)
+        self.grad_squares = np.full(self.n_features, 1e-8)
+        self.pass_vocab: Dict[str, int] = {}
+        self.n_observed = 0
+        # (predicted to compile, compiled) of recent outcomes.
+        self.recent: Deque[Tuple[bool, bool]] = deque(maxlen=self.WINDOW)
+
+    def ready(self) -> bool:
+        return self.n_observed >= self.MIN_SAMPLES
+
+    def features(self, func: Optional[tir.PrimFunc], pass_keys: Optional[Sequence[tuple]]) -> np.ndarray:
+        x = np.zeros(self.n_features)
+        x[0] = 1.
+        if func is not None:
+            histogram = kind_histogram(func)
+            x[1:1 + _N_KINDS] = np.log1p(histogram)
+            x[1 + _N_KINDS] = np.log1p(histogram.sum())
+        pass_keys = pass_keys or ()
+        x[2 + _N_KINDS] = np.log1p(len(pass_keys))
+        for key in pass_keys:
+            idx = self.pass_vocab.setdefault(key[0], len(self.pass_vocab)) % self.N_PASS_FEATURES
+            x[3 + _N_KINDS + idx] += 1.
+        return x
+
+    def _predict(self, x: np.ndarray) -> float:
+        return float(1. / (1. + np.exp(-np.clip(x @ self.weights, -30., 30.))))
+
+    def score(self, func: Optional[tir.PrimFunc], pass_keys: Optional[Sequence[tuple]]) -> float:
+        """Predicted probability that the test compiles."""
+        return self._predict(self.features(func, pass_keys))
+
+    def observe(self, func: Optional[tir.PrimFunc], pass_keys: Optional[Sequence[tuple]], compiled: bool):
+        x = self.features(func, pass_keys)
+        p = self._predict(x)
+        if self.ready():
+            self.recent.append((p >= 0.5, compiled))
+        grad = (p - float(compiled)) * x
+        self.grad_squares += grad * grad
+        self.weights -= self.LEARNING_RATE * grad / np.sqrt(self.grad_squares)
+        self.n_observed += 1
+
+    def precision_recall(self) -> Tuple[float, float]:
+        """Of recent outcomes, the precision and recall of predicting that tests compile."""
+        if not self.recent:
+            return 0., 0.
+        outcomes = np.array(self.recent, dtype=bool)
+        predicted, compiled = outcomes[:, 0], outcomes[:, 1]
+        true_pos = np.count_nonzero(predicted & compiled)
+        precision = true_pos / max(np.count_nonzero(predicted), 1)
+        recall = true_pos / max(np.count_nonzero(compiled), 1)
+        return float(precision), float(recall)
@@ -0,0 +1,183 @@
+"""In-process checks rejecting mutants that cannot build, before spawning a build for them.
+
+Many mutants fail to build for trivial reasons, yet each of them costs a build process.
+`Prevalidator.check` looks for such reasons in the fuzzer process:
+
+- unbound variables: free variables (`TIRFreeVar`) of the function that are not bound by its
+  parameters, its buffer map or a thread/virtual thread attribute;
+- undeclared buffers: buffers loaded or stored whose data is neither a parameter, in the
+  buffer map nor allocated (or realized) around the access;
+- dtype mismatches: holes whose dtype is fixed by their node (e.g., the condition of an
+  `IfThenElse` is a bool and the value of a `LetStmt` has the dtype of its variable),
+  checked with `satisfies`;
+- TVM's own well-formedness analysis, if the linked TVM has one.
+
+The first two kinds are memoized by node (as free variables are), so that checking a mutant
+only visits the nodes it does not share with its seed. A rejected mutant counts as a failed
+build without being built. The checks are conservative but not proven complete, so in
+`verify` mode rejected mutants are still built and those that compile are reported as false
+rejects.
+"""
+
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import tvm
+from tvm import tir
+from tvm.runtime import DataType
+
+from .semantic.constraint import PrimExprConstraint, satisfies
+from .visit import get_free_vars, iter_nodes
+from .visit.cache import NodeCache
+from .visit.path import children
+
+try:
+    from tvm.contrib import coverage
+except Exception as e:
+    print(f'No coverage in linked TVM. {e}')
+
+PREVALIDATE_MODES = ['off', 'on', 'verify']
+
+PREVALIDATE_CACHE = NodeCache()
+
+_EMPTY: FrozenSet[tir.Var] = frozenset()
+
+
+def _element_dtype(buffer_var: tir.Var) -> Optional[str]:
+    annotation = getattr(buffer_var, 'type_annotation', None)
+    if isinstance(annotation, tvm.ir.PointerType) and isinstance(annotation.element_type, tvm.ir.PrimType):
+        return annotation.element_type.dtype
+    return None
+
+
+def _with_lanes(dtype: Optional[str], value: tir.PrimExpr) -> Optional[str]:
+    """`dtype` with as many lanes as `value` (e.g., for vector stores)."""
+    if dtype is None:
+        return None
+    lanes = DataType(value.dtype).lanes
+    return dtype if lanes == 1 else f'{dtype}x{lanes}'
+
+
+# Node type -> holes whose dtype is fixed by the node: (field, dtype of the field or None if
+# unknown).
+_DTYPE_HOLES: Dict[type, List[Tuple[str, Callable[..., Optional[str]]]]] = {
+    tir.IfThenElse: [('condition', lambda op: 'bool')],
+    tir.stmt.While: [('condition', lambda op: 'bool')],
+    tir.AssertStmt: [('condition', lambda op: 'bool')],
+    tir.Allocate: [('condition', lambda op: 'bool')],
+    tir.Let: [('value', lambda op: op.var.dtype)],
+    tir.LetStmt: [('value', lambda op: op.var.dtype)],
+    tir.For: [('min', lambda op: op.loop_var.dtype), ('extent', lambda op: op.loop_var.dtype)],
+    tir.Store: [('value', lambda op: _with_lanes(_element_dtype(op.buffer_var), op.value))],
+    tir.BufferStore: [('value', lambda op: _with_lanes(op.buffer.dtype, op.value))],
+}
+
+
+def _buffers_used(op) -> FrozenSet[tir.Var]:
+    """Data of the buffers loaded, stored or prefetched by `op` itself."""
+    if isinstance(op, (tir.BufferLoad, tir.BufferStore, tir.Prefetch)):
+        return frozenset((op.buffer.data,))
+    return _EMPTY
+
+
+def _buffers_declared(op) -> FrozenSet[tir.Var]:
+    """Data of the buffers that `op` declares for its children."""
+    if isinstance(op, tir.Allocate):
+        return frozenset((op.buffer_var,))
+    if isinstance(op, tir.BufferRealize):
+        return frozenset((op.buffer.data,))
+    if isinstance(op, tir.Block):
+        return frozenset(b.data for b in op.alloc_buffers) | \
+            frozenset(m.buffer.data for m in op.match_buffers)
+    return _EMPTY
+
+
+def _check_node(op) -> Tuple[Optional[str], FrozenSet[tir.Var]]:
+    """The first dtype mismatch in `op` (if any) and the data of the buffers used in `op`
+    but not declared in it."""
+    res = PREVALIDATE_CACHE.get(op)
+    if res is not None:
+        return res
+    mismatch = None
+    for field, expected in _DTYPE_HOLES.get(type(op), []):
+        value = getattr(op, field)
+        dtype = expected(op)
+        if value is not None and dtype is not None and not satisfies(value, PrimExprConstraint(dtype)):
+            mismatch = f'dtype: {type(op).__name__}.{field} is {value.dtype}, expected {dtype}'
+            break
+    buffers = _buffers_used(op)
+    for child in children(op):
+        child_mismatch, child_buffers = _check_node(child)
+        mismatch = mismatch or child_mismatch
+        buffers |= child_buffers
+    res = mismatch, buffers - _buffers_declared(op)
+    PREVALIDATE_CACHE.put(op, res)
+    return res
+
+
+def _bound_by_buffer_map(func: tir.PrimFunc) -> FrozenSet[tir.Var]:
+    res = set()
+    for buffer in func.buffer_map.values():
+        res.add(buffer.data)
+        for expr in [*buffer.shape, *buffer.strides, buffer.elem_offset]:
+            if isinstance(expr, tir.PrimExpr):
+                res |= get_free_vars(expr)
+    return frozenset(res)
+
+
+def _bound_by_attrs(func: tir.PrimFunc) -> FrozenSet[tir.Var]:
+    return frozenset(op.node.var for op in iter_nodes(func.body, tir.AttrStmt)
+                     if isinstance(op.node, tir.IterVar))
+
+
+class Prevalidator:
+    def __init__(self, verify: bool = False, use_cov: bool = False) -> None:
+        # Rejected mutants are still built, to count false rejects.
+        self.verify = verify
+        self.use_cov = use_cov
+        self.n_checked = 0
+        self.reasons: Dict[str, int] = {}   # Kind of reason -> rejected mutants.
+        # The same mutant is checked again when a batch falls back to building it alone.
+        self.last = NodeCache(capacity=64)
+        self.verify_well_formed = getattr(tvm.tir.analysis, 'verify_well_formed', None)
+
+    def check(self, func: tir.PrimFunc) -> Optional[str]:
+        """Why `func` cannot build, or None if it may."""
+        reason = self.last.get(func, '')
+        if reason != '':
+            return reason
+        self.n_checked += 1
+        reason = self._check(func)
+        self.last.put(func, reason)
+        if reason is not None:
+            kind = reason.split(':')[0]
+            self.reasons[kind] = self.reasons.get(kind, 0) + 1
+        return reason
+
+    def _check(self, func: tir.PrimFunc) -> Optional[str]:
+        mismatch, buffers = _check_node(func.body)
+        if mismatch is not None:
+            return mismatch
+
+        bound = frozenset(func.params) | _bound_by_buffer_map(func)
+        unbound = (get_free_vars(func) | buffers) - bound
+        if unbound:
+            unbound -= _bound_by_attrs(func)
+        for var in unbound:
+            if var in buffers:
+                return f'buffer: {var.name} is neither in the buffer map nor allocated'
+            return f'unbound: {var.name} is not bound'
+
+        if self.verify_well_formed is not None:
+            if self.use_cov:
+                now, hitmap = coverage.get_now(), coverage.get_hitmap()
+            try:
+                if not self.verify_well_formed(func, False):
+                    return 'well-formed: rejected by verify_well_formed'
+            except tvm.TVMError as e:
+                return f'well-formed: {str(e).strip().splitlines()[-1]}'
+            finally:
+                if self.use_cov:
+                    # Checking a mutant should not count as coverage of any test.
+                    coverage.set_now(now)
+                    coverage.set_hitmap(hitmap)
+        return None
@@ -0,0 +1,225 @@
+"""Streaming log of the tested TIR functions and passes (`TIR_REC=1`).
+
+Records are buffered and written in frames, each compressed as a whole (zstd, else lz4,
+else zlib) and checksummed:
+
+    frame  := [magic: 4s][codec: u8][n_records: u32][raw_len: u32][comp_len: u32][crc32: u32]
+              [compressed payload: comp_len bytes]
+    payload:= ([len: u32][JSON record: len bytes])*
+
+A JSON record is `{"t": time, "func": tvm.ir.save_json(func), "passes": pass keys}`, where
+pass keys are the names of `PassDependenceGraph.export_name` with their concrete arguments
+(see `PassNode.concretize`), so no (d)ill-pickled object is needed to replay a test.
+
+A sidecar index holds one fixed-size entry per frame, [offset: u64][first record: u64]
+[n_records: u32], giving random access to records and a cheap way to skip a corrupted frame.
+Without the index, readers resynchronize by searching the next magic.
+"""
+
+from dataclasses import dataclass
+from typing import Hashable, Iterator, List, Optional, Tuple
+import atexit
+import bisect
+import json
+import os
+import struct
+import zlib
+
+import tvm
+from tvm import tir
+
+_MAGIC = b'TZRC'
+_FRAME_HEADER = struct.Struct('<4sBIIII')
+_RECORD_LEN = struct.Struct('<I')
+_INDEX_ENTRY = struct.Struct('<QQI')
+
+INDEX_SUFFIX = '.idx'
+
+_ZLIB, _LZ4, _ZSTD = 0, 1, 2
+_CODECS = {_ZLIB: (zlib.compress, zlib.decompress)}
+try:
+    import zstandard
+    _CODECS[_ZSTD] = (zstandard.ZstdCompressor().compress,
+                      zstandard.ZstdDecompressor().decompress)
+except ImportError:
+    pass
+try:
+    import lz4.frame
+    _CODECS[_LZ4] = (lz4.frame.compress, lz4.frame.decompress)
+except ImportError:
+    pass
+
+
+def _best_codec() -> int:
+    for codec in [_ZSTD, _LZ4, _ZLIB]:
+        if codec in _CODECS:
+            return codec
+
+
+@dataclass
+class TIRRecord:
+    time: float
+    func: Optional[tir.PrimFunc]
+    pass_keys: List[Tuple[Hashable, ...]]
+
+
+class CorruptedFrame(Exception):
+    pass
+
+
+class RecordWriter:
+    def __init__(self, path: str, frame_size: int = 64) -> None:
+        self.path = path
+        self.file = open(path, 'wb')
+        self.index_file = open(path + INDEX_SUFFIX, 'wb')
+        self.frame_size = frame_size  # Records per frame.
+        self.codec = _best_codec()
+        self.pending: List[bytes] = []
+        self.n_records = 0
+        atexit.register(self.flush)
+
+    def write(self, time: float, func: Optional[tir.PrimFunc], pass_keys):
+        record = json.dumps({
+            't': time,
+            'func': tvm.ir.save_json(func) if func is not None else None,
+            'passes': [list(key) for key in pass_keys or []],
+        }).encode()
+        self.pending.append(_RECORD_LEN.pack(len(record)) + record)
+        if len(self.pending) >= self.frame_size:
+            self.flush()
+
+    def flush(self):
+        """Write the pending records as a frame."""
+        if self.pending:
+            raw = b''.join(self.pending)
+            compressed = _CODECS[self.codec][0](raw)
+            offset = self.file.tell()
+            self.file.write(_FRAME_HEADER.pack(
+                _MAGIC, self.codec, len(self.pending), len(raw), len(compressed),
+                zlib.crc32(compressed)))
+            self.file.write(compressed)
+            self.index_file.write(_INDEX_ENTRY.pack(
+                offset, self.n_records, len(self.pending)))
+            self.n_records += len(self.pending)
+            self.pending = []
+        self.file.flush()
+        self.index_file.flush()
+
+
+def _decode(record: bytes) -> TIRRecord:
+    obj = json.loads(record)
+    return TIRRecord(
+        time=obj['t'],
+        func=tvm.ir.load_json(obj['func']) if obj['func'] is not None else None,
+        pass_keys=[tuple(key) for key in obj['passes']])
+
+
+class RecordReader:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(path, 'rb')
+        self.size = os.path.getsize(path)
+        # [(offset, first record, n_records)]
+        self.frames: List[Tuple[int, int, int]] = []
+        if os.path.exists(path + INDEX_SUFFIX):
+            with open(path + INDEX_SUFFIX, 'rb') as f:
+                data = f.read()
+            n_entries = len(data) // _INDEX_ENTRY.size
+            self.frames = [_INDEX_ENTRY.unpack_from(data, i * _INDEX_ENTRY.size)
+                           for i in range(n_entries)]
+        else:
+            self._scan()
+
+    def _scan(self):
+        """Rebuild the frame table by walking (and resynchronizing through) the log."""
+        offset, n_records = 0, 0
+        while offset is not None:
+            try:
+                n, next_offset = self._frame_header(offset)
+                self.frames.append((offset, n_records, n))
+                n_records += n
+                offset = next_offset
+            except CorruptedFrame:
+                offset = self._next_magic(offset + 1)
+
+    def _next_magic(self, start: int) -> Optional[int]:
+        self.file.seek(start)
+        chunk_size = 1 << 20
+        while True:
+            pos = self.file.tell()
+            chunk = self.file.read(chunk_size + len(_MAGIC) - 1)
+            if len(chunk) < len(_MAGIC):
+                return None
+            found = chunk.find(_MAGIC)
+            if found >= 0:
+                return pos + found
+            self.file.seek(pos + chunk_size)
+
+    def _frame_header(self, offset: int) -> Tuple[int, int]:
+        """Returns the number of records of the frame at `offset` and the next offset."""
+        if offset + _FRAME_HEADER.size > self.size:
+            raise CorruptedFrame(offset)
+        self.file.seek(offset)
+        magic, codec, n, _, comp_len, _ = _FRAME_HEADER.unpack(
+            self.file.read(_FRAME_HEADER.size))
+        end = offset + _FRAME_HEADER.size + comp_len
+        if magic != _MAGIC or codec not in _CODECS or end > self.size:
+            raise CorruptedFrame(offset)
+        return n, end
+
+    def __len__(self) -> int:
+        if not self.frames:
+            return 0
+        _, first, n = self.frames[-1]
+        return first + n
+
+    def read_frame(self, frame_id: int) -> List[bytes]:
+        offset, _, _ = self.frames[frame_id]
+        self.file.seek(offset)
+        header = self.file.read(_FRAME_HEADER.size)
+        if len(header) < _FRAME_HEADER.size:
+            raise CorruptedFrame(offset)
+        magic, codec, n, raw_len, comp_len, crc = _FRAME_HEADER.unpack(header)
+        if magic != _MAGIC or codec not in _CODECS:
+            raise CorruptedFrame(offset)
+        compressed = self.file.read(comp_len)
+        if len(compressed) < comp_len or zlib.crc32(compressed) != crc:
+            raise CorruptedFrame(offset)
+        raw = _CODECS[codec][1](compressed)
+        if len(raw) != raw_len:
+            raise CorruptedFrame(offset)
+        records, pos = [], 0
+        for _ in range(n):
+            length, = _RECORD_LEN.unpack_from(raw, pos)
+            pos += _RECORD_LEN.size
+            records.append(raw[pos:pos + length])
+            pos += length
+        return records
+
+    def __iter__(self) -> Iterator[TIRRecord]:
+        return self.iter_range(0, len(self))
+
+    def iter_range(self, start: int, stop: int) -> Iterator[TIRRecord]:
+        """Records in [start, stop). Corrupted frames are skipped."""
+        if start >= stop:
+            return
+        firsts = [first for _, first, _ in self.frames]
+        frame_id = max(bisect.bisect_right(firsts, start) - 1, 0)
+        for frame_id in range(frame_id, len(self.frames)):
+            _, first, n = self.frames[frame_id]
+            if first >= stop:
+                break
+            try:
+                records = self.read_frame(frame_id)
+            except CorruptedFrame:
+                continue
+            for i in range(max(start - first, 0), min(stop - first, n)):
+                yield _decode(records[i])
+
+    def __getitem__(self, i: int) -> TIRRecord:
+        for record in self.iter_range(i, i + 1):
+            return record
+        raise IndexError(f'Record {i} is missing or corrupted')
+
+    def close(self):
+        self.file.close()
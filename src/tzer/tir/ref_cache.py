@@ -0,0 +1,65 @@
+"""Cache the reference (`opt_level=0`) side of differential tests.
+
+The unoptimized build of a function does not depend on the passes under test, and mutants
+often keep the function of their seed (e.g., when only passes are mutated). So the build is
+exported once as a shared library, keyed by the structural hash of the function, together
+with the parameters and outputs of each differential-testing round. Following tests of the
+same function then only compile and run the optimized side.
+
+The executor (i.e., the fuzzer side) owns the cache: build processes report new references
+in `d['ref']` and inherit the cache when they are forked.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+import os
+import shutil
+import tempfile
+
+
+@dataclass
+class Reference:
+    lib_path: Optional[str]
+    # (params, outcome, run time) of each differential-testing round.
+    rounds: List[Tuple[list, Any, float]] = field(default_factory=list)
+
+
+class ReferenceCache:
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.entries: 'OrderedDict[int, Reference]' = OrderedDict()
+        # Created by the owner, before build processes are forked, so that it is shared.
+        self.folder: Optional[str] = tempfile.mkdtemp(prefix='tzer-ref-')
+        self.n_lookup = 0
+        self.n_hit = 0
+
+    def lib_path(self, func_hash: int) -> str:
+        assert self.folder is not None, 'The cache is closed'
+        return os.path.join(self.folder, f'{func_hash:x}.so')
+
+    def get(self, func_hash: int) -> Optional[Reference]:
+        self.n_lookup += 1
+        ref = self.entries.get(func_hash)
+        if ref is not None:
+            self.entries.move_to_end(func_hash)
+            self.n_hit += 1
+        return ref
+
+    def put(self, func_hash: int, ref: Reference):
+        old = self.entries.get(func_hash)
+        if old is None or len(ref.rounds) >= len(old.rounds):
+            self.entries[func_hash] = ref
+        self.entries.move_to_end(func_hash)
+        while len(self.entries) > self.capacity:
+            _, evicted = self.entries.popitem(last=False)
+            if evicted.lib_path is not None:
+                try:
+                    os.remove(evicted.lib_path)
+                except FileNotFoundError:
+                    pass
+
+    def close(self):
+        if self.folder is not None:
+            shutil.rmtree(self.folder, ignore_errors=True)
+            self.folder = None
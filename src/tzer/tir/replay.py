@@ -0,0 +1,108 @@
+"""Replay recorded tests to measure coverage over time (`get_cov*.py`) with many processes.
+
+Each test is replayed from a reset coverage, so its hitmap only holds its own edges. Tests
+are sharded in chunks of consecutive records over worker processes, and the coordinator
+folds their hitmaps in record order (a prefix-OR). This gives the same coverage after each
+test as replaying all tests serially from the cumulative coverage.
+"""
+
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+import multiprocessing as mp
+
+import numpy as np
+
+try:
+    from tvm.contrib import coverage
+except Exception as e:
+    print(f'No coverage in linked TVM. {e}')
+
+# `run_chunk(start, stop)` yields, for each (readable) test in [start, stop), its metadata
+# (e.g., its time) and a callable running the test and returning if it is valid.
+# Preparations (e.g., loading the test) must be done before yielding as coverage is only
+# collected when calling.
+RunChunk = Callable[[int, int], Iterable[Tuple[Any, Callable[[], bool]]]]
+_ChunkResult = List[Tuple[Any, bool, np.ndarray]]
+
+
+def _run_chunk(run_chunk: RunChunk, start: int, stop: int) -> _ChunkResult:
+    results = []
+    for meta, test in run_chunk(start, stop):
+        coverage.reset()
+        valid = test()
+        hitmap = np.frombuffer(coverage.get_hitmap(), dtype=np.uint8)
+        results.append((meta, valid, np.flatnonzero(hitmap).astype(np.int32)))
+    return results
+
+
+def _worker_loop(run_chunk: RunChunk, conn):
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        start, stop = job
+        conn.send((start, _run_chunk(run_chunk, start, stop)))
+
+
+def _chunk_results(n_tests: int, run_chunk: RunChunk, n_jobs: int,
+                   chunk_size: int) -> Iterator[_ChunkResult]:
+    """Results of chunks in order."""
+    chunks = [(start, min(start + chunk_size, n_tests))
+              for start in range(0, n_tests, chunk_size)]
+    if n_jobs <= 1:
+        for start, stop in chunks:
+            yield _run_chunk(run_chunk, start, stop)
+        return
+
+    ctx = mp.get_context('fork')
+    workers = []
+    for _ in range(min(n_jobs, len(chunks))):
+        parent_conn, child_conn = ctx.Pipe()
+        # Not a daemon: tests are built in child processes.
+        process = ctx.Process(target=_worker_loop, args=(run_chunk, child_conn))
+        process.start()
+        child_conn.close()
+        workers.append((process, parent_conn))
+
+    next_chunk = 0
+    done: Dict[int, _ChunkResult] = {}
+    try:
+        for _, conn in workers:
+            if next_chunk < len(chunks):
+                conn.send(chunks[next_chunk])
+                next_chunk += 1
+        for start, _ in chunks:
+            while start not in done:
+                for conn in wait([conn for _, conn in workers]):
+                    finished_start, results = conn.recv()
+                    done[finished_start] = results
+                    if next_chunk < len(chunks):
+                        conn.send(chunks[next_chunk])
+                        next_chunk += 1
+            yield done.pop(start)
+    finally:
+        for process, conn in workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, ConnectionError):
+                pass
+        for process, conn in workers:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            conn.close()
+
+
+def replay(n_tests: int, run_chunk: RunChunk, n_jobs: int = 1,
+           chunk_size: int = 16) -> Iterator[Tuple[Any, bool, int, int]]:
+    """Replay tests [0, n_tests) and yield, in order, (metadata, valid, coverage after the
+    test, number of new edges of the test)."""
+    covered = np.zeros(coverage.get_total(), dtype=bool)
+    cov_now = 0
+    for results in _chunk_results(n_tests, run_chunk, n_jobs, chunk_size):
+        for meta, valid, edges in results:
+            n_new = int(np.count_nonzero(~covered[edges]))
+            covered[edges] = True
+            cov_now += n_new
+            yield meta, valid, cov_now, n_new
@@ -8,6 +8,8 @@ import uuid
 import datetime
 import git
 
+from .record import RecordWriter
+
 __TVM_INSTRUMENTED__ = False
 try:
     from tvm.contrib import coverage
@@ -22,9 +24,12 @@ if __TVM_INSTRUMENTED__:
 _METADATA_NAME_ = 'meta.txt'
 _COV_BY_TIME_NAME_ = 'cov_by_time.txt'
 _COMPILATION_RATE_ = 'compile_rate.txt'
-_TIR_BY_TIME_NAME_ = 'tir_by_time.pickle'
+_TIR_BY_TIME_NAME_ = 'tir_by_time.rec'
 _ITERATION_ = 'iterations.txt'
 _VALID_SEED_NEW_COV_COUNT_ = 'valid_seed_new_cov_count.txt'
+_POOL_BY_TIME_NAME_ = 'pool_by_time.txt'
+_PIPELINE_BY_TIME_NAME_ = 'pipeline_by_time.txt'
+_PREDICTOR_BY_TIME_NAME_ = 'predictor_by_time.txt'
 
 class TVMFuzzerUsageError(Exception):
     def __init__(self, msg):
@@ -82,22 +87,57 @@ class Reporter:
 
         self.tir_by_time_file = None
         if record_tir:
-            self.tir_by_time_file = open(os.path.join(
-                self.report_folder, _TIR_BY_TIME_NAME_), 'wb')
+            self.tir_by_time_file = RecordWriter(os.path.join(
+                self.report_folder, _TIR_BY_TIME_NAME_))
+
+        self.pool_by_time_file = None
+
+        self.pipeline_by_time_file = None
+        self.predictor_by_time_file = None
 
         self.n_bug = 0
 
-    def record_tir_and_passes(self, tir, passes):
+    def record_tir_and_passes(self, tir, pass_keys):
         assert self.tir_by_time_file
-        pickle.dump((time.perf_counter() - self.start_time, tir, passes),
-                    self.tir_by_time_file)
+        self.tir_by_time_file.write(
+            time.perf_counter() - self.start_time, tir, pass_keys)
 
-    def record_coverage(self, t=None):
+    def record_coverage(self, t=None, cov_now=None):
         if t is None:
             t = time.perf_counter() - self.start_time
+        if cov_now is None:
+            cov_now = coverage.get_now()
         assert self.cov_by_time_file
         self.cov_by_time_file.write(
-            f'{t:.2f},{coverage.get_now()},\n')
+            f'{t:.2f},{cov_now},\n')
+
+    def record_pool_stats(self, pool_size: int, n_spilled: int, rss_in_mb: float):
+        if self.pool_by_time_file is None:
+            self.pool_by_time_file = open(os.path.join(
+                self.report_folder, _POOL_BY_TIME_NAME_), 'w')
+        t = time.perf_counter() - self.start_time
+        self.pool_by_time_file.write(
+            f'{t:.2f},{pool_size},{n_spilled},{rss_in_mb:.1f},\n')
+
+    def record_pipeline_stats(self, depth: int, mean_depth: float, utilization: dict):
+        if self.pipeline_by_time_file is None:
+            self.pipeline_by_time_file = open(os.path.join(
+                self.report_folder, _PIPELINE_BY_TIME_NAME_), 'w')
+            self.pipeline_by_time_file.write(
+                f'time,depth,mean_depth,{",".join(utilization.keys())},\n')
+        t = time.perf_counter() - self.start_time
+        self.pipeline_by_time_file.write(
+            f'{t:.2f},{depth},{mean_depth:.2f},'
+            f'{"".join(f"{u:.3f}," for u in utilization.values())}\n')
+
+    def record_predictor_stats(self, n_observed: int, n_skipped: int, precision: float, recall: float):
+        if self.predictor_by_time_file is None:
+            self.predictor_by_time_file = open(os.path.join(
+                self.report_folder, _PREDICTOR_BY_TIME_NAME_), 'w')
+            self.predictor_by_time_file.write('time,observed,skipped,precision,recall,\n')
+        t = time.perf_counter() - self.start_time
+        self.predictor_by_time_file.write(
+            f'{t:.2f},{n_observed},{n_skipped},{precision:.3f},{recall:.3f},\n')
 
     def record_compile_rate(self, rate):
         with open(os.path.join(self.report_folder, _COMPILATION_RATE_), 'w') as f:
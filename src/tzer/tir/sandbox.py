@@ -0,0 +1,118 @@
+"""Resource limits and monitoring of build processes.
+
+- `ResourceLimits` caps the address space (`RLIMIT_AS`), the CPU time (`RLIMIT_CPU`) and the
+  size of written files (`RLIMIT_FSIZE`) of a build process, so that a runaway `tvm.build`
+  fails alone instead of taking the host (and other fuzzers on it) down.
+- `BuildMonitor` tells hangs by the CPU time of the build process (and its children) rather
+  than by wall time, which is skewed when many fuzzers share a host. A process that does not
+  use its CPU (e.g., blocked) still times out after `WALL_FACTOR` times of the timeout.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+import resource
+import signal
+import time
+
+import psutil
+
+_MB = 2 ** 20
+
+
+@dataclass
+class ResourceLimits:
+    mem_in_mb: Optional[float] = None
+    cpu_in_seconds: Optional[float] = None
+    fsize_in_mb: Optional[float] = None
+
+    def apply(self):
+        """[Child] Apply the limits to the calling process. The CPU time limit is relative to
+        the CPU time used so far, so it can be applied again for each test of a long-lived
+        process. Only soft limits are set, since hard ones cannot be raised back."""
+        if self.mem_in_mb is not None:
+            _set_soft_limit(resource.RLIMIT_AS, int(self.mem_in_mb * _MB))
+        if self.fsize_in_mb is not None:
+            _set_soft_limit(resource.RLIMIT_FSIZE, int(self.fsize_in_mb * _MB))
+        if self.cpu_in_seconds is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            _set_soft_limit(resource.RLIMIT_CPU,
+                            int(usage.ru_utime + usage.ru_stime + self.cpu_in_seconds) + 1)
+
+
+def _set_soft_limit(kind: int, value: int):
+    _, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(kind, (value, hard))
+
+
+def _cpu_time(process: psutil.Process) -> float:
+    try:
+        times = process.cpu_times()
+        total = times.user + times.system + times.children_user + times.children_system
+        for child in process.children(recursive=True):
+            try:
+                child_times = child.cpu_times()
+                total += child_times.user + child_times.system
+            except psutil.NoSuchProcess:
+                pass
+        return total
+    except psutil.NoSuchProcess:
+        return 0.
+
+
+def _memory(process: psutil.Process) -> int:
+    try:
+        return process.memory_info().vms
+    except psutil.NoSuchProcess:
+        return 0
+
+
+class BuildMonitor:
+    POLL_INTERVAL = 0.05  # In seconds.
+    WALL_FACTOR = 3.
+
+    def __init__(self, pid: int, timeout: float) -> None:
+        self.timeout = timeout
+        self.start_time = time.time()
+        try:
+            self.process: Optional[psutil.Process] = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            self.process = None
+        self.cpu_base = self._cpu_time()
+        self.cpu_used = 0.
+        self.peak_memory = 0
+
+    def _cpu_time(self) -> float:
+        return _cpu_time(self.process) if self.process is not None else 0.
+
+    def elapsed(self) -> float:
+        """CPU time used since the start, or the wall time scaled down by `WALL_FACTOR` if
+        larger."""
+        return max(self.cpu_used, (time.time() - self.start_time) / self.WALL_FACTOR)
+
+    def update(self):
+        """Measure the CPU time and memory used so far (while the process is alive)."""
+        if self.process is not None:
+            self.cpu_used = max(self.cpu_used, self._cpu_time() - self.cpu_base)
+            self.peak_memory = max(self.peak_memory, _memory(self.process))
+
+    def expired(self) -> bool:
+        self.update()
+        return self.elapsed() >= self.timeout
+
+    def remaining(self) -> float:
+        return max(self.timeout - self.elapsed(), 0.)
+
+    def out_of_memory(self, exitcode: Optional[int], limits: Optional[ResourceLimits]) -> bool:
+        """If a crashed build process (likely) ran out of memory: killed by the OOM killer
+        (not by us) or aborted (e.g., on `std::bad_alloc`) close to its address-space limit."""
+        if exitcode == -signal.SIGKILL:
+            return True
+        if limits is not None and limits.mem_in_mb is not None and exitcode == -signal.SIGABRT:
+            return self.peak_memory >= 0.8 * limits.mem_in_mb * _MB
+        return False
+
+
+def cpu_limit_exceeded(exitcode: Optional[int]) -> bool:
+    return exitcode == -signal.SIGXCPU
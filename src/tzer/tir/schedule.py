@@ -0,0 +1,153 @@
+"""Power schedules deciding how often each seed of the joint seed pool is picked.
+
+A schedule gives each seed an energy (i.e., a relative chance to be picked). Energies are
+kept in a `FenwickSampler` so that picking and updating a seed costs O(log n).
+
+- `uniform`: every seed has the same chance (the original Tzer behavior);
+- `rare`: seeds that first hit edges which are still rarely hit are preferred;
+- `fast`: AFLFast's FAST schedule, i.e., energy grows exponentially with the times a seed
+  was picked and is divided by how often its (rarest) edge is hit.
+
+Non-uniform schedules penalize seeds that are large (by `get_node_size`) or slow to build
+compared to the average of the pool, in the way AFL scores test cases.
+"""
+
+from typing import List, Optional
+import random
+
+from .novelty import NoveltyIndex
+
+
+class FenwickSampler:
+    """Sample indices proportionally to their non-negative weights in O(log n)."""
+
+    def __init__(self, weights: Optional[List[float]] = None) -> None:
+        self.weights: List[float] = []
+        self.tree: List[float] = [0.]  # 1-indexed
+        if weights is not None:
+            self.rebuild(weights)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def _prefix(self, i: int) -> float:
+        s = 0.
+        while i > 0:
+            s += self.tree[i]
+            i -= i & -i
+        return s
+
+    def total(self) -> float:
+        return self._prefix(len(self.weights))
+
+    def rebuild(self, weights: List[float]):
+        """O(n) construction (also clears accumulated floating-point errors)."""
+        self.weights = list(weights)
+        self.tree = [0.] + self.weights
+        n = len(self.weights)
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n:
+                self.tree[j] += self.tree[i]
+
+    def append(self, weight: float):
+        self.weights.append(weight)
+        i = len(self.weights)
+        self.tree.append(weight + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+
+    def update(self, idx: int, weight: float):
+        delta = weight - self.weights[idx]
+        self.weights[idx] = weight
+        i = idx + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def sample(self) -> int:
+        n = len(self.weights)
+        assert n > 0, 'Nothing to sample'
+        target = random.random() * self.total()
+        pos = 0
+        step = 1 << (n.bit_length() - 1)
+        while step > 0:
+            if pos + step <= n and self.tree[pos + step] <= target:
+                pos += step
+                target -= self.tree[pos]
+            step >>= 1
+        return min(pos, n - 1)
+
+
+def _relative(value: Optional[float], mean: float) -> float:
+    """AFL-like score multiplier: > 1 for cheaper than average, < 1 for more expensive."""
+    if value is None or mean <= 0:
+        return 1.
+    return min(max(mean / max(value, 1e-6), 0.25), 4.)
+
+
+class PowerSchedule:
+    uniform = False
+
+    def __init__(self, novelty: Optional[NoveltyIndex] = None) -> None:
+        self.novelty = novelty
+        # For the averages of node sizes and build times.
+        self.n_sizes = 0
+        self.sum_sizes = 0.
+        self.n_build_times = 0
+        self.sum_build_times = 0.
+
+    def observe(self, seed):
+        """A new seed is put into the pool."""
+        if seed.node_size is not None:
+            self.n_sizes += 1
+            self.sum_sizes += seed.node_size
+        if seed.build_time is not None:
+            self.n_build_times += 1
+            self.sum_build_times += seed.build_time
+
+    def base_energy(self, seed) -> float:
+        return 1.
+
+    def energy(self, seed) -> float:
+        mean_size = self.sum_sizes / self.n_sizes if self.n_sizes else 0.
+        mean_build_time = self.sum_build_times / self.n_build_times if self.n_build_times else 0.
+        return self.base_energy(seed) \
+            * _relative(seed.node_size, mean_size) \
+            * _relative(seed.build_time, mean_build_time)
+
+
+class UniformSchedule(PowerSchedule):
+    uniform = True
+
+
+class RareEdgeSchedule(PowerSchedule):
+    def base_energy(self, seed) -> float:
+        if self.novelty is None:
+            return 1.
+        return 1. + self.novelty.rarity(seed.new_edges)
+
+
+class FastSchedule(PowerSchedule):
+    MAX_ENERGY = 64.
+    MAX_EXPONENT = 16
+
+    def frequency(self, seed) -> int:
+        """How often the "path" of the seed is exercised. As there is no path in TVM's
+        coverage, approximate it by the hit count of the rarest edge first hit by the seed."""
+        if self.novelty is not None and seed.new_edges is not None and len(seed.new_edges) > 0:
+            return int(self.novelty.hit_counts[seed.new_edges].min())
+        return seed.n_picked + 1
+
+    def base_energy(self, seed) -> float:
+        return min(2 ** min(seed.n_picked, self.MAX_EXPONENT) / max(self.frequency(seed), 1),
+                   self.MAX_ENERGY)
+
+
+SCHEDULES = {
+    'uniform': UniformSchedule,
+    'rare': RareEdgeSchedule,
+    'fast': FastSchedule,
+}
+
+
+def make_schedule(name: str, novelty: Optional[NoveltyIndex] = None) -> PowerSchedule:
+    return SCHEDULES[name](novelty)
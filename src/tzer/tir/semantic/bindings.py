@@ -0,0 +1,128 @@
+"""Persistent lists of the variables and buffers bound in a context.
+
+A `Bindings` is a cons cell (the newest binding and the bindings of the enclosing scope),
+so entering a scope allocates one cell and shares the enclosing bindings instead of copying
+them. Queries by dtype (e.g., the bound variables of the dtype of a hole) are memoized on
+each cell and extend the answer of the enclosing scope, so they are only computed once per
+scope rather than on every generated leaf.
+"""
+
+from typing import Callable, Dict, Generic, Iterable, Iterator, Optional, Tuple, TypeVar, Union
+import tvm
+from tvm.runtime import DataType
+
+_T = TypeVar('_T')
+
+# dtype code/bits/lanes.
+DTypeKey = Tuple[int, int, int]
+
+_DTYPE_KEYS: Dict[str, DTypeKey] = {}
+
+
+def dtype_key(dtype: Union[str, DataType]) -> DTypeKey:
+    if not isinstance(dtype, str):
+        return dtype.type_code, dtype.bits, dtype.lanes
+    key = _DTYPE_KEYS.get(dtype)
+    if key is None:
+        data_type = DataType(dtype)
+        key = _DTYPE_KEYS[dtype] = (data_type.type_code, data_type.bits, data_type.lanes)
+    return key
+
+
+def _dtype_info(value) -> Tuple[DTypeKey, Optional[DTypeKey]]:
+    """The dtype of a variable or buffer, and the element dtype of pointer variables."""
+    element = None
+    if value.dtype == 'handle':
+        annotation = getattr(value, 'type_annotation', None)
+        if isinstance(annotation, tvm.ir.PointerType):
+            element = dtype_key(annotation.element_type.dtype)
+    return dtype_key(value.dtype), element
+
+
+class Bindings(Generic[_T]):
+    """Immutable sequence of bindings, from the outermost to the newest."""
+    __slots__ = ('head', 'tail', 'length', '_info', '_memo')
+
+    def __init__(self, head: Optional[_T], tail: Optional['Bindings[_T]']) -> None:
+        self.head = head
+        self.tail = tail
+        self.length = 0 if tail is None else tail.length + 1
+        self._info: Optional[Tuple[DTypeKey, Optional[DTypeKey]]] = None
+        # Query -> answer (a tuple of bindings, outermost first).
+        self._memo: Optional[Dict[object, Tuple[_T, ...]]] = None
+
+    @staticmethod
+    def of(values: Iterable[_T]) -> 'Bindings[_T]':
+        if isinstance(values, Bindings):
+            return values
+        return EMPTY.extend(values)
+
+    def extend(self, values: Iterable[_T]) -> 'Bindings[_T]':
+        res = self
+        for value in values:
+            res = Bindings(value, res)
+        return res
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[_T]:
+        return iter(self.as_tuple())
+
+    def __getitem__(self, idx):
+        if isinstance(idx, int) and -self.length <= idx < self.length:
+            # Walk out from the newest binding instead of building the whole tuple.
+            cell = self
+            for _ in range(self.length - 1 - idx % self.length):
+                cell = cell.tail  # type: ignore
+            return cell.head
+        return self.as_tuple()[idx]
+
+    def __repr__(self) -> str:
+        return f'Bindings{self.as_tuple()}'
+
+    def as_tuple(self) -> Tuple[_T, ...]:
+        """All bindings, outermost first. Not memoized: each cell would keep its own copy of
+        the whole chain (quadratic in the depth)."""
+        values = []
+        cell = self
+        while cell.tail is not None:
+            values.append(cell.head)
+            cell = cell.tail
+        values.reverse()
+        return tuple(values)
+
+    def of_dtype(self, dtype: Union[str, DataType, DTypeKey]) -> Tuple[_T, ...]:
+        key = dtype if isinstance(dtype, tuple) else dtype_key(dtype)
+        return self._select(('dtype', key), lambda cell: cell.info()[0] == key)
+
+    def pointers_to(self, dtype: Union[None, str, DataType, DTypeKey] = None) -> Tuple[_T, ...]:
+        """Pointer variables (to elements of `dtype`, if given)."""
+        if dtype is None:
+            return self._select('pointer', lambda cell: cell.info()[1] is not None)
+        key = dtype if isinstance(dtype, tuple) else dtype_key(dtype)
+        return self._select(('pointer', key), lambda cell: cell.info()[1] == key)
+
+    def info(self) -> Tuple[DTypeKey, Optional[DTypeKey]]:
+        if self._info is None:
+            self._info = _dtype_info(self.head)
+        return self._info
+
+    def _select(self, query: object, match: Callable[['Bindings[_T]'], bool]) -> Tuple[_T, ...]:
+        # Walk out to the innermost scope that knows the answer, then extend it inwards.
+        pending = []
+        cell = self
+        while cell.tail is not None and (cell._memo is None or query not in cell._memo):
+            pending.append(cell)
+            cell = cell.tail
+        res = () if cell.tail is None else cell._memo[query]  # type: ignore
+        for cell in reversed(pending):
+            if match(cell):
+                res = res + (cell.head,)
+            if cell._memo is None:
+                cell._memo = {}
+            cell._memo[query] = res
+        return res
+
+
+EMPTY: Bindings = Bindings(None, None)
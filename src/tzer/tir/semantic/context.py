@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Any, Callable, Generic, List, NamedTuple, Optional, Type, TypeVar, Union
+from typing import Any, Callable, Generic, Iterable, List, NamedTuple, Optional, Type, TypeVar, Union
 from tvm import tir
 from tvm.tir import call_intrin
 import tvm
@@ -7,6 +7,7 @@ from tvm._ffi.runtime_ctypes import DataType
 from tvm.ir.expr import PrimExpr
 from tvm.tir.stmt import AssertStmt
 from tzer.tir.util import TIRNode
+from .bindings import EMPTY, Bindings
 from .constraint import Constraint, PrimExprConstraint, PrimFuncConstraint, StmtConstraint
 from tzer.tir.visit import TIRVisitor
 import random
@@ -19,6 +20,7 @@ _U = TypeVar('_U')
 class Context(Generic[_T]):
     """The semantic context of the hole being visited (e.g. necessary info about [ ] in [ ] + 2)."""
     Extension = Callable[[Callable[['Context'], TIRNode]], TIRNode]
+    __slots__ = ('constraint', 'bound_variables', 'buffers', 'additional_information')
 
     def __init__(
         self,
@@ -28,16 +30,17 @@ class Context(Generic[_T]):
         # let x = 3 in x*x + 5, we perform mutation on x*x, intending to change it to another
         # generated expression. We then should make sure all variables we used are
         # bound, say x, and x would in this value.)
-        bound_variables: List[tir.Var] = [],
-        buffers: List[tir.Buffer] = [],
+        # Kept as persistent `Bindings` shared with the enclosing contexts.
+        bound_variables: Iterable[tir.Var] = EMPTY,
+        buffers: Iterable[tir.Buffer] = EMPTY,
         # Additional information of the context which could be derived from the
         # current context, i.e., this property does not make a difference to the context.
         # Defined here for convenience use.
         additional_information: Optional[_T] = None
     ) -> None:
         self.constraint = constraint
-        self.bound_variables = bound_variables
-        self.buffers = buffers
+        self.bound_variables: Bindings[tir.Var] = Bindings.of(bound_variables)
+        self.buffers: Bindings[tir.Buffer] = Bindings.of(buffers)
         self.additional_information = additional_information
 
     def with_constraint_being(self, constraint: Constraint) -> 'Context':
@@ -48,7 +51,7 @@ class Context(Generic[_T]):
             self.additional_information,
         )
 
-    def with_bound_vars_being(self, bound_variables: List[tir.Var]) -> 'Context':
+    def with_bound_vars_being(self, bound_variables: Iterable[tir.Var]) -> 'Context':
         return Context(
             self.constraint,
             bound_variables,
@@ -56,7 +59,16 @@ class Context(Generic[_T]):
             self.additional_information,
         )
 
-    def with_buffers_being(self, buffers: List[tir.Buffer]) -> 'Context':
+    def with_bound_vars_added(self, *variables: tir.Var) -> 'Context':
+        """The context with `variables` bound as well, sharing the current bindings."""
+        return Context(
+            self.constraint,
+            self.bound_variables.extend(variables),
+            self.buffers,
+            self.additional_information,
+        )
+
+    def with_buffers_being(self, buffers: Iterable[tir.Buffer]) -> 'Context':
         return Context(
             self.constraint,
             self.bound_variables,
@@ -224,7 +236,7 @@ class Context(Generic[_T]):
         return lambda match: tir.Let(
             var,
             match(self.with_constraint_being(PrimExprConstraint(dtype))),
-            match(self.with_bound_vars_being([*self.bound_variables, var])),
+            match(self.with_bound_vars_added(var)),
         )
 
     def extend_call(self) -> Extension:
@@ -348,7 +360,7 @@ class Context(Generic[_T]):
         return lambda match: tir.LetStmt(
             var,
             match(self.with_constraint_being(PrimExprConstraint(dtype))),
-            match(self.with_bound_vars_being([*self.bound_variables, var])),
+            match(self.with_bound_vars_added(var)),
         )
 
     def extend_itervar(self) -> Extension:
@@ -447,12 +459,7 @@ class Context(Generic[_T]):
                 # # tir.Block,
                 # # tir.Blockrealize,
             ]
-            possible_vars = [
-                v for v in self.bound_variables
-                if v.dtype == 'handle'
-                and 'type_annotation' in dir(v)
-                and isinstance(v.type_annotation, tvm.ir.PointerType)
-            ]
+            possible_vars = self.bound_variables.pointers_to()
             if len(possible_vars) > 0:
                 options.append(self.with_additional_information(
                     possible_vars).extend_store)
@@ -503,19 +510,12 @@ class Context(Generic[_T]):
                 raise NotImplementedError(
                     "Should not happen!", self.constraint.dtype)
 
-            possible_vars = [
-                v for v in self.bound_variables
-                if v.dtype == 'handle'
-                and 'type_annotation' in dir(v)
-                and isinstance(v.type_annotation, tvm.ir.PointerType)
-                and DataType(v.type_annotation.element_type.dtype) == self.constraint.dtype
-            ]
+            possible_vars = self.bound_variables.pointers_to(self.constraint.dtype)
             if len(possible_vars) > 0:
                 options.append(self.with_additional_information(
                     possible_vars).extend_load)
 
-            possible_buffers = [buffer for buffer in self.buffers
-                                if DataType(buffer.dtype) == self.constraint.dtype]
+            possible_buffers = self.buffers.of_dtype(self.constraint.dtype)
             if len(possible_buffers) > 0:
                 options.append(self.with_additional_information(
                     possible_buffers).extend_bufferload)
@@ -0,0 +1,48 @@
+"""Per-test build timeouts learned from the build times of previous tests.
+
+Build times are kept per bucket of (node size, number of passes), both in log2 scale. The
+deadline of a test is a high quantile of the recent build times of its bucket plus a margin.
+Buckets with too few samples fall back to the fixed `--build-timeout`, and deadlines never
+exceed `MAX_FACTOR` times of it. Timed-out builds are not observed, since their real build
+times are unknown.
+"""
+
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class TimeoutModel:
+    MIN_SAMPLES = 20
+    WINDOW = 512        # Recent build times kept per bucket.
+    MIN_TIMEOUT = 0.2   # In seconds.
+    MAX_FACTOR = 4.
+
+    def __init__(self, default_timeout: float, quantile: float, margin: float) -> None:
+        self.default_timeout = default_timeout
+        self.quantile = quantile
+        self.margin = margin
+        self.buckets: Dict[Tuple[int, int], Deque[float]] = {}
+
+    @staticmethod
+    def bucket(node_size: Optional[int], n_passes: int) -> Tuple[int, int]:
+        return int(node_size or 0).bit_length(), int(n_passes).bit_length()
+
+    def observe(self, node_size: Optional[int], n_passes: int, build_time: float):
+        key = self.bucket(node_size, n_passes)
+        if key not in self.buckets:
+            self.buckets[key] = deque(maxlen=self.WINDOW)
+        self.buckets[key].append(build_time)
+
+    def predict(self, node_size: Optional[int], n_passes: int) -> float:
+        times = self.buckets.get(self.bucket(node_size, n_passes))
+        if times is None or len(times) < self.MIN_SAMPLES:
+            return self.default_timeout
+        timeout = float(np.quantile(np.fromiter(times, dtype=np.float64), self.quantile)) + self.margin
+        return min(max(timeout, self.MIN_TIMEOUT), self.default_timeout * self.MAX_FACTOR)
+
+    def describe(self, node_size: Optional[int], n_passes: int) -> str:
+        key = self.bucket(node_size, n_passes)
+        n_samples = len(self.buckets.get(key, ()))
+        return f'bucket (node size, #passes) = (<{2 ** key[0]}, <{2 ** key[1]}), {n_samples} samples'
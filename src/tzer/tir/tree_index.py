@@ -0,0 +1,151 @@
+"""Flat pre-order index of the nodes of a seed, to pick the node to mutate in O(1).
+
+Built once when the seed enters the pool (`JointSeedPool`). The nodes that mutators may
+descend into (see `Slot.mutable`) are numbered in pre-order, so the subtree of node `i` is
+`[i, end[i])`, and per-node facts are kept in NumPy arrays:
+
+- `kind`: the node kind (position in `_DISPATCH_ORDER`);
+- `parent` / `child_idx`: the parent and the position of the node among its children;
+- `end`: the end of the subtree (so the children of `i` are `i + 1`, `end[i + 1]`, ...);
+- `constraint` / `dtype`: the constraint of the hole of the node (an index into `dtypes`
+  for expressions);
+- `scope`: the variables bound at the node (an index into `scopes`, persistent `Bindings`
+  sharing the variables of the enclosing scopes).
+
+So the context of a node is known without walking down from the root again, and a mutant is
+rebuilt by path copying: only the ancestors of the mutated node are rebuilt.
+"""
+
+from typing import Dict, List, Optional
+import random
+
+import numpy as np
+from tvm import tir
+
+from .semantic import Context
+from .semantic.bindings import EMPTY, Bindings
+from .semantic.constraint import (BlockConstraint, PrimExprConstraint, PrimFuncConstraint,
+                                  StmtConstraint)
+from .util import TIRNode
+from .visit.path import KIND_NAMES, child_slots, node_spec, replace_child
+
+PRIMFUNC, STMT, EXPR, BLOCK = range(4)
+_SLOT_CONSTRAINTS = {'stmt': STMT, 'expr': EXPR, 'block': BLOCK}
+
+# Kinds of nodes that are only mutated in place with `touch_control_flow`.
+_CONTROL_FLOW = [KIND_NAMES.index(name) for name in ['ifthenelse', 'for', 'while']]
+
+
+class TreeIndex:
+    def __init__(self, root: TIRNode) -> None:
+        self.root = root
+        self.nodes: List[TIRNode] = []
+        self.dtypes: List[str] = []
+        self.scopes: List[Bindings[tir.Var]] = [EMPTY]
+        dtype_codes: Dict[str, int] = {}
+        kind, parent, child_idx, constraint, dtype, scope = [], [], [], [], [], []
+
+        root_constraint = PRIMFUNC if isinstance(root, tir.PrimFunc) else \
+            STMT if isinstance(root, tir.Stmt) else EXPR
+        root_dtype = None if root_constraint != EXPR else root.dtype
+        # (node, parent, position among the children, constraint, dtype, scope)
+        stack = [(root, -1, -1, root_constraint, root_dtype, 0)]
+        while stack:
+            op, parent_idx, pos, op_constraint, op_dtype, op_scope = stack.pop()
+            idx = len(self.nodes)
+            self.nodes.append(op)
+            kind.append(node_spec(type(op))[0])
+            parent.append(parent_idx)
+            child_idx.append(pos)
+            constraint.append(op_constraint)
+            if op_dtype is None:
+                dtype.append(-1)
+            else:
+                if op_dtype not in dtype_codes:
+                    dtype_codes[op_dtype] = len(self.dtypes)
+                    self.dtypes.append(op_dtype)
+                dtype.append(dtype_codes[op_dtype])
+            scope.append(op_scope)
+
+            pending = []
+            child_scopes: Dict[int, int] = {}
+            for pos, (child, slot) in enumerate(child_slots(op)):
+                if not slot.mutable:
+                    continue
+                child_scope = op_scope
+                if slot.binds is not None:
+                    if id(slot) not in child_scopes:
+                        child_scopes[id(slot)] = len(self.scopes)
+                        self.scopes.append(self.scopes[op_scope].extend(slot.binds(op)))
+                    child_scope = child_scopes[id(slot)]
+                child_constraint = _SLOT_CONSTRAINTS[slot.kind]
+                child_dtype = None
+                if child_constraint == EXPR:
+                    child_dtype = getattr(op, slot.dtype_of).dtype if slot.dtype_of else child.dtype
+                pending.append((child, idx, pos, child_constraint, child_dtype, child_scope))
+            stack.extend(reversed(pending))
+
+        self.kind = np.array(kind, dtype=np.int16)
+        self.parent = np.array(parent, dtype=np.int32)
+        self.child_idx = np.array(child_idx, dtype=np.int32)
+        self.constraint = np.array(constraint, dtype=np.int8)
+        self.dtype = np.array(dtype, dtype=np.int16)
+        self.scope = np.array(scope, dtype=np.int32)
+        size = np.ones(len(self.nodes), dtype=np.int32)
+        for idx in range(len(self.nodes) - 1, 0, -1):
+            size[parent[idx]] += size[idx]
+        self.end = np.arange(len(self.nodes), dtype=np.int32) + size
+        self._targets: Dict[bool, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def children(self, idx: int) -> List[int]:
+        res = []
+        child = idx + 1
+        while child < self.end[idx]:
+            res.append(child)
+            child = int(self.end[child])
+        return res
+
+    def targets(self, touch_control_flow: bool = True) -> np.ndarray:
+        """Indices of the nodes that can be mutated in place."""
+        if touch_control_flow not in self._targets:
+            mask = np.ones(len(self.nodes), dtype=bool)
+            if not touch_control_flow:
+                mask &= ~np.isin(self.kind, _CONTROL_FLOW)
+            self._targets[touch_control_flow] = np.flatnonzero(mask)
+        return self._targets[touch_control_flow]
+
+    def random_target(self, touch_control_flow: bool = True) -> Optional[int]:
+        targets = self.targets(touch_control_flow)
+        if len(targets) == 0:
+            return None
+        return int(targets[random.randrange(len(targets))])
+
+    def context(self, idx: int) -> Context:
+        kind = self.constraint[idx]
+        if kind == EXPR:
+            constraint = PrimExprConstraint(self.dtypes[self.dtype[idx]])
+        elif kind == STMT:
+            constraint = StmtConstraint()
+        elif kind == BLOCK:
+            constraint = BlockConstraint()
+        else:
+            constraint = PrimFuncConstraint()
+        return Context(constraint, self.scopes[self.scope[idx]])
+
+    def path(self, idx: int) -> List[int]:
+        """Child indices from the root to node `idx` (see `visit.path.replace_path`)."""
+        path = []
+        while idx > 0:
+            path.append(int(self.child_idx[idx]))
+            idx = int(self.parent[idx])
+        return path[::-1]
+
+    def replace(self, idx: int, new: TIRNode) -> TIRNode:
+        """The root with node `idx` replaced by `new`, rebuilding only its ancestors."""
+        while idx > 0:
+            new = replace_child(self.nodes[self.parent[idx]], int(self.child_idx[idx]), new)
+            idx = int(self.parent[idx])
+        return new
@@ -1,6 +1,7 @@
 from .free_var import get_free_vars, primfunc_with_new_body
-from .traverse import get_all_nodes
+from .traverse import get_all_nodes, iter_nodes, preorder, postorder
 from .size import get_node_size, MemoizedGetSize
-from .swap import swap_tir
+from .swap import swap_tir, swap_tir_many
 from .buffer import rebind_buffer_var
+from .lvalue import get_lvalue_vars
 from .abstract import TIRVisitor, TIRAbstractTransformer, NoDispatchPatternError
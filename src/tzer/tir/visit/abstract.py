@@ -1,5 +1,5 @@
 from typing import Generic, TypeVar
-from typing import Any
+from typing import Any, Callable, Dict, Optional
 from abc import abstractmethod
 from tvm import tir
 from tzer.tir.util import TIRNode
@@ -13,118 +13,91 @@ TIRReturn = TypeVar('TIRReturn')
 Arg = TypeVar('Arg')
 
 
+# (Node class, visit method suffix) in dispatch order: a node is visited as the first class
+# it is an instance of, e.g., `tir.SizeVar` (a subclass of `tir.Var`) by `visit_var`.
+_DISPATCH_ORDER = [
+    (tir.PrimFunc, 'primfunc'),
+    (tir.Var, 'var'),
+    (tir.SizeVar, 'sizevar'),
+    (tir.IterVar, 'itervar'),
+    (tir.Load, 'load'),
+    (tir.BufferLoad, 'bufferload'),
+    (tir.ProducerLoad, 'producerload'),
+    (tir.Let, 'let'),
+    (tir.Call, 'call'),
+    (tir.Add, 'add'),
+    (tir.Sub, 'sub'),
+    (tir.Mul, 'mul'),
+    (tir.Div, 'div'),
+    (tir.Mod, 'mod'),
+    (tir.FloorDiv, 'floordiv'),
+    (tir.FloorMod, 'floormod'),
+    (tir.Min, 'min'),
+    (tir.Max, 'max'),
+    (tir.EQ, 'eq'),
+    (tir.NE, 'ne'),
+    (tir.LT, 'lt'),
+    (tir.LE, 'le'),
+    (tir.GT, 'gt'),
+    (tir.GE, 'ge'),
+    (tir.And, 'and'),
+    (tir.Or, 'or'),
+    (tir.Reduce, 'reduce'),
+    (tir.Cast, 'cast'),
+    (tir.Not, 'not'),
+    (tir.Select, 'select'),
+    (tir.Ramp, 'ramp'),
+    (tir.Broadcast, 'broadcast'),
+    (tir.Shuffle, 'shuffle'),
+    (tir.IntImm, 'intimm'),
+    (tir.FloatImm, 'floatimm'),
+    (tir.StringImm, 'stringimm'),
+    (tir.Any, 'any'),
+    (tir.AttrStmt, 'attrstmt'),
+    (tir.IfThenElse, 'ifthenelse'),
+    (tir.LetStmt, 'letstmt'),
+    (tir.For, 'for'),
+    (tir.stmt.While, 'while'),
+    (tir.Allocate, 'allocate'),
+    (tir.Store, 'store'),
+    (tir.BufferStore, 'bufferstore'),
+    (tir.BufferRealize, 'bufferrealize'),
+    (tir.AssertStmt, 'assertstmt'),
+    (tir.ProducerStore, 'producerstore'),
+    (tir.ProducerRealize, 'producerrealize'),
+    (tir.Prefetch, 'prefetch'),
+    (tir.SeqStmt, 'seqstmt'),
+    (tir.Evaluate, 'evaluate'),
+    (tir.Block, 'block'),
+    (tir.BlockRealize, 'blockrealize'),
+]
+
+
 class TIRVisitor(Generic[TIRReturn, Arg]):
+    # Node type -> decorated visit function. Each visitor class has its own table, filled on
+    # the first visit of each node type.
+    _dispatch_table: Dict[type, Callable] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._dispatch_table = {}
+
     def visit(self, op, arg: Arg) -> TIRReturn:
-        if isinstance(op, tir.PrimFunc):
-            return self._visit_primfunc(op, arg)
-        elif isinstance(op, tir.Var):
-            return self._visit_var(op, arg)
-        elif isinstance(op, tir.SizeVar):
-            return self._visit_sizevar(op, arg)
-        elif isinstance(op, tir.IterVar):
-            return self._visit_itervar(op, arg)
-        elif isinstance(op, tir.Load):
-            return self._visit_load(op, arg)
-        elif isinstance(op, tir.BufferLoad):
-            return self._visit_bufferload(op, arg)
-        elif isinstance(op, tir.ProducerLoad):
-            return self._visit_producerload(op, arg)
-        elif isinstance(op, tir.Let):
-            return self._visit_let(op, arg)
-        elif isinstance(op, tir.Call):
-            return self._visit_call(op, arg)
-        elif isinstance(op, tir.Add):
-            return self._visit_add(op, arg)
-        elif isinstance(op, tir.Sub):
-            return self._visit_sub(op, arg)
-        elif isinstance(op, tir.Mul):
-            return self._visit_mul(op, arg)
-        elif isinstance(op, tir.Div):
-            return self._visit_div(op, arg)
-        elif isinstance(op, tir.Mod):
-            return self._visit_mod(op, arg)
-        elif isinstance(op, tir.FloorDiv):
-            return self._visit_floordiv(op, arg)
-        elif isinstance(op, tir.FloorMod):
-            return self._visit_floormod(op, arg)
-        elif isinstance(op, tir.Min):
-            return self._visit_min(op, arg)
-        elif isinstance(op, tir.Max):
-            return self._visit_max(op, arg)
-        elif isinstance(op, tir.EQ):
-            return self._visit_eq(op, arg)
-        elif isinstance(op, tir.NE):
-            return self._visit_ne(op, arg)
-        elif isinstance(op, tir.LT):
-            return self._visit_lt(op, arg)
-        elif isinstance(op, tir.LE):
-            return self._visit_le(op, arg)
-        elif isinstance(op, tir.GT):
-            return self._visit_gt(op, arg)
-        elif isinstance(op, tir.GE):
-            return self._visit_ge(op, arg)
-        elif isinstance(op, tir.And):
-            return self._visit_and(op, arg)
-        elif isinstance(op, tir.Or):
-            return self._visit_or(op, arg)
-        elif isinstance(op, tir.Reduce):
-            return self._visit_reduce(op, arg)
-        elif isinstance(op, tir.Cast):
-            return self._visit_cast(op, arg)
-        elif isinstance(op, tir.Not):
-            return self._visit_not(op, arg)
-        elif isinstance(op, tir.Select):
-            return self._visit_select(op, arg)
-        elif isinstance(op, tir.Ramp):
-            return self._visit_ramp(op, arg)
-        elif isinstance(op, tir.Broadcast):
-            return self._visit_broadcast(op, arg)
-        elif isinstance(op, tir.Shuffle):
-            return self._visit_shuffle(op, arg)
-        elif isinstance(op, tir.IntImm):
-            return self._visit_intimm(op, arg)
-        elif isinstance(op, tir.FloatImm):
-            return self._visit_floatimm(op, arg)
-        elif isinstance(op, tir.StringImm):
-            return self._visit_stringimm(op, arg)
-        elif isinstance(op, tir.Any):
-            return self._visit_any(op, arg)
-        if isinstance(op, tir.AttrStmt):
-            return self._visit_attrstmt(op, arg)
-        elif isinstance(op, tir.IfThenElse):
-            return self._visit_ifthenelse(op, arg)
-        elif isinstance(op, tir.LetStmt):
-            return self._visit_letstmt(op, arg)
-        elif isinstance(op, tir.For):
-            return self._visit_for(op, arg)
-        elif isinstance(op, tir.stmt.While):
-            return self._visit_while(op, arg)
-        elif isinstance(op, tir.Allocate):
-            return self._visit_allocate(op, arg)
-        elif isinstance(op, tir.Store):
-            return self._visit_store(op, arg)
-        elif isinstance(op, tir.BufferStore):
-            return self._visit_bufferstore(op, arg)
-        elif isinstance(op, tir.BufferRealize):
-            return self._visit_bufferrealize(op, arg)
-        elif isinstance(op, tir.AssertStmt):
-            return self._visit_assertstmt(op, arg)
-        elif isinstance(op, tir.ProducerStore):
-            return self._visit_producerstore(op, arg)
-        elif isinstance(op, tir.ProducerRealize):
-            return self._visit_producerrealize(op, arg)
-        elif isinstance(op, tir.Prefetch):
-            return self._visit_prefetch(op, arg)
-        elif isinstance(op, tir.SeqStmt):
-            return self._visit_seqstmt(op, arg)
-        elif isinstance(op, tir.Evaluate):
-            return self._visit_evaluate(op, arg)
-        elif isinstance(op, tir.Block):
-            return self._visit_block(op, arg)
-        elif isinstance(op, tir.BlockRealize):
-            return self._visit_blockrealize(op, arg)
-        else:
-            raise NoDispatchPatternError(type(op), op)
+        visit_func = self._dispatch_table.get(type(op))
+        if visit_func is None:
+            visit_func = self.__class__._resolve(type(op))
+            if visit_func is None:
+                raise NoDispatchPatternError(type(op), op)
+        return visit_func(self, op, arg)
+
+    @classmethod
+    def _resolve(cls, node_type: type) -> Optional[Callable]:
+        for node_class, name in _DISPATCH_ORDER:
+            if issubclass(node_type, node_class):
+                visit_func = cls.decorate(getattr(cls, 'visit_' + name))
+                cls._dispatch_table[node_type] = visit_func
+                return visit_func
+        return None
 
     def decorate(visit_func: Any):
         def wrapper_visit(self, op, arg):
@@ -134,168 +107,6 @@ class TIRVisitor(Generic[TIRReturn, Arg]):
     def __call__(self, op: TIRNode, arg: Arg) -> TIRReturn:
         return self.visit(op, arg)
 
-    def _visit_primfunc(self, op: tir.PrimFunc, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_primfunc)(self, op, arg)
-
-    def _visit_var(self, op: tir.Var, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_var)(self, op, arg)
-
-    def _visit_sizevar(self, op: tir.SizeVar, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_sizevar)(self, op, arg)
-
-    def _visit_itervar(self, op: tir.IterVar, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_itervar)(self, op, arg)
-
-    def _visit_load(self, op: tir.Load, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_load)(self, op, arg)
-
-    def _visit_bufferload(self, op: tir.BufferLoad, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_bufferload)(self, op, arg)
-
-    def _visit_producerload(self, op: tir.ProducerLoad, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_producerload)(self, op, arg)
-
-    def _visit_let(self, op: tir.Let, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_let)(self, op, arg)
-
-    def _visit_call(self, op: tir.Call, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_call)(self, op, arg)
-
-    def _visit_add(self, op: tir.Add, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_add)(self, op, arg)
-
-    def _visit_sub(self, op: tir.Sub, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_sub)(self, op, arg)
-
-    def _visit_mul(self, op: tir.Mul, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_mul)(self, op, arg)
-
-    def _visit_div(self, op: tir.Div, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_div)(self, op, arg)
-
-    def _visit_mod(self, op: tir.Mod, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_mod)(self, op, arg)
-
-    def _visit_floordiv(self, op: tir.FloorDiv, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_floordiv)(self, op, arg)
-
-    def _visit_floormod(self, op: tir.FloorMod, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_floormod)(self, op, arg)
-
-    def _visit_min(self, op: tir.Min, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_min)(self, op, arg)
-
-    def _visit_max(self, op: tir.Max, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_max)(self, op, arg)
-
-    def _visit_eq(self, op: tir.EQ, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_eq)(self, op, arg)
-
-    def _visit_ne(self, op: tir.NE, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_ne)(self, op, arg)
-
-    def _visit_lt(self, op: tir.LT, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_lt)(self, op, arg)
-
-    def _visit_le(self, op: tir.LE, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_le)(self, op, arg)
-
-    def _visit_gt(self, op: tir.GT, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_gt)(self, op, arg)
-
-    def _visit_ge(self, op: tir.GE, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_ge)(self, op, arg)
-
-    def _visit_and(self, op: tir.And, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_and)(self, op, arg)
-
-    def _visit_or(self, op: tir.Or, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_or)(self, op, arg)
-
-    def _visit_reduce(self, op: tir.Reduce, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_reduce)(self, op, arg)
-
-    def _visit_cast(self, op: tir.Cast, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_cast)(self, op, arg)
-
-    def _visit_not(self, op: tir.Not, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_not)(self, op, arg)
-
-    def _visit_select(self, op: tir.Select, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_select)(self, op, arg)
-
-    def _visit_ramp(self, op: tir.Ramp, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_ramp)(self, op, arg)
-
-    def _visit_broadcast(self, op: tir.Broadcast, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_broadcast)(self, op, arg)
-
-    def _visit_shuffle(self, op: tir.Shuffle, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_shuffle)(self, op, arg)
-
-    def _visit_intimm(self, op: tir.IntImm, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_intimm)(self, op, arg)
-
-    def _visit_floatimm(self, op: tir.FloatImm, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_floatimm)(self, op, arg)
-
-    def _visit_stringimm(self, op: tir.StringImm, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_stringimm)(self, op, arg)
-
-    def _visit_any(self, op: tir.Any, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_any)(self, op, arg)
-
-    def _visit_attrstmt(self, op: tir.AttrStmt, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_attrstmt)(self, op, arg)
-
-    def _visit_ifthenelse(self, op: tir.IfThenElse, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_ifthenelse)(self, op, arg)
-
-    def _visit_letstmt(self, op: tir.LetStmt, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_letstmt)(self, op, arg)
-
-    def _visit_for(self, op: tir.For, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_for)(self, op, arg)
-
-    def _visit_while(self, op: tir.stmt.While, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_while)(self, op, arg)
-
-    def _visit_allocate(self, op: tir.Allocate, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_allocate)(self, op, arg)
-
-    def _visit_store(self, op: tir.Store, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_store)(self, op, arg)
-
-    def _visit_bufferstore(self, op: tir.BufferStore, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_bufferstore)(self, op, arg)
-
-    def _visit_bufferrealize(self, op: tir.BufferRealize, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_bufferrealize)(self, op, arg)
-
-    def _visit_assertstmt(self, op: tir.AssertStmt, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_assertstmt)(self, op, arg)
-
-    def _visit_producerstore(self, op: tir.ProducerStore, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_producerstore)(self, op, arg)
-
-    def _visit_producerrealize(self, op: tir.ProducerRealize, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_producerrealize)(self, op, arg)
-
-    def _visit_prefetch(self, op: tir.Prefetch, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_prefetch)(self, op, arg)
-
-    def _visit_seqstmt(self, op: tir.SeqStmt, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_seqstmt)(self, op, arg)
-
-    def _visit_evaluate(self, op: tir.Evaluate, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_evaluate)(self, op, arg)
-
-    def _visit_block(self, op: tir.Block, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_block)(self, op, arg)
-
-    def _visit_blockrealize(self, op: tir.BlockRealize, arg: Arg) -> TIRReturn:
-        return self.__class__.decorate(self.__class__.visit_blockrealize)(self, op, arg)
-
     @abstractmethod
     def visit_primfunc(self, op: tir.PrimFunc, arg: Arg) -> TIRReturn:
         ...
@@ -0,0 +1,64 @@
+"""Memoize analyses (e.g., sizes and free variables) of TIR nodes across mutations.
+
+TIR nodes are immutable and a mutant shares all but the mutated path with its seed, so what
+is known about a subtree stays valid for every function it appears in. Analyses are thus
+memoized by node, and analysing a mutant only visits the nodes that it does not share.
+
+Nodes are keyed by `util.get_id`, i.e., the address of the underlying C++ object. Python
+wrappers of a node are created on each field access and dropped right after, so their
+lifetime (e.g., weak-reference finalizers) does not tell when the node itself is freed and
+its address reused. Instead, each entry holds the node: a cached address cannot be reused,
+and the node is released when its entry is evicted (least recently used first).
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Tuple
+import os
+
+from tzer.tir.util import get_id
+
+NODE_CACHE_SIZE = int(os.getenv('NODE_CACHE_SIZE', 1 << 18))
+
+_MISS = object()
+
+
+class NodeCache:
+    def __init__(self, capacity: int = NODE_CACHE_SIZE) -> None:
+        self.capacity = capacity
+        # Node id -> (node, value).
+        self.entries: 'OrderedDict[int, Tuple[Any, Any]]' = OrderedDict()
+        self.n_lookup = 0
+        self.n_hit = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, op, default=None):
+        self.n_lookup += 1
+        key = get_id(op)
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        self.entries.move_to_end(key)
+        self.n_hit += 1
+        return entry[1]
+
+    def put(self, op, value):
+        self.entries[get_id(op)] = (op, value)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def memoized_visit(visit_func: Callable) -> Callable:
+    """Memoize a visit function of a visitor whose results only depend on the node in
+    `self.cache` (a `NodeCache`). To be returned by the `decorate` of the visitor."""
+    def wrapper_visit(self, op, arg):
+        value = self.cache.get(op, _MISS)
+        if value is _MISS:
+            value = visit_func(self, op, arg)
+            self.cache.put(op, value)
+        return value
+    return wrapper_visit
@@ -0,0 +1,51 @@
+from typing import FrozenSet, Optional, Set
+from tvm import tir
+from tzer.tir.util import TIRNode
+from .cache import NodeCache
+from .free_var import TIRFreeVar, _EMPTY
+
+LVALUE_CACHE = NodeCache()
+
+
+class TIRLValueVar(TIRFreeVar):
+    """Returns the set of variables written in a node: buffers stored to and variables
+    bound by `LetStmt` and `For`. Memoized in `LVALUE_CACHE` by default."""
+
+    def __init__(self, cache: Optional[NodeCache] = None) -> None:
+        self.cache = LVALUE_CACHE if cache is None else cache
+
+    def visit_primfunc(self, op: tir.PrimFunc, arg: None) -> FrozenSet[tir.Var]:
+        return self(op.body, arg)
+
+    def visit_var(self, op: tir.Var, arg: None) -> FrozenSet[tir.Var]:
+        return _EMPTY
+
+    def visit_let(self, op: tir.Let, arg: None) -> FrozenSet[tir.Var]:
+        return self(op.value, arg) | self(op.body, arg)
+
+    def visit_letstmt(self, op: tir.LetStmt, arg: None) -> FrozenSet[tir.Var]:
+        return frozenset((op.var,)) | self(op.value, arg) | self(op.body, arg)
+
+    def visit_for(self, op: tir.For, arg: None) -> FrozenSet[tir.Var]:
+        return frozenset((op.loop_var,)) | self(op.min, arg) | self(op.extent, arg) | self(op.body, arg)
+
+    def visit_allocate(self, op: tir.Allocate, arg: None) -> FrozenSet[tir.Var]:
+        res = self(op.condition, arg) | self(op.body, arg)
+        for extent in op.extents:
+            res |= self(extent, arg)
+        return res
+
+    def visit_store(self, op: tir.Store, arg: None) -> FrozenSet[tir.Var]:
+        return frozenset((op.buffer_var,)) | self(op.value, arg) | self(op.index, arg) | self(op.predicate, arg)
+
+    def visit_block(self, op: tir.Block, arg: None) -> FrozenSet[tir.Var]:
+        if op.init is None:
+            return self(op.body, arg)
+        return self(op.body, arg) | self(op.init, arg)
+
+
+TIR_LVALUE_VAR = TIRLValueVar()
+
+
+def get_lvalue_vars(root: TIRNode) -> Set[tir.Var]:
+    return set(TIR_LVALUE_VAR(root, None))
@@ -0,0 +1,237 @@
+"""Child slots of TIR nodes, to address and replace a subtree without visiting the whole tree.
+
+The children of a node are numbered in the order of its slots (and of the elements of list
+slots), and a node in a tree is addressed by the path of child indices from the root.
+`replace_child` rebuilds a node with one child replaced, reusing all other fields, so that
+`replace_path` only rebuilds the ancestors of the replaced node (path copying).
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from tvm import tir
+from tzer.tir.util import TIRNode
+from .abstract import _DISPATCH_ORDER
+
+
+class Slot(NamedTuple):
+    field: str
+    kind: str = 'expr'  # 'expr', 'stmt' or 'block'.
+    many: bool = False  # A list of children (e.g., `SeqStmt.seq`).
+    # Variables that the node binds for this child.
+    binds: Optional[Callable[[Any], list]] = None
+    # Field whose dtype the child should have (default: the child's own dtype).
+    dtype_of: Optional[str] = None
+    # If mutators descend into the child (variables being defined are not mutated).
+    mutable: bool = True
+
+
+# Slots of a node kind (see `_DISPATCH_ORDER`) and how to rebuild a node from the values of
+# its slots (in order).
+_Spec = Tuple[List[Slot], Optional[Callable[..., TIRNode]]]
+
+_LEAF: _Spec = ([], None)
+
+
+def _binop(op, a, b):
+    return op.__class__(a, b, span=op.span)
+
+
+_BINOP_SPEC: _Spec = ([Slot('a'), Slot('b')], _binop)
+
+_SPECS: Dict[str, _Spec] = {
+    'primfunc': (
+        [Slot('body', 'stmt', binds=lambda op: list(op.params))],
+        lambda op, body: tir.PrimFunc(op.params, body, op.ret_type, op.buffer_map, op.attrs)),
+    'var': _LEAF,
+    'sizevar': _LEAF,
+    'itervar': _LEAF,
+    'load': (
+        [Slot('buffer_var', mutable=False), Slot('index'), Slot('predicate')],
+        lambda op, buffer_var, index, predicate: tir.Load(op.dtype, buffer_var, index, predicate, span=op.span)),
+    'bufferload': (
+        [Slot('indices', many=True)],
+        lambda op, indices: tir.BufferLoad(op.buffer, indices, span=op.span)),
+    'producerload': (
+        [Slot('indices', many=True)],
+        lambda op, indices: tir.ProducerLoad(op.producer, indices, span=op.span)),
+    'let': (
+        [Slot('var', mutable=False), Slot('value'), Slot('body', binds=lambda op: [op.var])],
+        lambda op, var, value, body: tir.Let(var, value, body, span=op.span)),
+    'call': (
+        [Slot('args', many=True)],
+        lambda op, args: tir.Call(op.dtype, op.op, args, span=op.span)),
+    'reduce': (
+        [Slot('src', many=True), Slot('condition'), Slot('init', many=True)],
+        lambda op, src, condition, init: tir.Reduce(
+            op.combiner, src, op.rdom, condition, op.value_index, init, span=op.span)),
+    'cast': (
+        [Slot('value')],
+        lambda op, value: tir.Cast(op.dtype, value, span=op.span)),
+    'not': (
+        [Slot('a')],
+        lambda op, a: tir.Not(a, span=op.span)),
+    'select': (
+        [Slot('condition'), Slot('true_value'), Slot('false_value')],
+        lambda op, condition, true_value, false_value: tir.Select(
+            condition, true_value, false_value, span=op.span)),
+    'ramp': (
+        [Slot('base')],
+        lambda op, base: tir.Ramp(base, op.stride, op.lanes, span=op.span)),
+    'broadcast': (
+        [Slot('value')],
+        lambda op, value: tir.Broadcast(value, op.lanes, span=op.span)),
+    'shuffle': (
+        [Slot('vectors', many=True), Slot('indices', many=True)],
+        lambda op, vectors, indices: tir.Shuffle(vectors, indices, span=op.span)),
+    'intimm': _LEAF,
+    'floatimm': _LEAF,
+    'stringimm': _LEAF,
+    'any': _LEAF,
+    'attrstmt': (
+        [Slot('value'), Slot('body', 'stmt')],
+        lambda op, value, body: tir.AttrStmt(op.node, op.attr_key, value, body, span=op.span)),
+    'ifthenelse': (
+        [Slot('condition'), Slot('then_case', 'stmt'), Slot('else_case', 'stmt')],
+        lambda op, condition, then_case, else_case: tir.IfThenElse(
+            condition, then_case, else_case, span=op.span)),
+    'letstmt': (
+        [Slot('var', mutable=False), Slot('value'), Slot('body', 'stmt', binds=lambda op: [op.var])],
+        lambda op, var, value, body: tir.LetStmt(var, value, body, span=op.span)),
+    'for': (
+        [Slot('loop_var', mutable=False), Slot('min'), Slot('extent'), Slot('body', 'stmt')],
+        lambda op, loop_var, min, extent, body: tir.For(
+            loop_var, min, extent, op.kind, body, op.thread_binding, op.annotations, span=op.span)),
+    'while': (
+        [Slot('condition'), Slot('body', 'stmt')],
+        lambda op, condition, body: tir.stmt.While(condition, body, span=op.span)),
+    'allocate': (
+        [Slot('buffer_var', mutable=False), Slot('extents', many=True), Slot('condition'),
+         Slot('body', 'stmt', binds=lambda op: [op.buffer_var])],
+        lambda op, buffer_var, extents, condition, body: tir.Allocate(
+            buffer_var, op.dtype, extents, condition, body, span=op.span)),
+    'store': (
+        [Slot('buffer_var', mutable=False), Slot('value'), Slot('index', dtype_of='value'),
+         Slot('predicate')],
+        lambda op, buffer_var, value, index, predicate: tir.Store(
+            buffer_var, value, index, predicate, span=op.span)),
+    'bufferstore': (
+        [Slot('value'), Slot('indices', many=True)],
+        lambda op, value, indices: tir.BufferStore(op.buffer, value, indices, span=op.span)),
+    'bufferrealize': (
+        [Slot('condition'), Slot('body', 'stmt')],
+        lambda op, condition, body: tir.BufferRealize(op.buffer, op.bounds, condition, body, span=op.span)),
+    'assertstmt': (
+        [Slot('condition'), Slot('message'), Slot('body', 'stmt')],
+        lambda op, condition, message, body: tir.AssertStmt(condition, message, body, span=op.span)),
+    'producerstore': (
+        [Slot('value'), Slot('indices', many=True)],
+        lambda op, value, indices: tir.ProducerStore(op.producer, value, indices, span=op.span)),
+    'producerrealize': (
+        [Slot('condition'), Slot('body', 'stmt')],
+        lambda op, condition, body: tir.ProducerRealize(
+            op.producer, op.bounds, condition, body, span=op.span)),
+    'prefetch': _LEAF,
+    'seqstmt': (
+        [Slot('seq', 'stmt', many=True)],
+        lambda op, seq: tir.SeqStmt(seq, span=op.span)),
+    'evaluate': (
+        [Slot('value')],
+        lambda op, value: tir.Evaluate(value, span=op.span)),
+    'block': (
+        [Slot('body', 'stmt', binds=lambda op: [v.var for v in op.iter_vars]), Slot('init', 'stmt')],
+        lambda op, body, init: tir.Block(
+            op.iter_vars, op.reads, op.writes, op.name_hint, body, init,
+            op.alloc_buffers, op.match_buffers, op.annotations)),
+    'blockrealize': (
+        [Slot('iter_values', many=True), Slot('predicate'), Slot('block', 'block')],
+        lambda op, iter_values, predicate, block: tir.BlockRealize(iter_values, predicate, block)),
+}
+for _name in ['add', 'sub', 'mul', 'div', 'mod', 'floordiv', 'floormod', 'min', 'max',
+              'eq', 'ne', 'lt', 'le', 'gt', 'ge', 'and', 'or']:
+    _SPECS[_name] = _BINOP_SPEC
+
+# Node type -> (kind code, i.e., position in `_DISPATCH_ORDER`, spec).
+_SPEC_BY_TYPE: Dict[type, Tuple[int, _Spec]] = {}
+
+KIND_NAMES = [name for _, name in _DISPATCH_ORDER]
+
+
+def node_spec(node_type: type) -> Tuple[int, _Spec]:
+    spec = _SPEC_BY_TYPE.get(node_type)
+    if spec is None:
+        for code, (node_class, name) in enumerate(_DISPATCH_ORDER):
+            if issubclass(node_type, node_class):
+                spec = code, _SPECS[name]
+                break
+        else:
+            raise TypeError(f'Not a TIR node: {node_type}')
+        _SPEC_BY_TYPE[node_type] = spec
+    return spec
+
+
+def _is_node(value) -> bool:
+    # Optional slots may be `None` (e.g., `IfThenElse.else_case`) or constants (e.g., a
+    # `bool` predicate of `BlockRealize`).
+    return isinstance(value, (tir.PrimExpr, tir.Stmt))
+
+
+def child_slots(op: TIRNode) -> List[Tuple[TIRNode, Slot]]:
+    """Children of `op` (in order) with their slots."""
+    _, (slots, _) = node_spec(type(op))
+    children = []
+    for slot in slots:
+        value = getattr(op, slot.field)
+        if slot.many:
+            children.extend((child, slot) for child in value)
+        elif _is_node(value):
+            children.append((value, slot))
+    return children
+
+
+def children(op: TIRNode) -> List[TIRNode]:
+    return [child for child, _ in child_slots(op)]
+
+
+def replace_children(op: TIRNode, new_children: Dict[int, TIRNode]) -> TIRNode:
+    """`op` with its children replaced as given by their indices."""
+    _, (slots, make) = node_spec(type(op))
+    pos = 0
+    values = []
+    for slot in slots:
+        value = getattr(op, slot.field)
+        if slot.many:
+            value = [new_children.get(pos + i, child) for i, child in enumerate(value)]
+            pos += len(value)
+        elif _is_node(value):
+            value = new_children.get(pos, value)
+            pos += 1
+        values.append(value)
+    for idx in new_children:
+        if not 0 <= idx < pos:
+            raise IndexError(f'{type(op).__name__} has no child #{idx}')
+    return make(op, *values)
+
+
+def replace_child(op: TIRNode, idx: int, new: TIRNode) -> TIRNode:
+    """`op` with its `idx`-th child replaced by `new`."""
+    return replace_children(op, {idx: new})
+
+
+def node_at(root: TIRNode, path: Sequence[int]) -> TIRNode:
+    """The node reached from `root` by following the child indices of `path`."""
+    node = root
+    for idx in path:
+        node = children(node)[idx]
+    return node
+
+
+def replace_path(root: TIRNode, path: Sequence[int], new: TIRNode) -> TIRNode:
+    """`root` with the node at `path` (child indices from the root) replaced by `new`.
+    Only the ancestors of the node are rebuilt; all other subtrees are reused."""
+    ancestors = []
+    node = root
+    for idx in path:
+        ancestors.append(node)
+        node = children(node)[idx]
+    for ancestor, idx in zip(reversed(ancestors), reversed(path)):
+        new = replace_child(ancestor, idx, new)
+    return new
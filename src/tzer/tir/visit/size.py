@@ -1,24 +1,19 @@
-from typing import Any, Dict, Optional
-from tzer.tir.util import TIRNode, get_id
+from typing import Optional
+from tzer.tir.util import TIRNode
 from .abstract import TIRVisitor
+from .cache import NodeCache, memoized_visit
 from tvm import tir
 
+SIZE_CACHE = NodeCache()
+
 
 class MemoizedGetSize(TIRVisitor[int, None]):
-    def __init__(self) -> None:
-        self.size_map: Dict[Optional[int], int] = {}
-
-    def decorate(visit_func: Any):
-        def wrapper_visit(self, op, arg):
-            id = get_id(op)
-            # memoization
-            if id in self.size_map:
-                return self.size_map[id]
-            else:
-                size = visit_func(self, op, arg)
-                self.size_map[id] = size
-                return size
-        return wrapper_visit
+    """Node sizes, memoized across calls (and mutations) in `SIZE_CACHE` by default."""
+
+    def __init__(self, cache: Optional[NodeCache] = None) -> None:
+        self.cache = SIZE_CACHE if cache is None else cache
+
+    decorate = memoized_visit
 
     def visit_primfunc(self, op: tir.PrimFunc, arg: None) -> int:
         return 1 + self(op.body, None)
@@ -226,5 +221,8 @@ class MemoizedGetSize(TIRVisitor[int, None]):
         return sum
 
 
+GET_NODE_SIZE = MemoizedGetSize()
+
+
 def get_node_size(root: TIRNode) -> int:
-    return MemoizedGetSize()(root, None)
+    return GET_NODE_SIZE(root, None)
@@ -1,6 +1,7 @@
 from .abstract import TIRAbstractTransformer
-from tzer.tir.util import TIRNode
-from typing import Any, NamedTuple
+from .path import children, replace_children
+from tzer.tir.util import TIRNode, get_id
+from typing import Any, Dict, Iterable, NamedTuple, Tuple
 
 
 class ArgSwap(NamedTuple):
@@ -10,6 +11,8 @@ class ArgSwap(NamedTuple):
 
 
 class TIRSwapper(TIRAbstractTransformer[TIRNode]):
+    """Rebuilds the whole tree. `swap_tir` only rebuilds the ancestors of swapped nodes."""
+
     def decorate(visit_func: Any):
         def wrapper_visit(self, op, arg: ArgSwap):
             if op.same_as(arg.old):
@@ -22,5 +25,22 @@ class TIRSwapper(TIRAbstractTransformer[TIRNode]):
 TIR_SWAPPER = TIRSwapper()
 
 
+def _swap(op: TIRNode, new_nodes: Dict[int, TIRNode]) -> TIRNode:
+    new = new_nodes.get(get_id(op))
+    if new is not None:
+        return new
+    new_children = {}
+    for idx, child in enumerate(children(op)):
+        new_child = _swap(child, new_nodes)
+        if new_child is not child:
+            new_children[idx] = new_child
+    return replace_children(op, new_children) if new_children else op
+
+
 def swap_tir(root: TIRNode, old: TIRNode, new: TIRNode) -> TIRNode:
-    return TIR_SWAPPER(root, ArgSwap(old, new))
+    return _swap(root, {get_id(old): new})
+
+
+def swap_tir_many(root: TIRNode, pairs: Iterable[Tuple[TIRNode, TIRNode]]) -> TIRNode:
+    """Swap several (old, new) nodes in one pass."""
+    return _swap(root, {get_id(old): new for old, new in pairs})
@@ -72,18 +72,25 @@ class PassNode:
         self.dependence = None
 
     def mutate(self):
+        return self.concretize()[0]
+
+    def concretize(self):
+        """Returns a concrete TVM pass and a hashable key of it, i.e., the pass name and
+        its randomly chosen argument (if any). Equal keys mean identical passes."""
         if not self.need_arguments:
-            return self.tvm_pass()
+            return self.tvm_pass(), (self.name,)
         else:
             if isinstance(self.args, list) or  isinstance(self.args, tuple):
-                return self.tvm_pass(random.choice(self.args)) 
+                arg = random.choice(self.args)
             elif self.args == int:
-                return self.tvm_pass(random.randint(8, 128))
+                arg = random.randint(8, 128)
             elif self.args == str:
                 letters = string.ascii_letters + string.digits
-                return self.tvm_pass(''.join([random.choice(letters) for _ in range(random.randint(1,128))]))
+                arg = ''.join([random.choice(letters) for _ in range(random.randint(1,128))])
             else:
-                return self.tvm_pass(self.args)
+                # Fixed argument.
+                return self.tvm_pass(self.args), (self.name,)
+            return self.tvm_pass(arg), (self.name, arg)
 
     def __str__(self) -> str:
         return f'{self.__class__.__name__}({self.name})'
@@ -200,6 +207,21 @@ class PassDependenceGraph:
         # return [pass_node.mutate() for pass_node in pass_nodes]
         return pass_nodes
 
+    def recover_keys(self, keys):
+        """Concrete TVM passes from the keys returned by `PassNode.concretize`."""
+        passes = []
+        for name, *args in keys:
+            if name not in self.tir_pass_nodes:
+                continue
+            node = self.tir_pass_nodes[name]
+            if args:
+                passes.append(node.tvm_pass(*args))
+            elif node.need_arguments:
+                passes.append(node.tvm_pass(node.args))
+            else:
+                passes.append(node.tvm_pass())
+        return passes
+
     def export_name(self, pass_nodes):
         return [pass_node.name for pass_node in pass_nodes]
 